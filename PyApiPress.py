@@ -2,29 +2,18 @@ import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 import requests
 import threading
-import time
+import collections
 from datetime import datetime
 import json
-import re
 import os
-import ast
+import press_engine
 
 # ===================== 全局配置 & 数据管理 =====================
 CONFIG_FILE = "api_press_config.json"  # 配置文件路径
-# 全局压测数据管理类
-class TestData:
+# 全局压测数据管理类（在引擎统计数据基础上增加API1响应缓存）
+class TestData(press_engine.TestData):
     def __init__(self):
-        self.success_count = 0
-        self.fail_count = 0
-        self.response_times = []
-        self.status_code_dict = {}
-        self.current_request = 0
-        self.total_requests = 0
-        self.thread_num = 0
-        self.is_running = False
-        self.test_start_time = 0
-        self.test_end_time = 0
-        self.lock = threading.Lock()
+        super().__init__()
         self.api1_response_data = None  # 存储API1响应数据，供API2调用
 
 # 全局对象初始化
@@ -37,6 +26,12 @@ success_rate_label, qps_label, avg_rt_label = None, None, None
 success_label, fail_label, total_time_label, min_rt_label, max_rt_label = None, None, None, None, None
 detail_text = None
 chain_switch = None  # 链式调用开关
+# 界面统一刷新：工作线程只往日志缓冲区追加文本，由主线程定时器一次性刷入控件并渲染最新统计快照
+UI_REFRESH_MS = 250
+UI_BUFFER_MAX = 10000  # 缓冲区最多暂存的条目数，超出时丢弃最早的（界面只需展示最近内容）
+log_buffer = collections.deque(maxlen=UI_BUFFER_MAX)  # (文本, 标签)
+run_active = False  # 压测进行中（由刷新定时器检测结束）
+worker_threads = []  # 本轮压测的工作线程
 
 # ===================== 核心方法：参数保存/加载（完整双API+链式配置） =====================
 def save_config():
@@ -118,37 +113,6 @@ def load_config():
         log_print(f"❌ 配置加载失败：{str(e)}", "ERROR")
 
 # ===================== 核心方法：链式变量替换+API调用 =====================
-def extract_json_value(json_data, key_path):
-    """根据键路径提取JSON值，支持多级路径 例：data.user.id → 逐层取值"""
-    try:
-        keys = key_path.split(".")
-        value = json_data
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                return None
-        return value
-    except Exception:
-        return None
-
-def replace_variables(content, data_dict):
-    """替换内容中的 ${变量名} 为API1响应的实际值，支持多级路径"""
-    if not content or not data_dict:
-        return content
-    # 正则匹配 ${xxx.xxx} 格式的变量
-    pattern = r"\$\{([\w\.]+)\}"
-    matches = re.findall(pattern, content)
-    for key_path in matches:
-        real_value = extract_json_value(data_dict, key_path)
-        if real_value is not None:
-            # 区分字符串/数字类型，保持原始格式
-            if isinstance(real_value, (int, float, bool)):
-                content = content.replace(f"${{{key_path}}}", str(real_value))
-            else:
-                content = content.replace(f"${{{key_path}}}", json.dumps(real_value).strip('"'))
-    return content
-
 def call_api1():
     """调用前置API1，获取响应数据并存储，供API2使用"""
     try:
@@ -183,60 +147,15 @@ def call_api1():
         messagebox.showerror("API1失败", f"前置接口调用出错：{str(e)}")
         return False
 
-def send_chain_request():
-    """链式调用核心：API1成功后，变量替换+调用API2（多线程）"""
-    while True:
-        with test_data.lock:
-            if not test_data.is_running or test_data.current_request >= test_data.total_requests:
-                break
-            test_data.current_request += 1
-            current = test_data.current_request
-            total = test_data.total_requests
-
-        log_print(f"📶 链式压测进度：{current}/{total} 次请求", "PROGRESS")
-        try:
-            # 1. 获取API2原始配置
-            url = controls["api2_url"].get().strip()
-            method = controls["api2_method"].get()
-            timeout = int(controls["api2_timeout"].get().strip())
-            raw_headers = controls["api2_headers"].get(1.0, tk.END).strip()
-            raw_data = controls["api2_data"].get(1.0, tk.END).strip()
-
-            # 2. 变量替换：API2请求头/体 替换为API1的实际值
-            replaced_headers = replace_variables(raw_headers, test_data.api1_response_data)
-            replaced_data = replace_variables(raw_data, test_data.api1_response_data)
-            headers = parse_json(replaced_headers)
-            data = parse_json(replaced_data)
-
-            # 3. 发送API2请求
-            start_time = time.time()
-            session = requests.Session()
-            resp = None
-            if method == "GET":
-                resp = session.get(url, headers=headers, timeout=timeout)
-            elif method == "POST":
-                resp = session.post(url, headers=headers, json=data, timeout=timeout)
-            elif method == "PUT":
-                resp = session.put(url, headers=headers, json=data, timeout=timeout)
-            elif method == "DELETE":
-                resp = session.delete(url, headers=headers, timeout=timeout)
-            
-            resp.raise_for_status()
-            rt = round((time.time() - start_time) * 1000, 2)
-            
-            # 4. 统计数据
-            with test_data.lock:
-                test_data.response_times.append(rt)
-                code = resp.status_code
-                test_data.status_code_dict[code] = test_data.status_code_dict.get(code, 0) + 1
-                test_data.success_count += 1
-            log_print(f"✅ API2请求成功 | 状态码：{code} | 响应时间：{rt}ms", "SUCCESS")
-
-        except Exception as e:
-            with test_data.lock:
-                test_data.fail_count += 1
-                test_data.status_code_dict["ERROR"] = test_data.status_code_dict.get("ERROR", 0) + 1
-            log_print(f"❌ API2请求失败：{str(e)}", "ERROR")
+def get_api2_worker_args():
+    """收集API2压测线程参数：在主线程读取一次控件，工作线程（press_engine.send_chain_request）不再访问Tk，
+    日志经 log_print 追加到缓冲区，由 ui_tick 统一刷入"""
+    url = controls["api2_url"].get().strip()
+    method = controls["api2_method"].get()
+    timeout = int(controls["api2_timeout"].get().strip())
+    raw_headers = controls["api2_headers"].get(1.0, tk.END).strip()
+    raw_data = controls["api2_data"].get(1.0, tk.END).strip()
+    return (test_data, url, method, timeout, raw_headers, raw_data, test_data.api1_response_data, log_print)
 
 # ===================== 工具通用方法 =====================
 def parse_json(text):
@@ -250,13 +169,22 @@ def parse_json(text):
         return {}
 
 def log_print(content, level="INFO"):
-    """线程安全的日志打印，分级着色"""
+    """线程安全的日志打印，分级着色（仅追加到缓冲区，由界面刷新定时器统一刷入）"""
     time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     log_content = f"[{time_str}] [{level}] {content}\n"
-    root.after(0, lambda: log_text.insert(tk.END, log_content))
-    root.after(0, lambda: log_text.see(tk.END))
     tag = level if level in ["INFO", "SUCCESS", "ERROR", "WARN", "PROGRESS"] else "INFO"
-    root.after(0, lambda: log_text.tag_add(tag, log_text.index("end-2l"), log_text.index("end-1l")))
+    log_buffer.append((log_content, tag))
+
+def flush_log():
+    """在Tk主线程中把日志缓冲区一次性插入控件（一次insert调用 + 一次滚动）"""
+    if not log_buffer:
+        return
+    args = []
+    for _ in range(len(log_buffer)):
+        content, tag = log_buffer.popleft()
+        args.extend((content, tag))
+    log_text.insert(tk.END, *args)
+    log_text.see(tk.END)
 
 def copy_log():
     """日志复制：选中/全量复制"""
@@ -271,23 +199,18 @@ def copy_log():
 
 def clear_log():
     """清空日志"""
+    log_buffer.clear()
     log_text.delete(1.0, tk.END)
     log_print("ℹ️ 日志区已清空，准备新一轮压测", "INFO")
 
 def generate_report():
-    """生成压测报告"""
-    total_req = test_data.total_requests
-    success_cnt = test_data.success_count
-    fail_cnt = test_data.fail_count
-    total_time = round(test_data.test_end_time - test_data.test_start_time, 2) if test_data.test_end_time else 0
-    success_rate = round((success_cnt / total_req) * 100, 2) if total_req > 0 else 0
-    qps = round(total_req / total_time, 2) if total_time > 0 else 0
-
-    rt_list = test_data.response_times
-    avg_rt = round(sum(rt_list)/len(rt_list), 2) if rt_list else 0
-    min_rt = round(min(rt_list), 2) if rt_list else 0
-    max_rt = round(max(rt_list), 2) if rt_list else 0
-    code_dist = test_data.status_code_dict
+    """生成压测报告（统一取引擎汇总：成功率按已完成数计，QPS = 已完成数 / 有效时长）"""
+    summary = press_engine.build_summary(test_data)
+    total_req = summary["total_requests"]
+    success_cnt, fail_cnt = summary["success"], summary["fail"]
+    total_time, success_rate, qps = summary["total_time"], summary["success_rate"], summary["qps"]
+    avg_rt, min_rt, max_rt = summary["avg_rt"], summary["min_rt"], summary["max_rt"]
+    code_dist = summary["status_codes"]
 
     # 更新报表UI
     success_rate_label.config(text=f"成功率：{success_rate} %")
@@ -303,17 +226,19 @@ def generate_report():
 🔗 链式调用状态：{"已启用" if chain_switch.get() else "未启用"}
 📌 API1地址：{controls['api1_url'].get()} | API2地址：{controls['api2_url'].get()}
 📌 压测配置：并发数 {test_data.thread_num} | 总请求数 {total_req} | 超时 {controls['api2_timeout'].get()}s
-✅ 成功请求：{success_cnt} | ❌ 失败请求：{fail_cnt} | 📈 成功率：{success_rate}%
-⏱ 压测总耗时：{total_time}s | ⚡ QPS：{qps} req/s
-📊 响应时间：平均 {avg_rt}ms | 最小 {min_rt}ms | 最大 {max_rt}ms
-📋 状态码分布：{code_dist}
-"""
+✅ 成功请求：{success_cnt} | ❌ 失败请求：{fail_cnt} | 🚫 已取消：{summary['cancelled']} | ⏸ 未发送：{summary['unsent']}{f" | 仍在途：{summary['in_flight']}" if summary['in_flight'] else ""}
+📈 成功率：{success_rate}%（按已完成 {summary['completed']} 次计） | ⚡ QPS：{qps} req/s（已完成数 / 有效时长）
+⏱ 压测总耗时：{total_time}s | 有效时长：{summary['active_time']}s
+📊 响应时间：平均 {avg_rt}ms | 最小 {min_rt}ms | 最大 {max_rt}ms | p50 {summary['p50_rt']}ms | p99 {summary['p99_rt']}ms
+📋 状态码分布：{code_dist}{f" | 异常类型：{summary['error_types']}" if summary['error_types'] else ""}
+{press_engine.format_phases(summary['phases'])}"""
     detail_text.delete(1.0, tk.END)
     detail_text.insert(tk.END, detail_content)
     log_print("✅ 压测报告生成完成，查看下方报表", "SUCCESS")
 
 def start_chain_test():
     """启动压测：链式开关判断+参数校验+执行"""
+    global worker_threads, run_active
     # 参数校验
     try:
         thread_num = int(controls["api2_thread"].get().strip())
@@ -328,17 +253,8 @@ def start_chain_test():
         return
 
     # 初始化压测数据
-    with test_data.lock:
-        test_data.success_count = 0
-        test_data.fail_count = 0
-        test_data.response_times = []
-        test_data.status_code_dict = {}
-        test_data.current_request = 0
-        test_data.total_requests = total_requests
-        test_data.thread_num = thread_num
-        test_data.is_running = True
-        test_data.test_start_time = time.time()
-        test_data.api1_response_data = None
+    test_data.reset(total_requests, thread_num)
+    test_data.api1_response_data = None
 
     controls["start_btn"]["state"] = tk.DISABLED
     controls["stop_btn"]["state"] = tk.NORMAL
@@ -356,36 +272,54 @@ def start_chain_test():
     else:
         log_print("ℹ️ 未启用链式调用，直接执行API2压测", "INFO")
 
-    # 启动多线程执行API2压测
-    for _ in range(thread_num):
-        t = threading.Thread(target=send_chain_request, daemon=True)
+    # 启动多线程执行API2压测（结束由界面刷新定时器检测）
+    worker_args = get_api2_worker_args()
+    worker_threads = [threading.Thread(target=press_engine.send_chain_request, args=worker_args, daemon=True)
+                      for _ in range(thread_num)]
+    for t in worker_threads:
         t.start()
-    root.after(500, check_test_finish)
+    run_active = True
 
 def stop_test():
     """停止压测"""
-    with test_data.lock:
-        test_data.is_running = False
-    test_data.test_end_time = time.time()
+    if run_active:
+        finish_test("🛑 压测任务已强制停止", "WARN")
+
+def ui_tick():
+    """界面唯一的刷新定时器：刷入日志缓冲区，渲染最新统计快照，并检测压测是否结束"""
+    flush_log()
+    if run_active:
+        snap = press_engine.snapshot(test_data)
+        render_live_stats(snap)
+        if not snap["running"] or snap["completed"] >= snap["total_requests"] or not any(t.is_alive() for t in worker_threads):
+            finish_test("🎉 压测任务执行完成！", "SUCCESS")
+    root.after(UI_REFRESH_MS, ui_tick)
+
+def render_live_stats(snap):
+    """压测进行中按快照更新报表区（最终数值由 generate_report 覆盖）"""
+    completed = snap["completed"]
+    elapsed = snap["time"] - snap["start_time"]
+    rt_hist = snap["rt_hist"]
+    success_rate_label.config(text=f"成功率：{round(snap['success'] / completed * 100, 2) if completed else '--'} %")
+    qps_label.config(text=f"QPS：{round(completed / elapsed, 2) if completed and elapsed > 0 else '--'} req/s")
+    avg_rt_label.config(text=f"平均响应时间：{round(rt_hist.mean(), 2)} ms")
+    success_label.config(text=f"{snap['success']}")
+    fail_label.config(text=f"{snap['fail']}")
+    total_time_label.config(text=f"{round(elapsed, 2)} s")
+    min_rt_label.config(text=f"{round(rt_hist.min, 2)} ms")
+    max_rt_label.config(text=f"{round(rt_hist.max, 2)} ms")
+
+def finish_test(message, level):
+    """结束本轮压测（自然结束与手动停止共用，只收尾一次）：关闭在途连接并生成报告"""
+    global run_active
+    run_active = False
+    press_engine.end_run(test_data)
+    press_engine.cancel_run(test_data)
     controls["start_btn"]["state"] = tk.NORMAL
     controls["stop_btn"]["state"] = tk.DISABLED
-    log_print("🛑 压测任务已强制停止", "WARN")
+    log_print(message, level)
     generate_report()
 
-def check_test_finish():
-    """检查压测完成状态"""
-    if test_data.is_running and test_data.current_request < test_data.total_requests:
-        root.after(500, check_test_finish)
-        return
-    if test_data.is_running:
-        with test_data.lock:
-            test_data.is_running = False
-        test_data.test_end_time = time.time()
-        controls["start_btn"]["state"] = tk.NORMAL
-        controls["stop_btn"]["state"] = tk.DISABLED
-        log_print("🎉 压测任务执行完成！", "SUCCESS")
-        generate_report()
-
 def export_report():
     """导出报告"""
     if test_data.total_requests == 0:
@@ -590,4 +524,5 @@ if __name__ == "__main__":
     load_config()  # 启动自动加载完整配置
     log_print("欢迎使用 PyApiPress 链式API压测工具！支持双API配置+变量取值+参数持久化", "INFO")
     log_print("📖 变量使用说明：API2中用 ${键名} 或 ${多级键名} 引用API1响应数据，例：${token}、${data.user.id}", "INFO")
+    ui_tick()
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,97 @@
+import gzip
+import json
+import zlib
+from urllib.parse import urlsplit
+
+# ===================== 带宽统计 & 请求体压缩 =====================
+# 每个请求统计发送/接收字节数，分"线上"（实际传输，压缩后）与"解码后"（原始内容）两种口径：
+#   发送：请求行 + 请求头 + 请求体（Host头按URL估算，其余取自实际发出的 PreparedRequest）
+#   接收：状态行 + 响应头 + 响应体（线上字节取 urllib3 实际读取的字节数，解码后为 resp.content 长度）
+# 请求体压缩：预先序列化并压缩JSON请求体，按数据对象缓存（参数文件中的每组数据只压缩一次），
+# 同时可指定 Accept-Encoding，模拟真实客户端的压缩流量
+
+REQUEST_ENCODINGS = ("none", "gzip", "deflate")
+CACHE_LIMIT = 1024  # 最多缓存的请求体个数（合成数据每次都不同，超出后不再缓存）
+SIZE_KEYS = ("sent", "sent_decoded", "recv", "recv_decoded")
+
+
+class WireOptions:
+    """传输选项：请求体压缩方式 + Accept-Encoding（空为使用requests默认值）；
+    upload 为 upload_body.UploadSource 时 POST/PUT 请求体改为上传该文件"""
+    def __init__(self, request_encoding="none", accept_encoding="", upload=None):
+        if request_encoding not in REQUEST_ENCODINGS:
+            raise ValueError(f"不支持的请求体压缩方式：{request_encoding}，可选：{'/'.join(REQUEST_ENCODINGS)}")
+        self.request_encoding = request_encoding
+        self.accept_encoding = accept_encoding.strip()
+        self.upload = upload
+        self.body_headers = {"Content-Type": "application/json", "Content-Encoding": request_encoding}
+        self._cache = {}  # id(数据对象) → (数据对象, 压缩后字节, 原始字节数)
+
+    @property
+    def compress(self):
+        return self.request_encoding != "none"
+
+    def apply_session(self, session):
+        if self.accept_encoding:
+            session.headers["Accept-Encoding"] = self.accept_encoding
+
+    def encode(self, data):
+        """返回 (压缩后的请求体, 压缩前字节数)；同一数据对象只压缩一次"""
+        cached = self._cache.get(id(data))
+        if cached is not None and cached[0] is data:
+            return cached[1], cached[2]
+        raw = json.dumps(data).encode("utf-8")
+        body = gzip.compress(raw, compresslevel=6) if self.request_encoding == "gzip" else zlib.compress(raw, 6)
+        if len(self._cache) < CACHE_LIMIT:
+            self._cache[id(data)] = (data, body, len(raw))  # 持有数据对象，保证id不被复用
+        return body, len(raw)
+
+
+def _headers_size(headers):
+    return sum(len(k) + len(str(v)) + 4 for k, v in headers.items()) + 2
+
+
+def measure(resp, sent_decoded_body=None):
+    """单个请求的字节数 (线上发送, 解码后发送, 线上接收, 解码后接收)"""
+    req = resp.request
+    body = req.body or b""
+    body_len = len(body.encode("utf-8") if isinstance(body, str) else body)
+    parts = urlsplit(req.url)
+    path = parts.path or "/"
+    if parts.query:
+        path += "?" + parts.query
+    head = len(req.method) + len(path) + 12 + _headers_size(req.headers) + len(parts.netloc) + 8
+    sent_decoded = head + (body_len if sent_decoded_body is None else sent_decoded_body)
+
+    raw = resp.raw
+    resp_head = 13 + len(resp.reason or "") + _headers_size(raw.headers)
+    recv_decoded = resp_head + len(resp.content)
+    wire_body = raw.tell() if hasattr(raw, "tell") else 0
+    return head + body_len, sent_decoded, resp_head + (wire_body or len(resp.content)), recv_decoded
+
+
+def summarize(totals, active_time, series=None):
+    """带宽汇总（MB、MB/s），series 为 [[秒, 发送字节, 接收字节], ...]"""
+    mb = 1048576.0
+    result = {key: round(totals[key] / mb, 3) for key in SIZE_KEYS}
+    result["sent_mbps"] = round(totals["sent"] / mb / active_time, 3) if active_time > 0 else 0
+    result["recv_mbps"] = round(totals["recv"] / mb / active_time, 3) if active_time > 0 else 0
+    result["recv_ratio"] = round(totals["recv_decoded"] / totals["recv"], 2) if totals["recv"] else 0
+    result["sent_ratio"] = round(totals["sent_decoded"] / totals["sent"], 2) if totals["sent"] else 0
+    if series:
+        result["series"] = [[sec, round(sent / mb, 4), round(recv / mb, 4)] for sec, sent, recv in series]
+        result["peak_recv_mbps"] = max(point[2] for point in result["series"])
+        result["peak_sent_mbps"] = max(point[1] for point in result["series"])
+    return result
+
+
+def format_bandwidth(bw):
+    """报表中的带宽段落"""
+    if not bw or not (bw["sent"] or bw["recv"]):
+        return ""
+    text = (f"📶 带宽：发送 {bw['sent']}MB（解码后 {bw['sent_decoded']}MB，压缩比 {bw['sent_ratio']}） | "
+            f"接收 {bw['recv']}MB（解码后 {bw['recv_decoded']}MB，压缩比 {bw['recv_ratio']}） | "
+            f"平均 ↑{bw['sent_mbps']} / ↓{bw['recv_mbps']} MB/s")
+    if "peak_recv_mbps" in bw:
+        text += f" | 峰值 ↑{bw['peak_sent_mbps']} / ↓{bw['peak_recv_mbps']} MB/s"
+    return text + "\n"
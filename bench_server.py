@@ -0,0 +1,235 @@
+import argparse
+import base64
+import hashlib
+import json
+import random
+import ssl
+import struct
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# ===================== 本地基准测试靶机 =====================
+# 用于测量压测工具自身的发压能力：延迟/响应体大小/状态码分布/SSE 均可配置，
+# 启动参数为默认值，单个请求可用查询参数覆盖，例：/?latency_ms=20&body_size=4096&status=200:90,503:10
+# SSE：/sse?events=10&interval_ms=50
+# WebSocket：/ws 回显文本/二进制消息（每条回复前同样按 latency_ms/jitter_ms 延迟），用于 ws:// 压测自测
+# HTTPS：指定 --certfile/--keyfile 后以 TLS 监听（握手在各连接的处理线程中进行，用于连接模式/握手能力自测）
+
+
+def parse_status_mix(text):
+    """解析状态码分布 "200:95,500:5" → [(200, 95), (500, 5)]"""
+    mix = []
+    for part in str(text).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        code, _, weight = part.partition(":")
+        mix.append((int(code), float(weight) if weight else 1.0))
+    return mix or [(200, 1.0)]
+
+
+class BenchOptions:
+    """靶机默认行为"""
+    def __init__(self, latency_ms=0.0, jitter_ms=0.0, body_size=64, status_mix="200:100", sse_events=5, sse_interval_ms=10.0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.body_size = body_size
+        self.status_mix = parse_status_mix(status_mix)
+        self.sse_events = sse_events
+        self.sse_interval_ms = sse_interval_ms
+
+
+_body_cache = {}
+
+
+_WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def make_body(size):
+    """按大小缓存响应体（合法JSON），避免每个请求重复生成"""
+    body = _body_cache.get(size)
+    if body is None:
+        prefix, suffix = b'{"ok":true,"pad":"', b'"}'
+        body = prefix + b"x" * max(size - len(prefix) - len(suffix), 0) + suffix
+        _body_cache[size] = body
+    return body
+
+
+class BenchHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 支持keep-alive，与真实服务的连接复用行为一致
+    disable_nagle_algorithm = True  # 响应头/体分两次写出，避免Nagle+延迟ACK造成的40ms级假延迟
+    options = BenchOptions()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _params(self):
+        parsed = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parsed.query).items()}
+        return parsed.path, query
+
+    def _drain_body(self):
+        # 分块丢弃请求体，大文件上传压测时靶机内存不随请求体大小增长
+        length = int(self.headers.get("Content-Length") or 0)
+        while length > 0:
+            chunk = self.rfile.read(min(length, 65536))
+            if not chunk:
+                break
+            length -= len(chunk)
+
+    def _sleep(self, query):
+        opts = self.options
+        latency = float(query.get("latency_ms", opts.latency_ms))
+        jitter = float(query.get("jitter_ms", opts.jitter_ms))
+        delay = latency + (random.uniform(-jitter, jitter) if jitter else 0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+    def _pick_status(self, query):
+        mix = parse_status_mix(query["status"]) if "status" in query else self.options.status_mix
+        if len(mix) == 1:
+            return mix[0][0]
+        return random.choices([c for c, _ in mix], weights=[w for _, w in mix])[0]
+
+    def _handle(self):
+        self._drain_body()
+        path, query = self._params()
+        if path == "/sse":
+            return self._handle_sse(query)
+        if path == "/ws" and self.headers.get("Upgrade", "").lower() == "websocket":
+            return self._handle_ws(query)
+        self._sleep(query)
+        body = make_body(int(query.get("body_size", self.options.body_size)))
+        self.send_response(self._pick_status(query))
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _handle_sse(self, query):
+        """SSE流：逐条推送事件后关闭连接"""
+        events = int(query.get("events", self.options.sse_events))
+        interval = float(query.get("interval_ms", self.options.sse_interval_ms)) / 1000
+        self._sleep(query)
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for i in range(events):
+            self.wfile.write(f"id: {i}\ndata: {json.dumps({'seq': i})}\n\n".encode())
+            self.wfile.flush()
+            if interval > 0 and i < events - 1:
+                time.sleep(interval)
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def _read_ws_frame(self):
+        head = self.rfile.read(2)
+        if len(head) < 2:
+            return None, b""
+        n = head[1] & 0x7F
+        if n == 126:
+            n = struct.unpack("!H", self.rfile.read(2))[0]
+        elif n == 127:
+            n = struct.unpack("!Q", self.rfile.read(8))[0]
+        mask = self.rfile.read(4) if head[1] & 0x80 else b""
+        payload = self.rfile.read(n)
+        if mask and n:
+            key = (mask * (n // 4 + 1))[:n]
+            payload = (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(n, "big")
+        return head[0] & 0x0F, payload
+
+    def _send_ws_frame(self, opcode, payload):
+        n = len(payload)
+        if n < 126:
+            header = struct.pack("!BB", 0x80 | opcode, n)
+        elif n < 65536:
+            header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+        else:
+            header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+        self.wfile.write(header + payload)
+        self.wfile.flush()
+
+    def _handle_ws(self, query):
+        """WebSocket回显：握手后逐帧回显数据帧，应答ping，收到close后回复并关闭（不支持分片帧）"""
+        key = self.headers.get("Sec-WebSocket-Key", "")
+        accept = base64.b64encode(hashlib.sha1((key + _WS_GUID).encode()).digest()).decode()
+        self.send_response(101)
+        self.send_header("Upgrade", "websocket")
+        self.send_header("Connection", "Upgrade")
+        self.send_header("Sec-WebSocket-Accept", accept)
+        self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
+        while True:
+            opcode, payload = self._read_ws_frame()
+            if opcode is None or opcode == 0x8:
+                if opcode == 0x8:
+                    self._send_ws_frame(0x8, payload[:2])
+                return
+            if opcode == 0x9:
+                self._send_ws_frame(0xA, payload)
+            elif opcode in (0x1, 0x2):
+                self._sleep(query)
+                self._send_ws_frame(opcode, payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = do_PATCH = do_HEAD = _handle
+
+
+class BenchHTTPServer(ThreadingHTTPServer):
+    request_queue_size = 1024  # 默认监听队列仅5，数千并发建连（WebSocket长连接）时会被丢弃
+    ssl_context = None
+
+    def get_request(self):
+        sock, addr = super().get_request()
+        if self.ssl_context is not None:
+            # 不在接受连接的主线程里握手（否则握手被串行化），由处理线程首次读取时完成
+            sock = self.ssl_context.wrap_socket(sock, server_side=True, do_handshake_on_connect=False)
+        return sock, addr
+
+
+def start_server(host="127.0.0.1", port=0, options=None, certfile=None, keyfile=None):
+    """后台线程启动靶机，返回 (server, 实际端口)；port=0 表示随机空闲端口，指定证书时以 HTTPS 监听"""
+    handler = type("ConfiguredBenchHandler", (BenchHandler,), {"options": options or BenchOptions()})
+    server = BenchHTTPServer((host, port), handler)
+    if certfile:
+        server.ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server.ssl_context.load_cert_chain(certfile, keyfile)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address[1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PyApiPress 本地基准测试靶机")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 表示随机端口")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="固定服务延迟(ms)")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="延迟抖动(±ms)")
+    parser.add_argument("--body-size", type=int, default=64, help="响应体字节数")
+    parser.add_argument("--status-mix", default="200:100", help='状态码分布，例 "200:95,500:5"')
+    parser.add_argument("--sse-events", type=int, default=5)
+    parser.add_argument("--sse-interval-ms", type=float, default=10.0)
+    parser.add_argument("--certfile", help="TLS证书（PEM），指定后以 HTTPS 监听")
+    parser.add_argument("--keyfile", help="TLS私钥（PEM），证书文件已包含私钥时可省略")
+    args = parser.parse_args(argv)
+
+    options = BenchOptions(args.latency_ms, args.jitter_ms, args.body_size, args.status_mix, args.sse_events, args.sse_interval_ms)
+    server, port = start_server(args.host, args.port, options, args.certfile, args.keyfile)
+    # 首行输出监听端口，便于基准测试套件以子进程方式启动后读取
+    print(f"LISTENING {port}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
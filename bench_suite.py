@@ -0,0 +1,328 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import press_engine
+import raw_engine
+from press_engine import TestData
+from harness_monitor import HarnessMonitor
+from ws_engine import WsLoad, is_ws_url
+
+# ===================== 压测工具自身基准测试 =====================
+# 对本地靶机(bench_server.py)施压，测量各引擎在不同并发下的发压吞吐与单请求开销，
+# 结果写入 bench_results/*.json，可用 --compare 与历史基线对比以发现热路径性能回退
+# 用法：python bench_suite.py --concurrency 1,4,16 --requests 2000 --compare bench_results/baseline.json
+# 扩展性：python bench_suite.py --engines record_only,send_request --concurrency 1,2,4,8 --requests 200000 \
+#           --interpreters python3.13,python3.13t   分别在有GIL/无GIL解释器下运行，对比 QPS 随线程数的加速比
+
+RESULT_DIR = "bench_results"
+# 对比基线时使用的指标：(字段, 越大越好?)
+COMPARE_METRICS = [("rps", True), ("cpu_us_per_req", False), ("overhead_us_per_req", False)]
+# 不计算"计时外开销"的引擎：响应时间不是真实网络往返（record_only 为构造值），
+# 或同一连接上的多个请求计时区间互相重叠（流水线），用 并发×墙钟 − Σ响应时间 得到的是无意义的负数；
+# 这类引擎看 cpu_us_per_req 即可
+NO_OVERHEAD_ENGINES = {"record_only", "raw_pipeline8"}
+
+
+class NullSink:
+    """空输出端：保留日志/响应文本的格式化开销，但不涉及Tk"""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, content, tag=None):
+        self.count += 1
+
+
+def _run_threads(concurrency, target, args):
+    threads = [threading.Thread(target=target, args=args, daemon=True) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def run_send_request(test_data, url, concurrency, timeout):
+    sink = NullSink()
+    data_list = [{"username": "bench", "password": "123456"}]
+    headers = {"Content-Type": "application/json"}
+    _run_threads(concurrency, press_engine.send_request, (test_data, url, "POST", headers, data_list, timeout, sink, sink))
+
+
+def run_send_chain_request(test_data, url, concurrency, timeout):
+    sink = NullSink()
+    raw_headers = '{"Content-Type": "application/json", "token": "${token}"}'
+    raw_data = '{"userId": "${data.id}", "userName": "${data.name}"}'
+    variables = {"token": "bench-token", "data": {"id": 1, "name": "bench"}}
+    _run_threads(concurrency, press_engine.send_chain_request, (test_data, url, "POST", timeout, raw_headers, raw_data, variables, sink))
+
+
+def _run_raw(test_data, url, concurrency, timeout, depth):
+    target = raw_engine.RawTarget(url, "POST", {"Content-Type": "application/json"}, [{"username": "bench", "password": "123456"}])
+    _run_threads(concurrency, raw_engine.send_raw, (test_data, target, timeout, depth))
+
+
+def run_raw(test_data, url, concurrency, timeout):
+    _run_raw(test_data, url, concurrency, timeout, 1)
+
+
+def run_raw_pipeline(test_data, url, concurrency, timeout):
+    """原始套接字引擎，流水线深度 8"""
+    _run_raw(test_data, url, concurrency, timeout, 8)
+
+
+def _record_only_worker(test_data):
+    phases = {"ttfb": 0.8, "transfer": 0.1}
+    while True:
+        current, _ = press_engine.claim_request(test_data)
+        if current is None:
+            break
+        press_engine.record_response(test_data, 1.0 + current % 97 / 10, 200, phases, True)
+
+
+def run_record_only(test_data, url, concurrency, timeout):
+    """不发网络请求，只走 取号 + 统计记录 的热路径：衡量引擎自身的多核扩展性（与靶机/网络无关）"""
+    _run_threads(concurrency, _record_only_worker, (test_data,))
+
+
+def run_websocket(test_data, url, concurrency, timeout):
+    """WebSocket 引擎：并发数 = 连接数，闭环回显（靶机 /ws），所有连接在同一个事件循环线程中"""
+    if not is_ws_url(url):
+        url = "ws://" + url.split("://", 1)[-1].split("/", 1)[0] + "/ws"
+    load = WsLoad(test_data, url, concurrency, test_data.total_requests, 0, {}, [{"username": "bench", "password": "123456"}], timeout)
+    load.start().thread.join()
+
+
+# 引擎注册表：新增引擎只需在此登记 名称 → 运行函数(test_data, url, 并发数, 超时)
+ENGINES = {
+    "send_request": run_send_request,
+    "send_chain_request": run_send_chain_request,
+    "record_only": run_record_only,
+    "raw": run_raw,
+    "raw_pipeline8": run_raw_pipeline,
+    "websocket": run_websocket,
+}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0
+    index = min(int(len(sorted_values) * pct / 100), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run_case(engine, url, concurrency, total_requests, timeout=5, warmup=0):
+    """执行单个基准用例，返回结果字典"""
+    runner = ENGINES[engine]
+    if warmup:
+        warm_data = TestData()
+        warm_data.reset(warmup, concurrency)
+        runner(warm_data, url, concurrency, timeout)
+
+    test_data = TestData()
+    test_data.reset(total_requests, concurrency)
+    monitor = HarnessMonitor(test_data)
+    monitor.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    runner(test_data, url, concurrency, timeout)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    harness = monitor.stop()
+
+    completed = test_data.completed_requests
+    rts = sorted(test_data.response_times)
+    worker_time = wall * concurrency
+    overhead = None
+    if completed and engine not in NO_OVERHEAD_ENGINES:
+        overhead = round((worker_time - sum(rts) / 1000) / completed * 1e6, 2)
+    return {
+        "engine": engine,
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "completed": completed,
+        "errors": test_data.status_code_dict.get("ERROR", 0),
+        "wall_s": round(wall, 4),
+        "rps": round(completed / wall, 2) if wall > 0 else 0,
+        "mean_rt_ms": round(sum(rts) / len(rts), 3) if rts else 0,
+        "p50_rt_ms": percentile(rts, 50),
+        "p99_rt_ms": percentile(rts, 99),
+        "cpu_s": round(cpu, 4),
+        "cpu_us_per_req": round(cpu / completed * 1e6, 2) if completed else 0,
+        # 工作线程在计时区间之外花费的时间（取号、参数准备、统计加锁、日志格式化等）
+        "overhead_us_per_req": overhead,
+        "sched_lag_avg_ms": harness["sched_lag_avg_ms"],
+        "lock_wait_ms": harness["lock_wait_ms"],
+        "client_bound": harness["client_bound"],
+    }
+
+
+def start_bench_server(server_args):
+    """以子进程启动靶机，避免与被测客户端争抢GIL"""
+    cmd = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_server.py"), "--port", "0"] + server_args
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, text=True)
+    line = proc.stdout.readline().strip()
+    if not line.startswith("LISTENING"):
+        proc.kill()
+        raise RuntimeError(f"靶机启动失败：{line}")
+    return proc, int(line.split()[1])
+
+
+def collect_meta(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        commit = ""
+    gil_check = getattr(sys, "_is_gil_enabled", None)
+    return {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "gil_enabled": gil_check() if gil_check else True,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "server": {"latency_ms": args.latency_ms, "body_size": args.body_size, "status_mix": args.status_mix},
+    }
+
+
+def scaling_table(results):
+    """每个引擎相对最低并发的加速比与并行效率（加速比 / 线程倍数）"""
+    rows = []
+    for engine in dict.fromkeys(r["engine"] for r in results):
+        cases = sorted((r for r in results if r["engine"] == engine), key=lambda r: r["concurrency"])
+        base = cases[0]
+        for r in cases:
+            speedup = r["rps"] / base["rps"] if base["rps"] else 0
+            rows.append({"engine": engine, "concurrency": r["concurrency"], "rps": r["rps"], "speedup": round(speedup, 2),
+                         "efficiency": round(speedup / (r["concurrency"] / base["concurrency"]), 2)})
+    return rows
+
+
+def format_scaling(rows, label=""):
+    lines = [f"📈 扩展性{f'（{label}）' if label else ''}：引擎 | 并发 | req/s | 加速比 | 并行效率"]
+    for r in rows:
+        lines.append(f"   {r['engine']:<20} {r['concurrency']:>5} {r['rps']:>12} {r['speedup']:>7}x {r['efficiency']:>7}")
+    return "\n".join(lines)
+
+
+def run_interpreters(interpreters, argv):
+    """用多个解释器（如 python3.13 / python3.13t）分别运行本基准，汇总各自的扩展性对比"""
+    runs = []
+    for exe in interpreters:
+        out = os.path.join(RESULT_DIR, f"bench_{os.path.basename(exe)}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        print(f"▶ {exe}", flush=True)
+        code = subprocess.run([exe, os.path.abspath(__file__), *argv, "--out", out]).returncode
+        if code != 0 or not os.path.exists(out):
+            print(f"❌ {exe} 运行失败（退出码 {code}）")
+            continue
+        with open(out, "r", encoding="utf-8") as f:
+            report = json.load(f)
+        meta = report["meta"]
+        runs.append({"interpreter": exe, "python": meta["python"], "gil_enabled": meta["gil_enabled"],
+                     "report": out, "scaling": scaling_table(report["results"])})
+    for run in runs:
+        print(format_scaling(run["scaling"], f"{run['interpreter']} {run['python']} GIL={'开' if run['gil_enabled'] else '关'}"))
+    out = os.path.join(RESULT_DIR, f"scaling_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"runs": runs}, f, ensure_ascii=False, indent=2)
+    print(f"扩展性对比已保存：{out}")
+    return 0 if len(runs) == len(interpreters) else 1
+
+
+def compare_results(current, baseline, tolerance):
+    """与基线逐项对比，返回回退项列表"""
+    base_index = {(r["engine"], r["concurrency"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        base = base_index.get((result["engine"], result["concurrency"]))
+        if not base:
+            continue
+        for metric, higher_is_better in COMPARE_METRICS:
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None or old <= 0:
+                continue  # 未计算或基线非正（相对变化的符号会反转），不参与对比
+            change = (new - old) / old
+            worse = change < -tolerance if higher_is_better else change > tolerance
+            if worse:
+                regressions.append(f"{result['engine']} @并发{result['concurrency']} {metric}: {old} → {new} ({change:+.1%})")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PyApiPress 发压能力基准测试")
+    parser.add_argument("--engines", default=",".join(ENGINES), help="逗号分隔的引擎名")
+    parser.add_argument("--concurrency", default="1,4,16", help="逗号分隔的并发数列表")
+    parser.add_argument("--requests", type=int, default=2000, help="每个用例的请求数")
+    parser.add_argument("--warmup", type=int, default=50, help="每个用例正式计时前的预热请求数")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="靶机服务延迟(ms)")
+    parser.add_argument("--body-size", type=int, default=64, help="靶机响应体字节数")
+    parser.add_argument("--status-mix", default="200:100", help="靶机状态码分布")
+    parser.add_argument("--url", help="使用已有靶机地址，不自动启动")
+    parser.add_argument("--out", help="结果文件路径，默认 bench_results/bench_时间戳.json")
+    parser.add_argument("--compare", help="基线结果文件，用于回退检测")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="允许的性能波动比例")
+    parser.add_argument("--interpreters", help="逗号分隔的解释器路径，分别运行并对比扩展性（如 python3.13,python3.13t）")
+    args = parser.parse_args(argv)
+
+    if args.interpreters:
+        argv = list(sys.argv[1:] if argv is None else argv)
+        for i, arg in enumerate(argv):
+            if arg.startswith("--interpreters"):
+                del argv[i:i + (1 if "=" in arg else 2)]
+                break
+        os.makedirs(RESULT_DIR, exist_ok=True)
+        return run_interpreters([e.strip() for e in args.interpreters.split(",") if e.strip()], argv)
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        parser.error(f"未知引擎：{unknown}，可选：{list(ENGINES)}")
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    server = None
+    url = args.url
+    if not url and engines != ["record_only"]:
+        server, port = start_bench_server(["--latency-ms", str(args.latency_ms), "--body-size", str(args.body_size), "--status-mix", args.status_mix])
+        url = f"http://127.0.0.1:{port}/"
+
+    report = {"meta": collect_meta(args), "results": []}
+    try:
+        for engine in engines:
+            for concurrency in levels:
+                result = run_case(engine, url, concurrency, args.requests, warmup=args.warmup)
+                report["results"].append(result)
+                print(f"{engine:<20} 并发{concurrency:<4} {result['rps']:>10} req/s | CPU {result['cpu_us_per_req']:>8} µs/req | "
+                      f"开销 {'-' if result['overhead_us_per_req'] is None else result['overhead_us_per_req']:>8} µs/req | p99 {result['p99_rt_ms']} ms | 错误 {result['errors']}", flush=True)
+    finally:
+        if server:
+            server.kill()
+
+    out = args.out or os.path.join(RESULT_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存：{out}")
+    if len(levels) > 1:
+        print(format_scaling(scaling_table(report["results"]), f"Python {report['meta']['python']} GIL={'开' if report['meta']['gil_enabled'] else '关'}"))
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.tolerance)
+        if regressions:
+            print("⚠️ 检测到性能回退：")
+            for item in regressions:
+                print(f"  - {item}")
+            return 1
+        print("✅ 未检测到超出容差的性能回退")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
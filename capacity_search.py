@@ -0,0 +1,162 @@
+import threading
+import time
+
+from press_engine import TestData, WarmupPlan, cancel_run, send_request
+from http_timing import new_session
+
+# ===================== 容量探测：最大可持续吞吐 / 拐点搜索 =====================
+# 在给定SLO（p99响应时间、错误率）下自动寻找服务容量：
+#   1. 爬坡：从起始并发开始按倍数递增，每步压测固定时长
+#   2. 二分：SLO首次被打破后，在"最后达标并发"与"首个不达标并发"之间二分，直到区间足够小
+# 各步之间复用同一批Session（热连接），新增的线程在计时前先预热建连；
+# 打破SLO后先冷却再继续，避免在服务已过载时连续施压
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+class SearchConfig:
+    """探测参数"""
+    def __init__(self, slo_p99_ms=300.0, slo_error_pct=1.0, start_concurrency=1, max_concurrency=256,
+                 step_seconds=10.0, growth=2.0, resolution=0.1, cooldown_seconds=2.0):
+        self.slo_p99_ms = slo_p99_ms
+        self.slo_error_pct = slo_error_pct
+        self.start_concurrency = start_concurrency
+        self.max_concurrency = max_concurrency
+        self.step_seconds = step_seconds
+        self.growth = growth
+        self.resolution = resolution  # 二分终止条件：区间宽度 ≤ 最后达标并发 × resolution（至少为1）
+        self.cooldown_seconds = cooldown_seconds
+
+
+class CapacitySearch:
+    """按步施压并记录 负载-延迟 曲线；stop() 可随时中止"""
+    def __init__(self, url, method, headers, data_list, timeout, config, log=_noop):
+        self.url = url
+        self.method = method
+        self.headers = headers
+        self.data_list = data_list
+        self.timeout = timeout
+        self.config = config
+        self.log = log
+        self.sessions = []  # 线程槽位 → Session，跨步复用
+        self.curve = []
+        self.stopped = False
+        self.test_data = None
+
+    def stop(self):
+        self.stopped = True
+        test_data = self.test_data
+        if test_data:
+            cancel_run(test_data)
+
+    def _sleep(self, seconds):
+        """可被 stop() 打断的等待"""
+        deadline = time.perf_counter() + seconds
+        while not self.stopped and time.perf_counter() < deadline:
+            time.sleep(min(0.1, max(deadline - time.perf_counter(), 0)))
+
+    def run_step(self, concurrency):
+        """以固定并发压测 step_seconds 秒，返回本步结果"""
+        while len(self.sessions) < concurrency:
+            self.sessions.append(new_session())
+        test_data = TestData()
+        test_data.reset(float("inf"), concurrency)  # 按时长结束，不限请求数
+        # 每个线程先发1次预热请求（已有热连接的线程几乎无开销），全部就绪后开始计时
+        test_data.warmup = WarmupPlan(test_data, concurrency)
+        self.test_data = test_data
+        threads = [threading.Thread(target=send_request, daemon=True,
+                                    args=(test_data, self.url, self.method, self.headers, self.data_list, self.timeout),
+                                    kwargs={"warmup": test_data.warmup, "session": self.sessions[i]})
+                   for i in range(concurrency)]
+        for t in threads:
+            t.start()
+        while not self.stopped and test_data.warmup.end_time == 0 and any(t.is_alive() for t in threads):
+            time.sleep(0.01)
+        self._sleep(self.config.step_seconds)
+        test_data.is_running = False
+        for t in threads:
+            t.join()
+        test_data.test_end_time = time.perf_counter()
+
+        completed = test_data.completed_requests
+        elapsed = test_data.test_end_time - test_data.test_start_time
+        errors = test_data.fail_count
+        step = {
+            "concurrency": concurrency,
+            "requests": completed,
+            "qps": round(completed / elapsed, 2) if elapsed > 0 else 0,
+            "avg_rt": round(test_data.rt_hist.mean(), 2),
+            "p50_rt": round(test_data.rt_hist.percentile(50), 2),
+            "p99_rt": round(test_data.rt_hist.percentile(99), 2),
+            "error_pct": round(errors / completed * 100, 2) if completed else 100.0,
+        }
+        step["passed"] = bool(completed) and step["p99_rt"] < self.config.slo_p99_ms and step["error_pct"] < self.config.slo_error_pct
+        self.curve.append(step)
+        self.log(f"🔍 探测 并发{concurrency}：QPS {step['qps']} | p99 {step['p99_rt']}ms | 错误率 {step['error_pct']}% | "
+                 f"{'✅ 达标' if step['passed'] else '❌ 超出SLO'}", "INFO" if step["passed"] else "WARN")
+        return step
+
+    def run(self):
+        """执行完整探测，返回结果字典"""
+        cfg = self.config
+        self.log(f"🔍 容量探测开始 | SLO：p99 < {cfg.slo_p99_ms}ms 且 错误率 < {cfg.slo_error_pct}% | 每步 {cfg.step_seconds}s", "INFO")
+        good, bad = 0, None
+        concurrency = max(int(cfg.start_concurrency), 1)
+        # 1. 爬坡
+        while not self.stopped and concurrency <= cfg.max_concurrency:
+            if self.run_step(concurrency)["passed"]:
+                good = concurrency
+                if concurrency == cfg.max_concurrency:
+                    break
+                concurrency = min(max(int(concurrency * cfg.growth), concurrency + 1), cfg.max_concurrency)
+            else:
+                bad = concurrency
+                break
+        # 2. 回退 + 二分
+        while not self.stopped and bad is not None and bad - good > max(1, int(good * cfg.resolution)):
+            self._sleep(cfg.cooldown_seconds)
+            mid = (good + bad) // 2
+            if mid <= good:
+                break
+            if self.run_step(mid)["passed"]:
+                good = mid
+            else:
+                bad = mid
+        for session in self.sessions:
+            session.close()
+        return self.result(good, bad)
+
+    def result(self, good, bad):
+        passed = [s for s in self.curve if s["passed"]]
+        best = max(passed, key=lambda s: s["qps"]) if passed else None
+        return {
+            "slo": {"p99_ms": self.config.slo_p99_ms, "error_pct": self.config.slo_error_pct},
+            "max_passing_concurrency": good or None,
+            "first_failing_concurrency": bad,
+            "best": best,
+            "curve": sorted(self.curve, key=lambda s: s["concurrency"]),
+            "stopped": self.stopped,
+        }
+
+
+def format_result(result):
+    """探测结果文本：结论 + 负载-延迟曲线"""
+    best = result["best"]
+    slo = result["slo"]
+    lines = [f"【容量探测结果】SLO：p99 < {slo['p99_ms']}ms 且 错误率 < {slo['error_pct']}%"
+             + ("（已手动中止）" if result["stopped"] else "")]
+    if best:
+        lines.append(f"🏁 最大可持续吞吐：{best['qps']} req/s @ 并发 {best['concurrency']}"
+                     f"（p99 {best['p99_rt']}ms，错误率 {best['error_pct']}%）")
+    else:
+        lines.append("🏁 起始并发即无法满足SLO，未找到可持续负载")
+    if result["first_failing_concurrency"]:
+        lines.append(f"⚠️ 拐点：并发 {result['first_failing_concurrency']} 起超出SLO")
+    lines.append("📈 负载-延迟曲线：")
+    lines.append("   并发 |      QPS |  平均RT |   p50 |   p99 | 错误率 | 结论")
+    for s in result["curve"]:
+        lines.append(f"   {s['concurrency']:>4} | {s['qps']:>8} | {s['avg_rt']:>7} | {s['p50_rt']:>5} | {s['p99_rt']:>5} | "
+                     f"{s['error_pct']:>5}% | {'✅' if s['passed'] else '❌'}")
+    return "\n".join(lines) + "\n"
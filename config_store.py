@@ -0,0 +1,176 @@
+import os
+import json
+import hashlib
+import sqlite3
+import tempfile
+
+# ===================== 配置索引存储 =====================
+# configs/ 目录下的 JSON 文件仍是唯一数据源，SQLite 仅作索引：
+# 按文件 mtime/大小增量同步，只重新解析有变化的文件，列表/搜索直接走索引
+CONFIG_DIR = "configs"
+INDEX_FILE_NAME = ".index.db"
+
+
+def atomic_write_json(file_path, config_data):
+    """原子写入JSON：先写同目录临时文件并落盘，再整体替换，避免写一半的损坏文件"""
+    dir_name = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp_", suffix=".json", dir=dir_name)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(config_data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def config_hash(config_data):
+    """配置内容指纹（与键顺序无关，忽略标签等不影响压测行为的字段）"""
+    data = {k: v for k, v in config_data.items() if k not in ("tags",)}
+    return hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+
+
+def parse_tags(tags):
+    """标签统一为去重后的小写列表，支持逗号/空格分隔的字符串或列表"""
+    if isinstance(tags, str):
+        tags = tags.replace("，", ",").replace(" ", ",").split(",")
+    if not isinstance(tags, (list, tuple)):
+        return []
+    result = []
+    for tag in tags:
+        tag = str(tag).strip().lower()
+        if tag and tag not in result:
+            result.append(tag)
+    return result
+
+
+class ConfigStore:
+    """配置索引：首次使用时自动导入已有JSON文件，之后按mtime增量同步"""
+    def __init__(self, config_dir=CONFIG_DIR):
+        self.config_dir = config_dir
+        os.makedirs(config_dir, exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(config_dir, INDEX_FILE_NAME))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS configs (
+                name TEXT PRIMARY KEY,
+                mtime_ns INTEGER NOT NULL,
+                size INTEGER NOT NULL,
+                target_url TEXT NOT NULL DEFAULT '',
+                request_method TEXT NOT NULL DEFAULT '',
+                tags TEXT NOT NULL DEFAULT ''
+            );
+            CREATE TABLE IF NOT EXISTS config_tags (
+                name TEXT NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (name, tag)
+            );
+            CREATE INDEX IF NOT EXISTS idx_configs_method ON configs(request_method);
+            CREATE INDEX IF NOT EXISTS idx_config_tags_tag ON config_tags(tag);
+        """)
+        self.conn.commit()
+
+    def config_path(self, name):
+        return os.path.join(self.config_dir, f"{name}.json")
+
+    def _index_entry(self, name, stat, config_data):
+        """写入/更新单个配置的索引行（调用方负责提交事务）"""
+        tags = parse_tags(config_data.get("tags", []))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO configs (name, mtime_ns, size, target_url, request_method, tags) VALUES (?, ?, ?, ?, ?, ?)",
+            (name, stat.st_mtime_ns, stat.st_size, str(config_data.get("target_url", "")),
+             str(config_data.get("request_method", "")).upper(), ",".join(tags))
+        )
+        self.conn.execute("DELETE FROM config_tags WHERE name = ?", (name,))
+        self.conn.executemany("INSERT INTO config_tags (name, tag) VALUES (?, ?)", [(name, t) for t in tags])
+
+    def sync(self):
+        """增量同步：scandir 只取目录项元数据，仅解析新增/修改过的文件，删除已不存在的索引"""
+        indexed = {row[0]: (row[1], row[2]) for row in self.conn.execute("SELECT name, mtime_ns, size FROM configs")}
+        seen = set()
+        with self.conn:
+            for entry in os.scandir(self.config_dir):
+                if not entry.is_file() or not entry.name.endswith(".json") or entry.name.startswith(".tmp_"):
+                    continue
+                name = entry.name[:-5]
+                seen.add(name)
+                stat = entry.stat()
+                if indexed.get(name) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                try:
+                    with open(entry.path, "r", encoding="utf-8") as f:
+                        config_data = json.load(f)
+                    if not isinstance(config_data, dict):
+                        config_data = {}
+                except Exception:
+                    # 损坏的文件仍列出，便于用户发现并修复/删除
+                    config_data = {}
+                self._index_entry(name, stat, config_data)
+            for name in set(indexed) - seen:
+                self.conn.execute("DELETE FROM configs WHERE name = ?", (name,))
+                self.conn.execute("DELETE FROM config_tags WHERE name = ?", (name,))
+
+    def list_names(self):
+        """按名称排序列出所有配置"""
+        self.sync()
+        return [row[0] for row in self.conn.execute("SELECT name FROM configs ORDER BY name")]
+
+    def search(self, keyword="", method=None, tag=None):
+        """按 名称/URL 关键字、请求方法、标签 组合检索"""
+        self.sync()
+        sql = "SELECT DISTINCT c.name FROM configs c"
+        where, args = [], []
+        if tag:
+            sql += " JOIN config_tags t ON t.name = c.name"
+            where.append("t.tag = ?")
+            args.append(tag.strip().lower())
+        if method:
+            where.append("c.request_method = ?")
+            args.append(method.strip().upper())
+        if keyword:
+            where.append("(c.name LIKE ? OR c.target_url LIKE ?)")
+            args.extend([f"%{keyword}%"] * 2)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY c.name"
+        return [row[0] for row in self.conn.execute(sql, args)]
+
+    def query(self, text):
+        """解析搜索框文本：method:POST tag:order 其余词作为名称/URL关键字"""
+        keyword_parts, method, tag = [], None, None
+        for token in text.split():
+            lower = token.lower()
+            if lower.startswith("method:"):
+                method = token[7:] or None
+            elif lower.startswith("tag:"):
+                tag = token[4:] or None
+            else:
+                keyword_parts.append(token)
+        return self.search(" ".join(keyword_parts), method, tag)
+
+    def exists(self, name):
+        return os.path.exists(self.config_path(name))
+
+    def load(self, name):
+        with open(self.config_path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, name, config_data):
+        """原子写入配置文件并同步更新索引"""
+        file_path = self.config_path(name)
+        atomic_write_json(file_path, config_data)
+        with self.conn:
+            self._index_entry(name, os.stat(file_path), config_data)
+        return file_path
+
+    def delete(self, name):
+        file_path = self.config_path(name)
+        if not os.path.exists(file_path):
+            return False
+        os.remove(file_path)
+        with self.conn:
+            self.conn.execute("DELETE FROM configs WHERE name = ?", (name,))
+            self.conn.execute("DELETE FROM config_tags WHERE name = ?", (name,))
+        return True
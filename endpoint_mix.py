@@ -0,0 +1,113 @@
+import json
+
+from payload_gen import PayloadRenderer
+
+# ===================== 多接口加权混合压测 =====================
+# 配置示例（"endpoints" 字段，JSON数组）：
+#   [{"name": "登录", "url": "https://api.xx.com/login", "method": "POST", "data": {"u": "a"}, "weight": 1},
+#    {"name": "列表", "url": "https://api.xx.com/list", "method": "GET", "weight": 8},
+#    {"name": "详情", "url": "https://api.xx.com/item", "method": "GET", "headers": {"token": "x"}, "weight": 3}]
+# 所有接口在同一轮压测内由同一批工作线程发出（每个线程一个Session，同主机接口共用连接池），
+# 请求按全局序号查预先生成的平滑加权轮询表分配接口，无需加锁，长期比例严格等于权重比。
+# 未填写的 url/method/headers/data 沿用主界面的配置
+
+MAX_SCHEDULE = 1000  # 轮询表最大长度，权重之和过大时按比例缩放
+
+
+def parse_endpoints(text, default_url="", default_method="GET", default_headers=None, default_data_list=None):
+    """解析接口组合配置，返回 Endpoint 列表（未配置时为空列表）；格式错误抛 ValueError"""
+    text = (text or "").strip()
+    if not text:
+        return []
+    try:
+        items = json.loads(text)
+    except Exception as e:
+        raise ValueError(f"接口组合不是合法JSON：{e}")
+    if not isinstance(items, list) or not items:
+        raise ValueError("接口组合必须是非空JSON数组")
+    endpoints = []
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            raise ValueError(f"第{i + 1}个接口配置必须是JSON对象")
+        name = str(item.get("name") or f"接口{i + 1}")
+        url = (item.get("url") or default_url).strip()
+        method = (item.get("method") or default_method).upper()
+        if not url.startswith(("http://", "https://")):
+            raise ValueError(f"接口 {name} 的URL必须以 http:// 或 https:// 开头")
+        if method not in ("GET", "POST", "PUT", "DELETE"):
+            raise ValueError(f"接口 {name} 的请求方法不支持：{method}")
+        try:
+            weight = float(item.get("weight", 1))
+        except (TypeError, ValueError):
+            weight = -1
+        if weight <= 0:
+            raise ValueError(f"接口 {name} 的权重必须为正数")
+        if any(e.name == name for e in endpoints):
+            raise ValueError(f"接口名称重复：{name}")
+        headers = item["headers"] if "headers" in item else (default_headers or {})
+        data = item["data"] if "data" in item else default_data_list
+        data_list = data if isinstance(data, list) else [data if data is not None else {}]
+        endpoints.append(Endpoint(name, url, method, headers, data_list, weight))
+    return endpoints
+
+
+class Endpoint:
+    """混合压测中的单个接口"""
+    def __init__(self, name, url, method, headers, data_list, weight):
+        self.name = name
+        self.url = url
+        self.method = method
+        self.headers = headers
+        self.data_list = data_list
+        self.weight = weight
+        self.renderer = None  # 启用数据生成器时的 PayloadRenderer
+
+
+def _integer_weights(weights):
+    if all(float(w).is_integer() for w in weights) and sum(weights) <= MAX_SCHEDULE:
+        return [int(w) for w in weights]
+    scale = MAX_SCHEDULE / sum(weights)
+    return [max(int(round(w * scale)), 1) for w in weights]
+
+
+def smooth_schedule(weights):
+    """平滑加权轮询：返回一轮的接口下标序列，同一接口尽量均匀分散而非连续出现"""
+    current = [0] * len(weights)
+    total = sum(weights)
+    schedule = []
+    for _ in range(total):
+        for i, w in enumerate(weights):
+            current[i] += w
+        best = max(range(len(weights)), key=lambda i: current[i])
+        current[best] -= total
+        schedule.append(best)
+    return schedule
+
+
+class EndpointMix:
+    """按全局请求序号确定接口与该接口自己的数据序号（无共享状态，线程安全）"""
+    def __init__(self, endpoints):
+        self.endpoints = endpoints
+        self.int_weights = _integer_weights([e.weight for e in endpoints])
+        self.schedule = smooth_schedule(self.int_weights)
+        # 轮询表中每个位置之前同一接口已出现的次数，用于推算接口内的数据序号
+        seen = [0] * len(endpoints)
+        self.ordinal = []
+        for index in self.schedule:
+            self.ordinal.append(seen[index])
+            seen[index] += 1
+
+    def pick(self, seq):
+        """返回 (接口, 接口内序号)"""
+        cycle, pos = divmod(seq, len(self.schedule))
+        index = self.schedule[pos]
+        return self.endpoints[index], cycle * self.int_weights[index] + self.ordinal[pos]
+
+    def attach_generator(self, generator):
+        """为每个接口绑定合成数据渲染器（共用同一生成器，行仍全局唯一）"""
+        for endpoint in self.endpoints:
+            endpoint.renderer = PayloadRenderer(generator, endpoint.headers, endpoint.data_list)
+
+    def shares(self):
+        total = float(sum(self.int_weights))
+        return {e.name: round(w / total * 100, 2) for e, w in zip(self.endpoints, self.int_weights)}
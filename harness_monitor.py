@@ -0,0 +1,178 @@
+import os
+import sys
+import threading
+import time
+
+# ===================== 压测机自检：发压端饱和检测 =====================
+# 压测机CPU打满或GIL争用时，测得的响应时间会混入客户端排队时间。
+# 这里跟踪：进程CPU占用、调度延迟（线程计划唤醒时间与实际唤醒时间之差）、
+# 统计锁等待/持有耗时、UI(Tk)回调队列积压，超过阈值即判定为 client-bound 并告警
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+def gil_enabled():
+    check = getattr(sys, "_is_gil_enabled", None)
+    return check() if check else True
+
+
+class TimedLock:
+    """带耗时统计的锁：累计获取等待时长与持有时长（纳秒），用于评估统计锁争用"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._acquired_at = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.acquisitions = 0
+        self.wait_ns = 0
+        self.hold_ns = 0
+
+    def __enter__(self):
+        t0 = time.perf_counter_ns()
+        self._lock.acquire()
+        t1 = time.perf_counter_ns()
+        # 以下累加均在持锁期间进行，无需额外同步
+        self.wait_ns += t1 - t0
+        self.acquisitions += 1
+        self._acquired_at = t1
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.hold_ns += time.perf_counter_ns() - self._acquired_at
+        self._lock.release()
+        return False
+
+
+class HarnessMonitor:
+    """发压端自检线程：周期采样，超阈值时输出 client-bound 告警，结束后给出汇总"""
+    # 默认阈值：CPU占用按"可用核数"归一（有GIL时Python进程实际只能用满一个核）
+    DEFAULT_THRESHOLDS = {
+        "cpu_pct": 90.0,         # 进程CPU占用 ≥ 90%（相对可用核）
+        "sched_lag_ms": 20.0,    # 采样窗口内平均调度延迟 ≥ 20ms
+        "lock_wait_pct": 5.0,    # 统计锁等待时长占窗口时长 ≥ 5%
+        "ui_backlog": 5000,      # 待刷新到界面的日志/响应条目 ≥ 5000 条
+    }
+
+    def __init__(self, test_data, log=_noop, backlog_func=None, interval=1.0, probe_interval=0.01, thresholds=None):
+        self.test_data = test_data
+        self.log = log
+        self.backlog_func = backlog_func
+        self.interval = interval
+        self.probe_interval = probe_interval
+        self.thresholds = dict(self.DEFAULT_THRESHOLDS, **(thresholds or {}))
+        # 有GIL时一个进程最多用满一个核；无GIL构建可用满所有核
+        self.usable_cores = 1 if gil_enabled() else (os.cpu_count() or 1)
+        self._stop = threading.Event()
+        self._thread = None
+        self.reset()
+
+    def reset(self):
+        self.samples = 0
+        self.cpu_pct_max = 0.0
+        self.cpu_pct_sum = 0.0
+        self.sched_lag_max_ms = 0.0
+        self.sched_lag_sum_ms = 0.0
+        self.sched_lag_count = 0
+        self.ui_backlog_max = 0
+        self.lock_wait_ms = 0.0
+        self.lock_hold_ms = 0.0
+        self.lock_acquisitions = 0
+        self.breaches = {}  # 指标 → 超阈值的采样窗口数
+        self.wall_start = time.perf_counter()
+        self.cpu_start = time.process_time()
+
+    def start(self):
+        self.reset()
+        self.test_data.reset_lock_stats()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval * 2)
+        return self.summary()
+
+    def _run(self):
+        window_wall = time.perf_counter()
+        window_cpu = time.process_time()
+        window_wait_ns = self.test_data.lock_stats()[1]
+        window_lag_sum, window_lag_count = 0.0, 0
+        while not self._stop.is_set():
+            # 调度延迟探针：计划休眠 probe_interval，实际多睡的部分即线程调度/GIL排队延迟
+            intended = time.perf_counter() + self.probe_interval
+            time.sleep(self.probe_interval)
+            lag_ms = max(time.perf_counter() - intended, 0) * 1000
+            window_lag_sum += lag_ms
+            window_lag_count += 1
+            self.sched_lag_sum_ms += lag_ms
+            self.sched_lag_count += 1
+            self.sched_lag_max_ms = max(self.sched_lag_max_ms, lag_ms)
+
+            now = time.perf_counter()
+            if now - window_wall < self.interval:
+                continue
+            cpu_now = time.process_time()
+            wall_delta = now - window_wall
+            cpu_pct = (cpu_now - window_cpu) / wall_delta * 100 / self.usable_cores
+            wait_ns = self.test_data.lock_stats()[1]
+            lock_wait_pct = (wait_ns - window_wait_ns) / 1e9 / wall_delta * 100
+            backlog = self.backlog_func() if self.backlog_func else 0
+            avg_lag = window_lag_sum / window_lag_count if window_lag_count else 0
+
+            self.samples += 1
+            self.cpu_pct_sum += cpu_pct
+            self.cpu_pct_max = max(self.cpu_pct_max, cpu_pct)
+            self.ui_backlog_max = max(self.ui_backlog_max, backlog)
+            self._check({"cpu_pct": cpu_pct, "sched_lag_ms": avg_lag, "lock_wait_pct": lock_wait_pct, "ui_backlog": backlog})
+
+            window_wall, window_cpu, window_wait_ns = now, cpu_now, wait_ns
+            window_lag_sum, window_lag_count = 0.0, 0
+
+    def _check(self, values):
+        """超阈值判定：某项指标首次超标时输出告警，之后只计数，避免刷屏"""
+        labels = {"cpu_pct": ("CPU占用", "%"), "sched_lag_ms": ("调度延迟", "ms"),
+                  "lock_wait_pct": ("统计锁等待占比", "%"), "ui_backlog": ("UI队列积压", "个")}
+        for key, value in values.items():
+            if value < self.thresholds[key]:
+                continue
+            self.breaches[key] = self.breaches.get(key, 0) + 1
+            if self.breaches[key] == 1:
+                name, unit = labels[key]
+                self.log(f"⚠️ 压测机已成为瓶颈(client-bound)：{name} {round(value, 2)}{unit} ≥ 阈值 {self.thresholds[key]}{unit}，"
+                         f"响应时间可能包含客户端排队耗时", "WARN")
+
+    def summary(self):
+        acquisitions, wait_ns, hold_ns = self.test_data.lock_stats()
+        wall = time.perf_counter() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        return {
+            "cpu_pct_avg": round(cpu / wall * 100 / self.usable_cores, 2) if wall > 0 else 0,
+            "cpu_pct_max": round(self.cpu_pct_max, 2),
+            "usable_cores": self.usable_cores,
+            "sched_lag_avg_ms": round(self.sched_lag_sum_ms / self.sched_lag_count, 3) if self.sched_lag_count else 0,
+            "sched_lag_max_ms": round(self.sched_lag_max_ms, 3),
+            "lock_acquisitions": acquisitions,
+            "lock_wait_ms": round(wait_ns / 1e6, 3),
+            "lock_hold_ms": round(hold_ns / 1e6, 3),
+            "ui_backlog_max": self.ui_backlog_max,
+            "client_bound": bool(self.breaches),
+            "breaches": dict(self.breaches),
+        }
+
+
+def format_summary(summary):
+    """压测报告中的自检段落"""
+    if not summary:
+        return ""
+    names = {"cpu_pct": "CPU", "sched_lag_ms": "调度延迟", "lock_wait_pct": "统计锁", "ui_backlog": "UI队列"}
+    verdict = ("⚠️ client-bound（" + "、".join(names[k] for k in summary["breaches"]) + " 超阈值，结果含客户端排队耗时）"
+               if summary["client_bound"] else "✅ 正常")
+    return (f"🖥 压测机自检：CPU 平均 {summary['cpu_pct_avg']}% / 峰值 {summary['cpu_pct_max']}%（{summary['usable_cores']}核） | "
+            f"调度延迟 平均 {summary['sched_lag_avg_ms']}ms / 最大 {summary['sched_lag_max_ms']}ms\n"
+            f"🔒 统计锁：{summary['lock_acquisitions']} 次 | 等待 {summary['lock_wait_ms']}ms | 持有 {summary['lock_hold_ms']}ms | "
+            f"UI队列积压峰值 {summary['ui_backlog_max']} | 结论：{verdict}\n")
@@ -0,0 +1,269 @@
+import socket
+import ssl
+import threading
+import time
+import weakref
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.connection import HTTPConnection, HTTPSConnection
+
+# ===================== 分阶段请求计时 =====================
+# 通过自定义 urllib3 连接类拆分单个请求的耗时（单调高精度计时 time.perf_counter）：
+#   dns      域名解析
+#   connect  TCP 建连
+#   tls      TLS 完整握手（仅https新建连接）
+#   tls_resumed  TLS 会话恢复握手（仅 resume 连接模式下复用了会话的新建连接）
+#   ttfb     连接就绪 → 收到响应头（含请求发送+服务端处理）
+#   transfer 收到响应头 → 响应体读取完毕
+# 复用已有连接时不产生 dns/connect/tls 阶段，connect 的样本数即新建连接数，tls + tls_resumed 即TLS握手数
+#
+# 连接模式（new_session 的 conn_mode）：
+#   reuse   每个工作线程的连接池保持长连接（默认，测吞吐）
+#   resume  每个请求新建TCP+TLS连接，携带上次的TLS会话尝试恢复（测故障切换后客户端重连的建连能力）
+#   new     每个请求新建TCP+TLS连接且每次完整握手（测 TLS 终结点的握手上限）
+#
+# 快速取消：工作线程通过 set_cancel_scope 绑定本轮的 CancelScope，连接在建立/每次发送请求时登记套接字；
+# cancel() 对登记的套接字执行 shutdown，阻塞在收发上的请求立即返回，无需等到超时
+
+PHASES = ("dns", "connect", "tls", "tls_resumed", "ttfb", "transfer")
+CONN_MODES = {"reuse": "复用长连接", "resume": "每请求新建连接（允许TLS会话恢复）", "new": "每请求新建连接（TLS完整握手）"}
+
+_local = threading.local()
+
+
+class DNSCache:
+    """压测期间的DNS解析缓存：启用后同一 主机:端口 只解析一次，避免每次新建连接都查询DNS"""
+    def __init__(self):
+        self.enabled = False
+        self._cache = {}
+
+    def reset(self, enabled=True):
+        """每轮压测开始时清空，保证解析结果只在本轮内复用"""
+        self._cache = {}
+        self.enabled = enabled
+
+    def resolve(self, host, port):
+        key = (host, port)
+        if self.enabled:
+            infos = self._cache.get(key)
+            if infos is not None:
+                return infos
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+        if self.enabled:
+            self._cache[key] = infos
+        return infos
+
+
+dns_cache = DNSCache()
+
+
+class CancelScope:
+    """一轮压测的取消范围：弱引用登记在用的套接字，cancel() 后登记即关闭"""
+    def __init__(self):
+        self.cancelled = False
+        self._sockets = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def register(self, sock):
+        with self._lock:
+            if not self.cancelled:
+                self._sockets.add(sock)
+                return
+        _shutdown(sock)
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            sockets = list(self._sockets)
+            self._sockets.clear()
+        for sock in sockets:
+            _shutdown(sock)
+
+
+def _shutdown(sock):
+    try:
+        # 绕过 SSLSocket.shutdown（会清理其内部状态），直接关闭底层TCP收发
+        socket.socket.shutdown(sock, socket.SHUT_RDWR)
+    except (OSError, TypeError):
+        pass
+
+
+def set_cancel_scope(scope):
+    """绑定当前工作线程的取消范围（None 为不绑定）"""
+    _local.scope = scope
+
+
+def _register_socket(sock):
+    scope = getattr(_local, "scope", None)
+    if scope is None or sock is None:
+        return
+    # 复用连接时同一套接字每个请求都会走到这里：本线程已登记过则跳过，避免每请求争用范围锁
+    registered = getattr(_local, "registered", None)
+    if registered is not None and registered[0] is scope and registered[1]() is sock:
+        return
+    scope.register(sock)
+    _local.registered = (scope, weakref.ref(sock))
+
+
+def current_phases():
+    """当前线程正在计时的请求阶段记录"""
+    phases = getattr(_local, "phases", None)
+    if phases is None:
+        phases = _local.phases = dict.fromkeys(PHASES, 0.0)
+    return phases
+
+
+def _reset_phases():
+    _local.phases = dict.fromkeys(PHASES, 0.0)
+    _local.new_conn = False
+    _local.tls_resumed = False
+    return _local.phases
+
+
+class TimedHTTPConnection(HTTPConnection):
+    """拆分 DNS 解析与 TCP 建连耗时的连接"""
+    def _new_conn(self):
+        phases = current_phases()
+        t0 = time.perf_counter()
+        dns_host = self._dns_host
+        try:
+            infos = dns_cache.resolve(dns_host, self.port)
+        except socket.gaierror:
+            infos = None  # 交给父类按原逻辑报错（NameResolutionError）
+        t1 = time.perf_counter()
+        phases["dns"] = (t1 - t0) * 1000
+        if infos:
+            # 仅在建连期间以解析结果替换，Host头/SNI仍使用原域名
+            self._dns_host = infos[0][4][0]
+        try:
+            sock = super()._new_conn()
+        finally:
+            self._dns_host = dns_host
+        phases["connect"] = (time.perf_counter() - t1) * 1000
+        _local.new_conn = True
+        return sock
+
+    def connect(self):
+        super().connect()
+        _register_socket(self.sock)
+
+    def request(self, *args, **kwargs):
+        # 复用的连接可能建立于上一轮（如容量探测跨步复用Session），每次发送前登记到当前范围
+        _register_socket(self.sock)
+        return super().request(*args, **kwargs)
+
+
+class TimedHTTPSConnection(TimedHTTPConnection, HTTPSConnection):
+    """在 DNS/建连基础上额外统计 TLS 握手耗时（会话恢复的握手单独计入 tls_resumed）"""
+    def connect(self):
+        t0 = time.perf_counter()
+        super().connect()
+        phases = current_phases()
+        total = (time.perf_counter() - t0) * 1000
+        resumed = _local.tls_resumed = getattr(self.sock, "session_reused", False)
+        phases["tls_resumed" if resumed else "tls"] = max(total - phases["dns"] - phases["connect"], 0.0)
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """按主机缓存TLS会话的上下文：新建连接时携带上次的会话，服务端接受即为恢复握手（省去证书交换与密钥协商）。
+    每个 Session 的适配器一份（即每个工作线程一份），与 urllib3 默认上下文相同的校验设置，但不禁用会话票据"""
+    def __new__(cls, protocol=ssl.PROTOCOL_TLS_CLIENT):
+        return super().__new__(cls, protocol)
+
+    def __init__(self, protocol=ssl.PROTOCOL_TLS_CLIENT):
+        super().__init__()
+        self.minimum_version = ssl.TLSVersion.TLSv1_2
+        self.options |= ssl.OP_NO_COMPRESSION
+        self.sessions = {}  # 主机名 → 最近一次可恢复的会话
+
+    def wrap_socket(self, sock, server_hostname=None, **kwargs):
+        kwargs.setdefault("session", self.sessions.get(server_hostname))
+        ssl_sock = super().wrap_socket(sock, server_hostname=server_hostname, **kwargs)
+        self.remember(ssl_sock, server_hostname)
+        return ssl_sock
+
+    def remember(self, ssl_sock, server_hostname):
+        """记录连接上的会话（TLS 1.3 的会话票据在握手后随首个响应到达，归还连接时需再记录一次）"""
+        try:
+            session = ssl_sock.session
+        except (AttributeError, ValueError):
+            return
+        if session is not None:
+            self.sessions[server_hostname] = session
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class _FreshConnectionMixin:
+    """请求结束即关闭连接而不归还连接池，下一个请求必然新建连接"""
+    def _put_conn(self, conn):
+        if conn is not None:
+            context = getattr(conn, "ssl_context", None)
+            if isinstance(context, ResumingSSLContext) and conn.sock is not None:
+                context.remember(conn.sock, conn.server_hostname or conn.host)
+            conn.close()
+        super()._put_conn(None)
+
+
+class FreshHTTPConnectionPool(_FreshConnectionMixin, TimedHTTPConnectionPool):
+    pass
+
+
+class FreshHTTPSConnectionPool(_FreshConnectionMixin, TimedHTTPSConnectionPool):
+    pass
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """使用计时连接池的适配器；conn_mode 见文件头说明"""
+    def __init__(self, conn_mode="reuse", **kwargs):
+        if conn_mode not in CONN_MODES:
+            raise ValueError(f"未知的连接模式：{conn_mode}（可选 {' / '.join(CONN_MODES)}）")
+        self.conn_mode = conn_mode
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if self.conn_mode == "resume":
+            kwargs["ssl_context"] = ResumingSSLContext()
+        super().init_poolmanager(*args, **kwargs)
+        if self.conn_mode == "reuse":
+            self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+        else:
+            self.poolmanager.pool_classes_by_scheme = {"http": FreshHTTPConnectionPool, "https": FreshHTTPSConnectionPool}
+
+
+def new_session(conn_mode="reuse"):
+    """创建挂载计时适配器的 Session"""
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(conn_mode)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def timed_request(session, method, url, **kwargs):
+    """发送请求并读取完整响应体，返回 (resp, 总耗时ms, 各阶段耗时dict)"""
+    phases = _reset_phases()
+    start = time.perf_counter()
+    resp = session.request(method, url, stream=True, **kwargs)
+    headers_at = time.perf_counter()
+    resp.content  # 读取响应体（transfer 阶段），随后连接归还连接池
+    end = time.perf_counter()
+    setup = phases["dns"] + phases["connect"] + phases["tls"] + phases["tls_resumed"]
+    phases["ttfb"] = max((headers_at - start) * 1000 - setup, 0.0)
+    phases["transfer"] = (end - headers_at) * 1000
+    result = dict(phases)
+    if not _local.new_conn:
+        del result["dns"], result["connect"], result["tls"], result["tls_resumed"]
+    elif resp.url.startswith("http://"):
+        del result["tls"], result["tls_resumed"]
+    else:
+        del result["tls" if _local.tls_resumed else "tls_resumed"]
+    return resp, (end - start) * 1000, result
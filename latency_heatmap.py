@@ -0,0 +1,119 @@
+import html
+import tkinter as tk
+
+from press_stats import LatencyHeatmap
+
+# ===================== 延迟热力图（时间 × 延迟 × 次数） =====================
+# 横轴为压测时间（每秒一列），纵轴为对数延迟带（0.1ms ~ 65s），颜色为该秒落入该延迟带的请求数，
+# 用于发现均值/分位数掩盖的双峰分布与周期性卡顿（GC停顿、缓存刷新等）。
+# 界面绘制为增量式：每次刷新只重画"上次绘制的最后一秒"（可能未满）及之后的新列，
+# 超出可视窗口的旧列直接删除，单次刷新开销与压测时长无关。
+# 颜色按次数的固定对数档位（1、2~3、4~7 ...）取色，不随全局最大值变化，已画的列无需重绘。
+
+CELL_W = 3           # 每秒一列的像素宽度
+CELL_H = 4           # 每个延迟带的像素高度
+AXIS_W = 44          # 左侧纵轴标签宽度
+VISIBLE_COLUMNS = 600  # 画布中保留的最近列数（更早的列删除）
+# 次数档位配色：第 k 档为 [2^k, 2^(k+1)) 次，浅黄 → 深红
+PALETTE = ("#fff7bc", "#fee391", "#fec44f", "#fe9929", "#ec7014", "#cc4c02",
+           "#b2182b", "#8c0d25", "#67001f", "#3f0011")
+AXIS_LABELS_MS = (1, 10, 100, 1000, 10000)
+
+
+def count_color(n):
+    return PALETTE[min(n.bit_length() - 1, len(PALETTE) - 1)]
+
+
+def _label(ms):
+    return f"{ms // 1000}s" if ms >= 1000 else f"{ms}ms"
+
+
+def _band_y(band):
+    """延迟带的顶部像素坐标（高延迟在上）"""
+    return (LatencyHeatmap.BANDS - 1 - band) * CELL_H
+
+
+class HeatmapView:
+    """报表区的热力图画布；update 传入 press_engine.heatmap_columns 的增量列"""
+    def __init__(self, parent):
+        height = LatencyHeatmap.BANDS * CELL_H
+        self.axis = tk.Canvas(parent, width=AXIS_W, height=height, bg="#ffffff", highlightthickness=0)
+        self.axis.pack(side=tk.LEFT, fill=tk.Y)
+        self.canvas = tk.Canvas(parent, height=height, bg="#ffffff", highlightthickness=0)
+        self.canvas.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        for ms in AXIS_LABELS_MS:
+            y = _band_y(LatencyHeatmap.band_index(ms)) + CELL_H // 2
+            self.axis.create_text(AXIS_W - 4, y, text=_label(ms), anchor=tk.E, font=("Consolas", 7))
+            self.axis.create_line(AXIS_W - 2, y, AXIS_W, y)
+        self.reset()
+
+    def reset(self):
+        self.canvas.delete("all")
+        self.next_sec = 0    # 下次需要（重新）绘制的第一秒
+        self.first_sec = 0   # 画布中最早保留的一秒
+
+    def update(self, columns):
+        if not columns:
+            return
+        for sec, column in columns:
+            tag = f"c{sec}"
+            self.canvas.delete(tag)
+            x = sec * CELL_W
+            for band, n in column.items():
+                y = _band_y(band)
+                self.canvas.create_rectangle(x, y, x + CELL_W, y + CELL_H, fill=count_color(n), width=0, tags=tag)
+        last = columns[-1][0]
+        self.next_sec = last  # 最后一秒可能尚未结束，下次刷新重画
+        while self.first_sec < last - VISIBLE_COLUMNS:
+            self.canvas.delete(f"c{self.first_sec}")
+            self.first_sec += 1
+        left = self.first_sec * CELL_W
+        right = max((last + 1) * CELL_W, left + self.canvas.winfo_width())
+        self.canvas.configure(scrollregion=(left, 0, right, LatencyHeatmap.BANDS * CELL_H))
+        self.canvas.xview_moveto(1.0)
+
+
+def render_svg(heatmap):
+    """由 build_summary 的 heatmap 数据生成静态SVG（与界面同一配色与坐标）"""
+    columns = heatmap["columns"]
+    bands = len(heatmap["bands_ms"])
+    start = columns[0][0] if columns else 0
+    span = (columns[-1][0] - start + 1) if columns else 1
+    width, height = AXIS_W + span * CELL_W + 4, bands * CELL_H + 16
+    parts = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+             f'shape-rendering="crispEdges" font-family="Consolas, monospace" font-size="9">']
+    for ms in AXIS_LABELS_MS:
+        y = _band_y(LatencyHeatmap.band_index(ms)) + CELL_H // 2
+        parts.append(f'<text x="{AXIS_W - 4}" y="{y + 3}" text-anchor="end">{_label(ms)}</text>')
+    for sec, cells in columns:
+        x = AXIS_W + (sec - start) * CELL_W
+        for band, n in cells:
+            parts.append(f'<rect x="{x}" y="{_band_y(band)}" width="{CELL_W}" height="{CELL_H}" fill="{count_color(n)}">'
+                         f'<title>{sec}s ≤{heatmap["bands_ms"][band]}ms：{n}</title></rect>')
+    for sec in range(start - start % 10 + 10 if start % 10 else start, start + span, 10):
+        x = AXIS_W + (sec - start) * CELL_W
+        parts.append(f'<text x="{x}" y="{height - 3}" text-anchor="middle">{sec}s</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+def render_html(summary, report_text, title="API压测报告"):
+    """HTML报告：文本报表 + 延迟热力图 + 配色图例"""
+    legend = "".join(f'<span style="background:{color};padding:0 8px;margin-right:2px">{2 ** k}+</span>'
+                     for k, color in enumerate(PALETTE))
+    heatmap = summary.get("heatmap")
+    figure = render_svg(heatmap) if heatmap and heatmap["columns"] else "<p>暂无数据</p>"
+    return f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>body{{font-family:"微软雅黑",sans-serif;margin:20px}}pre{{background:#f6f8fa;padding:12px;white-space:pre-wrap}}
+.heatmap{{overflow-x:auto;border:1px solid #ddd;padding:6px}}.legend{{font-size:12px;margin:6px 0}}</style></head>
+<body>
+<h2>{html.escape(title)}</h2>
+<pre>{html.escape(report_text)}</pre>
+<h3>延迟热力图（横轴：时间/秒，纵轴：响应时间，颜色：请求数）</h3>
+<div class="legend">{legend}</div>
+<div class="heatmap">{figure}</div>
+</body>
+</html>
+"""
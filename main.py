@@ -1,33 +1,37 @@
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
-import requests
 import threading
 import time
+import collections
 from datetime import datetime
 import json
 import re
 import os
+from config_store import ConfigStore, CONFIG_DIR, atomic_write_json, config_hash
+import press_engine
+import http_timing
+from press_engine import TestData, send_request
+from http_timing import CONN_MODES
+from harness_monitor import HarnessMonitor, format_summary
+from capacity_search import SearchConfig, CapacitySearch, format_result as format_search_result
+from payload_gen import PayloadGenerator, PayloadRenderer, parse_specs
+from metrics_exporter import MetricsExporter, parse_listen
+from endpoint_mix import EndpointMix, parse_endpoints
+from bandwidth import REQUEST_ENCODINGS, WireOptions, format_bandwidth
+from run_history import RunHistory, format_trend
+from latency_heatmap import HeatmapView, render_html
+from upload_body import UploadSource, format_upload
+from ws_engine import WsLoad, format_websocket, is_ws_url
+from raw_engine import RawTarget, send_raw
+from replay import ReplayPlan, format_replay, parse_speed, replay_worker
+from slo_guard import SloGuard, format_abort, parse_rules
+from request_capture import DEFAULT_HEADER, format_capture, parse_capture
+from request_hooks import format_hooks, parse_hooks, redact_config
+from soak import SoakRecorder, format_soak, save_report as save_soak_report
 
 # ===================== 全局配置 & 数据管理 =====================
 # 配置文件路径（本地JSON存储，自动创建）
 CONFIG_FILE = "api_press_config.json"
-# 全局数据管理类
-class TestData:
-    """统一管理压测所有统计数据，线程安全"""
-    def __init__(self):
-        self.success_count = 0
-        self.fail_count = 0
-        self.response_times = []
-        self.status_code_dict = {}
-        self.current_request = 0
-        self.total_requests = 0
-        self.completed_requests = 0  # 新增:已完成的请求数
-        self.thread_num = 0
-        self.is_running = False
-        self.test_start_time = 0
-        self.test_end_time = 0
-        self.lock = threading.Lock()
-
 # 初始化全局对象
 test_data = TestData()
 root = tk.Tk()
@@ -37,36 +41,175 @@ log_text = None
 response_text = None  # 新增:右侧响应结果显示窗口
 success_rate_label, qps_label, avg_rt_label = None, None, None
 success_label, fail_label, total_time_label, min_rt_label, max_rt_label = None, None, None, None, None
+progress_label = None
 detail_text = None
+heatmap_view = None  # 报表区延迟热力图
+config_store = None  # configs/ 目录的索引存储（懒加载）
+# 界面统一刷新：工作线程只往缓冲区追加文本，由主线程定时器一次性刷入控件并渲染最新统计快照
+UI_REFRESH_MS = 250
+UI_BUFFER_MAX = 10000  # 每个缓冲区最多暂存的条目数，超出时丢弃最早的（界面只需展示最近内容）
+ui_refresh_ms = UI_REFRESH_MS
+log_buffer = collections.deque(maxlen=UI_BUFFER_MAX)  # (文本, 标签)
+response_buffer = collections.deque(maxlen=UI_BUFFER_MAX)
+run_active = False  # 主界面压测进行中（由刷新定时器检测结束）
+worker_threads = []  # 本轮压测的工作线程
+endpoint_mix = None  # 本轮的多接口组合（单接口压测时为None）
+run_history = None  # 压测历史库（懒加载）
+upload_source = None  # 本轮的上传文件映射（未启用上传时为None）
+ws_load = None  # 本轮的WebSocket压测（目标为 ws:// / wss:// 时创建）
+replay_plan = None  # 本轮的流量回放（填写回放文件时创建）
+slo_guard = None  # 本轮的自动中止守护（填写中止规则时创建）
+slo_summary = None  # 最近一次压测的自动中止汇总
+run_conn_mode = "reuse"  # 本轮的连接模式（见 http_timing.CONN_MODES）
+request_hooks = None  # 本轮的签名/动态请求头钩子链（填写签名钩子时创建）
+CANCEL_GRACE_SECONDS = 1.0  # 停止时等待在途请求被取消并计数的最长时间
+harness_monitor = None  # 压测机自检（每次压测启动时创建）
+harness_summary = None  # 最近一次压测的压测机自检汇总
+last_summary = None  # 最近一次压测报告数据（导出JSON用）
+active_search = None  # 正在进行的容量探测
+payload_generator = None  # 本轮压测的合成数据生成器
+soak_recorder = None  # 长稳模式记录器（仅长稳模式）
+soak_summary = None  # 最近一次长稳压测的汇总
+text_line_limit = None  # 日志/响应窗口最多保留的行数（长稳模式下限制，None为不限）
+SOAK_TEXT_LINES = 2000
+metrics_exporter = None  # 实时指标导出服务（填写指标端口时启用）
 
 # ===================== 参数保存/加载核心方法 =====================
-def save_config():
-    """保存当前压测配置到本地JSON文件（独立调用+自动调用）"""
-    config_data = {
+def collect_config_data():
+    """从界面控件收集当前压测配置"""
+    return {
         "target_url": controls["url_entry"].get().strip(),
         "request_method": controls["method_combo"].get(),
         "thread_num": controls["thread_entry"].get().strip(),
         "total_requests": controls["req_entry"].get().strip(),
         "timeout": controls["timeout_entry"].get().strip(),
         "headers": controls["headers_text"].get(1.0, tk.END).strip(),
-        "data": controls["data_text"].get(1.0, tk.END).strip()
+        "data": controls["data_text"].get(1.0, tk.END).strip(),
+        "tags": controls["tags_entry"].get().strip(),
+        "warmup": controls["warmup_entry"].get().strip(),
+        "slo_p99_ms": controls["slo_p99_entry"].get().strip(),
+        "slo_error_pct": controls["slo_error_entry"].get().strip(),
+        "search_step_seconds": controls["step_seconds_entry"].get().strip(),
+        "search_max_concurrency": controls["max_thread_entry"].get().strip(),
+        "generators": controls["generators_text"].get(1.0, tk.END).strip(),
+        "soak": controls["soak_var"].get(),
+        "soak_interval": controls["soak_interval_entry"].get().strip(),
+        "metrics_port": controls["metrics_port_entry"].get().strip(),
+        "ui_refresh_ms": controls["ui_refresh_entry"].get().strip(),
+        "endpoints": controls["endpoints_text"].get(1.0, tk.END).strip(),
+        "request_encoding": controls["encoding_combo"].get(),
+        "accept_encoding": controls["accept_encoding_entry"].get().strip(),
+        "upload_file": controls["upload_file_entry"].get().strip(),
+        "upload_chunk_kb": controls["upload_chunk_entry"].get().strip(),
+        "ws_rate": controls["ws_rate_entry"].get().strip(),
+        "engine": controls["engine_combo"].get(),
+        "pipeline_depth": controls["pipeline_depth_entry"].get().strip(),
+        "replay_file": controls["replay_file_entry"].get().strip(),
+        "replay_speed": controls["replay_speed_entry"].get().strip(),
+        "abort_error_pct": controls["abort_error_pct_entry"].get().strip(),
+        "abort_p99_ms": controls["abort_p99_entry"].get().strip(),
+        "abort_window": controls["abort_window_entry"].get().strip(),
+        "abort_refused": controls["abort_refused_entry"].get().strip(),
+        "conn_mode": controls["conn_mode_combo"].get(),
+        "capture_top_k": controls["capture_top_k_entry"].get().strip(),
+        "capture_failures": controls["capture_failures_entry"].get().strip(),
+        "request_id_header": controls["request_id_header_entry"].get().strip(),
+        "hooks": controls["hooks_text"].get(1.0, tk.END).strip()
     }
 
+def fill_config_controls(config_data):
+    """将配置数据填充到界面控件"""
+    controls["url_entry"].delete(0, tk.END)
+    controls["url_entry"].insert(0, config_data.get("target_url", "https://www.baidu.com"))
+
+    method = config_data.get("request_method", "GET")
+    controls["method_combo"].set(method)
+
+    controls["thread_entry"].delete(0, tk.END)
+    controls["thread_entry"].insert(0, config_data.get("thread_num", "8"))
+
+    controls["req_entry"].delete(0, tk.END)
+    controls["req_entry"].insert(0, config_data.get("total_requests", "200"))
+
+    controls["timeout_entry"].delete(0, tk.END)
+    controls["timeout_entry"].insert(0, config_data.get("timeout", "5"))
+
+    controls["headers_text"].delete(1.0, tk.END)
+    controls["headers_text"].insert(tk.END, config_data.get("headers", '{"Content-Type": "application/json"}'))
+
+    controls["data_text"].delete(1.0, tk.END)
+    controls["data_text"].insert(tk.END, config_data.get("data", '{"username": "test", "password": "123456"}'))
+
+    tags = config_data.get("tags", "")
+    controls["tags_entry"].delete(0, tk.END)
+    controls["tags_entry"].insert(0, ",".join(tags) if isinstance(tags, list) else tags)
+
+    controls["warmup_entry"].delete(0, tk.END)
+    controls["warmup_entry"].insert(0, config_data.get("warmup", "0"))
+
+    for key, entry_name, default in [("slo_p99_ms", "slo_p99_entry", "300"), ("slo_error_pct", "slo_error_entry", "1"),
+                                     ("search_step_seconds", "step_seconds_entry", "10"), ("search_max_concurrency", "max_thread_entry", "256")]:
+        controls[entry_name].delete(0, tk.END)
+        controls[entry_name].insert(0, config_data.get(key, default))
+
+    controls["generators_text"].delete(1.0, tk.END)
+    controls["generators_text"].insert(tk.END, config_data.get("generators", ""))
+
+    controls["soak_var"].set(bool(config_data.get("soak", False)))
+    controls["soak_interval_entry"].delete(0, tk.END)
+    controls["soak_interval_entry"].insert(0, config_data.get("soak_interval", "60"))
+    controls["metrics_port_entry"].delete(0, tk.END)
+    controls["metrics_port_entry"].insert(0, config_data.get("metrics_port", ""))
+    controls["ui_refresh_entry"].delete(0, tk.END)
+    controls["ui_refresh_entry"].insert(0, config_data.get("ui_refresh_ms", str(UI_REFRESH_MS)))
+
+    controls["endpoints_text"].delete(1.0, tk.END)
+    controls["endpoints_text"].insert(tk.END, config_data.get("endpoints", ""))
+
+    controls["encoding_combo"].set(config_data.get("request_encoding", "none"))
+    controls["accept_encoding_entry"].delete(0, tk.END)
+    controls["accept_encoding_entry"].insert(0, config_data.get("accept_encoding", ""))
+    controls["upload_file_entry"].delete(0, tk.END)
+    controls["upload_file_entry"].insert(0, config_data.get("upload_file", ""))
+    controls["upload_chunk_entry"].delete(0, tk.END)
+    controls["upload_chunk_entry"].insert(0, config_data.get("upload_chunk_kb", "0"))
+    controls["ws_rate_entry"].delete(0, tk.END)
+    controls["ws_rate_entry"].insert(0, config_data.get("ws_rate", "1"))
+    controls["engine_combo"].set(config_data.get("engine", "requests"))
+    controls["pipeline_depth_entry"].delete(0, tk.END)
+    controls["pipeline_depth_entry"].insert(0, config_data.get("pipeline_depth", "1"))
+    controls["replay_file_entry"].delete(0, tk.END)
+    controls["replay_file_entry"].insert(0, config_data.get("replay_file", ""))
+    controls["replay_speed_entry"].delete(0, tk.END)
+    controls["replay_speed_entry"].insert(0, config_data.get("replay_speed", "1"))
+    for key, entry, default in (("abort_error_pct", "abort_error_pct_entry", ""), ("abort_p99_ms", "abort_p99_entry", ""),
+                                ("abort_window", "abort_window_entry", "10"), ("abort_refused", "abort_refused_entry", "")):
+        controls[entry].delete(0, tk.END)
+        controls[entry].insert(0, config_data.get(key, default))
+    controls["hooks_text"].delete(1.0, tk.END)
+    controls["hooks_text"].insert(tk.END, config_data.get("hooks", ""))
+    controls["conn_mode_combo"].set(config_data.get("conn_mode", "reuse"))
+    for key, entry, default in (("capture_top_k", "capture_top_k_entry", ""), ("capture_failures", "capture_failures_entry", ""),
+                                ("request_id_header", "request_id_header_entry", DEFAULT_HEADER)):
+        controls[entry].delete(0, tk.END)
+        controls[entry].insert(0, config_data.get(key, default))
+
+def save_config():
+    """保存当前压测配置到本地JSON文件（独立调用+自动调用）"""
+    config_data = collect_config_data()
+
     # 获取当前选中的配置
     selected_config = controls["config_list_combo"].get()
 
-    # 确定保存路径
-    if selected_config == "默认配置" or not selected_config:
-        config_file = CONFIG_FILE
-        config_name = "默认配置"
-    else:
-        config_dir = "configs"
-        config_file = os.path.join(config_dir, f"{selected_config}.json")
-        config_name = selected_config
-
     try:
-        with open(config_file, "w", encoding="utf-8") as f:
-            json.dump(config_data, f, ensure_ascii=False, indent=4)
+        # 确定保存路径
+        if selected_config == "默认配置" or not selected_config:
+            config_name = "默认配置"
+            atomic_write_json(CONFIG_FILE, config_data)
+            config_file = CONFIG_FILE
+        else:
+            config_name = selected_config
+            config_file = get_config_store().save(selected_config, config_data)
         messagebox.showinfo("保存成功", f"✅ 压测参数已保存到配置 '{config_name}'！")
         log_print(f"✅ 压测参数已保存到配置 '{config_name}'：{config_file}", "SUCCESS")
     except Exception as e:
@@ -82,42 +225,23 @@ def load_config():
         with open(CONFIG_FILE, "r", encoding="utf-8") as f:
             config_data = json.load(f)
         # 自动填充配置到控件
-        controls["url_entry"].delete(0, tk.END)
-        controls["url_entry"].insert(0, config_data.get("target_url", "https://www.baidu.com"))
-        
-        method = config_data.get("request_method", "GET")
-        controls["method_combo"].set(method)
-        
-        controls["thread_entry"].delete(0, tk.END)
-        controls["thread_entry"].insert(0, config_data.get("thread_num", "8"))
-        
-        controls["req_entry"].delete(0, tk.END)
-        controls["req_entry"].insert(0, config_data.get("total_requests", "200"))
-        
-        controls["timeout_entry"].delete(0, tk.END)
-        controls["timeout_entry"].insert(0, config_data.get("timeout", "5"))
-        
-        controls["headers_text"].delete(1.0, tk.END)
-        controls["headers_text"].insert(tk.END, config_data.get("headers", '{"Content-Type": "application/json"}'))
-        
-        controls["data_text"].delete(1.0, tk.END)
-        controls["data_text"].insert(tk.END, config_data.get("data", '{"username": "test", "password": "123456"}'))
-        
+        fill_config_controls(config_data)
         log_print(f"✅ 已加载历史压测配置，参数自动填充完成", "SUCCESS")
     except Exception as e:
         log_print(f"❌ 配置加载失败，使用默认参数：{str(e)}", "ERROR")
 
 # ===================== 配置文件管理方法 =====================
-def get_config_list():
-    """获取所有配置文件列表"""
-    config_dir = "configs"
-    if not os.path.exists(config_dir):
-        os.makedirs(config_dir)
-
-    config_files = []
-    for file in os.listdir(config_dir):
-        if file.endswith('.json'):
-            config_files.append(file[:-5])  # 去掉.json后缀
+def get_config_store():
+    """配置索引（懒加载，首次使用自动导入 configs/ 下已有的JSON文件）"""
+    global config_store
+    if config_store is None:
+        config_store = ConfigStore(CONFIG_DIR)
+    return config_store
+
+def get_config_list(search_text=""):
+    """获取配置列表，支持按 名称/URL、method:XXX、tag:XXX 过滤"""
+    store = get_config_store()
+    config_files = store.query(search_text) if search_text.strip() else store.list_names()
 
     # 检查默认配置文件
     if os.path.exists(CONFIG_FILE):
@@ -125,6 +249,10 @@ def get_config_list():
 
     return config_files if config_files else ["默认配置"]
 
+def filter_config_list(combo, search_text):
+    """搜索框输入时实时过滤配置下拉列表"""
+    combo['values'] = get_config_list(search_text)
+
 def save_config_as(combo):
     """另存为新的配置文件"""
     from tkinter import simpledialog
@@ -138,31 +266,17 @@ def save_config_as(combo):
         return
 
     config_name = config_name.strip()
-
-    # 创建配置目录
-    config_dir = "configs"
-    if not os.path.exists(config_dir):
-        os.makedirs(config_dir)
+    store = get_config_store()
 
     # 保存配置
-    config_file = os.path.join(config_dir, f"{config_name}.json")
-    if os.path.exists(config_file):
+    if store.exists(config_name):
         if not messagebox.askyesno("确认", f"配置 '{config_name}' 已存在，是否覆盖？"):
             return
 
-    config_data = {
-        "target_url": controls["url_entry"].get().strip(),
-        "request_method": controls["method_combo"].get(),
-        "thread_num": controls["thread_entry"].get().strip(),
-        "total_requests": controls["req_entry"].get().strip(),
-        "timeout": controls["timeout_entry"].get().strip(),
-        "headers": controls["headers_text"].get(1.0, tk.END).strip(),
-        "data": controls["data_text"].get(1.0, tk.END).strip()
-    }
+    config_data = collect_config_data()
 
     try:
-        with open(config_file, "w", encoding="utf-8") as f:
-            json.dump(config_data, f, ensure_ascii=False, indent=4)
+        config_file = store.save(config_name, config_data)
 
         # 更新配置列表
         combo['values'] = get_config_list()
@@ -181,21 +295,15 @@ def set_default_config(combo):
         messagebox.showwarning("提示", "请选择一个配置文件！")
         return
 
-    config_dir = "configs"
-    config_file = os.path.join(config_dir, f"{selected}.json")
-
-    if not os.path.exists(config_file):
+    store = get_config_store()
+    if not store.exists(selected):
         messagebox.showerror("错误", f"配置文件 '{selected}' 不存在！")
         return
 
     try:
-        # 读取配置
-        with open(config_file, "r", encoding="utf-8") as f:
-            config_data = json.load(f)
-
-        # 保存为默认配置
-        with open(CONFIG_FILE, "w", encoding="utf-8") as f:
-            json.dump(config_data, f, ensure_ascii=False, indent=4)
+        # 读取配置并保存为默认配置
+        config_data = store.load(selected)
+        atomic_write_json(CONFIG_FILE, config_data)
 
         messagebox.showinfo("成功", f"✅ '{selected}' 已设置为默认配置！")
         log_print(f"✅ 配置 '{selected}' 已设置为默认配置", "SUCCESS")
@@ -213,12 +321,8 @@ def delete_config(combo):
     if not messagebox.askyesno("确认", f"确定要删除配置 '{selected}' 吗？"):
         return
 
-    config_dir = "configs"
-    config_file = os.path.join(config_dir, f"{selected}.json")
-
     try:
-        if os.path.exists(config_file):
-            os.remove(config_file)
+        if get_config_store().delete(selected):
             combo['values'] = get_config_list()
             combo.set("默认配置")
             messagebox.showinfo("成功", f"✅ 配置 '{selected}' 已删除！")
@@ -240,41 +344,20 @@ def load_selected_config(combo):
         if not os.path.exists(CONFIG_FILE):
             log_print(f"ℹ️ 默认配置文件不存在", "INFO")
             return
-        config_file = CONFIG_FILE
-    else:
-        # 加载自定义配置
-        config_dir = "configs"
-        config_file = os.path.join(config_dir, f"{selected}.json")
-
-    if not os.path.exists(config_file):
+    elif not get_config_store().exists(selected):
         log_print(f"❌ 配置文件 '{selected}' 不存在", "ERROR")
         return
 
     try:
-        with open(config_file, "r", encoding="utf-8") as f:
-            config_data = json.load(f)
+        if selected == "默认配置":
+            with open(CONFIG_FILE, "r", encoding="utf-8") as f:
+                config_data = json.load(f)
+        else:
+            # 加载自定义配置
+            config_data = get_config_store().load(selected)
 
         # 填充配置到控件
-        controls["url_entry"].delete(0, tk.END)
-        controls["url_entry"].insert(0, config_data.get("target_url", "https://www.baidu.com"))
-
-        method = config_data.get("request_method", "GET")
-        controls["method_combo"].set(method)
-
-        controls["thread_entry"].delete(0, tk.END)
-        controls["thread_entry"].insert(0, config_data.get("thread_num", "8"))
-
-        controls["req_entry"].delete(0, tk.END)
-        controls["req_entry"].insert(0, config_data.get("total_requests", "200"))
-
-        controls["timeout_entry"].delete(0, tk.END)
-        controls["timeout_entry"].insert(0, config_data.get("timeout", "5"))
-
-        controls["headers_text"].delete(1.0, tk.END)
-        controls["headers_text"].insert(tk.END, config_data.get("headers", '{"Content-Type": "application/json"}'))
-
-        controls["data_text"].delete(1.0, tk.END)
-        controls["data_text"].insert(tk.END, config_data.get("data", '{"username": "test", "password": "123456"}'))
+        fill_config_controls(config_data)
 
         log_print(f"✅ 已加载配置：{selected}", "SUCCESS")
     except Exception as e:
@@ -305,7 +388,8 @@ def copy_log():
 def create_ui():
     """创建上下分区UI + 独立保存参数按钮 + 全功能集成"""
     global log_text, response_text, success_rate_label, qps_label, avg_rt_label
-    global success_label, fail_label, total_time_label, min_rt_label, max_rt_label, detail_text
+    global success_label, fail_label, total_time_label, min_rt_label, max_rt_label, progress_label, detail_text
+    global heatmap_view
 
     # 主窗口基础配置
     root.title("🐍 PyApiPress - API压力测试工具 (终极完整版)")
@@ -388,6 +472,194 @@ def create_ui():
     delete_btn = ttk.Button(config_btn_frame, text="删除", width=8, command=lambda: delete_config(config_list_combo))
     delete_btn.pack(side=tk.LEFT, padx=1)
 
+    # 第四行：配置搜索 + 标签
+    ttk.Label(cfg_grid, text="搜索配置：").grid(row=4, column=0, sticky=tk.W, padx=2, pady=3)
+    search_entry = ttk.Entry(cfg_grid, width=32)
+    search_entry.grid(row=4, column=1, columnspan=4, padx=2, pady=3, sticky=tk.W)
+    search_entry.bind("<KeyRelease>", lambda event: filter_config_list(config_list_combo, search_entry.get()))
+    ttk.Label(cfg_grid, text="(名称/URL 关键字，支持 method:POST tag:xxx)", font=("微软雅黑",8)).grid(row=4, column=5, columnspan=3, sticky=tk.W, padx=2, pady=3)
+
+    ttk.Label(cfg_grid, text="标签：").grid(row=5, column=0, sticky=tk.W, padx=2, pady=3)
+    tags_entry = ttk.Entry(cfg_grid, width=32)
+    tags_entry.grid(row=5, column=1, columnspan=4, padx=2, pady=3, sticky=tk.W)
+
+    ttk.Label(cfg_grid, text="预热：").grid(row=5, column=5, sticky=tk.W, padx=2, pady=3)
+    warmup_entry = ttk.Entry(cfg_grid, width=8)
+    warmup_entry.grid(row=5, column=6, padx=2, pady=3, sticky=tk.W)
+    warmup_entry.insert(0, "0")
+    ttk.Label(cfg_grid, text="(请求数，或如 10s 表示秒；不计入统计)", font=("微软雅黑",8)).grid(row=5, column=7, columnspan=3, sticky=tk.W, padx=2, pady=3)
+
+    # 第六行：容量探测 SLO 参数（起始并发取"并发数"）
+    ttk.Label(cfg_grid, text="SLO p99(ms)：").grid(row=6, column=0, sticky=tk.W, padx=2, pady=3)
+    slo_frame = ttk.Frame(cfg_grid)
+    slo_frame.grid(row=6, column=1, columnspan=9, sticky=tk.W, padx=2, pady=3)
+    slo_p99_entry = ttk.Entry(slo_frame, width=8)
+    slo_p99_entry.pack(side=tk.LEFT)
+    slo_p99_entry.insert(0, "300")
+    ttk.Label(slo_frame, text="错误率<(%)：").pack(side=tk.LEFT, padx=(8, 2))
+    slo_error_entry = ttk.Entry(slo_frame, width=6)
+    slo_error_entry.pack(side=tk.LEFT)
+    slo_error_entry.insert(0, "1")
+    ttk.Label(slo_frame, text="每步(秒)：").pack(side=tk.LEFT, padx=(8, 2))
+    step_seconds_entry = ttk.Entry(slo_frame, width=6)
+    step_seconds_entry.pack(side=tk.LEFT)
+    step_seconds_entry.insert(0, "10")
+    ttk.Label(slo_frame, text="最大并发：").pack(side=tk.LEFT, padx=(8, 2))
+    max_thread_entry = ttk.Entry(slo_frame, width=6)
+    max_thread_entry.pack(side=tk.LEFT)
+    max_thread_entry.insert(0, "256")
+
+    # 第七行：合成数据生成器（请求头/体中用 ${gen.名称} 引用）
+    ttk.Label(cfg_grid, text="数据生成器：", font=("微软雅黑",9,"bold")).grid(row=7, column=0, sticky=tk.NW, padx=2, pady=3)
+    generators_text = scrolledtext.ScrolledText(cfg_grid, width=48, height=2, font=("Consolas", 9))
+    generators_text.grid(row=7, column=1, columnspan=6, padx=2, pady=3, sticky=tk.W+tk.E)
+    ttk.Label(cfg_grid, text='例 {"uid": {"type": "int", "min": 1, "max": 99999}}\n类型：int/string/uuid/sequence/choice\n引用：${gen.uid}',
+              font=("微软雅黑",8), justify=tk.LEFT).grid(row=7, column=7, columnspan=3, sticky=tk.NW, padx=2, pady=3)
+
+    # 第八行：长稳模式（内存受限，按间隔落盘）+ 实时指标导出端口
+    soak_frame = ttk.Frame(cfg_grid)
+    soak_frame.grid(row=8, column=1, columnspan=9, sticky=tk.W, padx=2, pady=3)
+    soak_var = tk.BooleanVar(value=False)
+    ttk.Checkbutton(soak_frame, text="🕒 长稳模式", variable=soak_var).pack(side=tk.LEFT)
+    ttk.Label(soak_frame, text="汇总间隔(秒)：").pack(side=tk.LEFT, padx=(8, 2))
+    soak_interval_entry = ttk.Entry(soak_frame, width=6)
+    soak_interval_entry.pack(side=tk.LEFT)
+    soak_interval_entry.insert(0, "60")
+    ttk.Label(soak_frame, text=f"(不保留逐请求数据与日志，间隔汇总写入 soak_runs/，日志窗口仅保留最近 {SOAK_TEXT_LINES} 行)",
+              font=("微软雅黑",8)).pack(side=tk.LEFT, padx=(8, 2))
+    ttk.Label(soak_frame, text="📡 指标端口：").pack(side=tk.LEFT, padx=(12, 2))
+    metrics_port_entry = ttk.Entry(soak_frame, width=14)
+    metrics_port_entry.pack(side=tk.LEFT)
+    ttk.Label(soak_frame, text="(如 9464 仅本机；0.0.0.0:9464 对外开放；留空不启用)", font=("微软雅黑",8)).pack(side=tk.LEFT, padx=(4, 2))
+    ttk.Label(soak_frame, text="界面刷新(ms)：").pack(side=tk.LEFT, padx=(12, 2))
+    ui_refresh_entry = ttk.Entry(soak_frame, width=6)
+    ui_refresh_entry.pack(side=tk.LEFT)
+    ui_refresh_entry.insert(0, str(UI_REFRESH_MS))
+
+    # 第九行：多接口加权混合（填写后忽略上方单接口的 URL/方法，未填字段沿用上方配置）
+    ttk.Label(cfg_grid, text="接口组合：", font=("微软雅黑",9,"bold")).grid(row=9, column=0, sticky=tk.NW, padx=2, pady=3)
+    endpoints_text = scrolledtext.ScrolledText(cfg_grid, width=48, height=2, font=("Consolas", 9))
+    endpoints_text.grid(row=9, column=1, columnspan=6, padx=2, pady=3, sticky=tk.W+tk.E)
+    ttk.Label(cfg_grid, text='例 [{"name": "列表", "url": "...", "method": "GET", "weight": 8},\n     {"name": "下单", "url": "...", "method": "POST", "data": {}, "weight": 2}]\n留空为单接口压测',
+              font=("微软雅黑",8), justify=tk.LEFT).grid(row=9, column=7, columnspan=3, sticky=tk.NW, padx=2, pady=3)
+
+    # 第十行：传输选项（请求体压缩 / Accept-Encoding）
+    ttk.Label(cfg_grid, text="请求体压缩：").grid(row=10, column=0, sticky=tk.W, padx=2, pady=3)
+    wire_frame = ttk.Frame(cfg_grid)
+    wire_frame.grid(row=10, column=1, columnspan=9, sticky=tk.W, padx=2, pady=3)
+    encoding_combo = ttk.Combobox(wire_frame, values=list(REQUEST_ENCODINGS), width=8, state="readonly")
+    encoding_combo.pack(side=tk.LEFT)
+    encoding_combo.set("none")
+    ttk.Label(wire_frame, text="Accept-Encoding：").pack(side=tk.LEFT, padx=(12, 2))
+    accept_encoding_entry = ttk.Entry(wire_frame, width=20)
+    accept_encoding_entry.pack(side=tk.LEFT)
+    ttk.Label(wire_frame, text="(如 gzip / br / identity，留空使用默认值；请求体按数据组预压缩并缓存)", font=("微软雅黑",8)).pack(side=tk.LEFT, padx=(4, 2))
+
+    # 第十一行：大文件上传（POST/PUT 请求体改为内存映射的文件，所有线程共用一份映射）
+    ttk.Label(cfg_grid, text="上传文件：").grid(row=11, column=0, sticky=tk.W, padx=2, pady=3)
+    upload_frame = ttk.Frame(cfg_grid)
+    upload_frame.grid(row=11, column=1, columnspan=9, sticky=tk.W, padx=2, pady=3)
+    upload_file_entry = ttk.Entry(upload_frame, width=40)
+    upload_file_entry.pack(side=tk.LEFT)
+    ttk.Button(upload_frame, text="选择", width=6, command=lambda: choose_upload_file(upload_file_entry)).pack(side=tk.LEFT, padx=2)
+    ttk.Label(upload_frame, text="分块(KB)：").pack(side=tk.LEFT, padx=(12, 2))
+    upload_chunk_entry = ttk.Entry(upload_frame, width=6)
+    upload_chunk_entry.pack(side=tk.LEFT)
+    upload_chunk_entry.insert(0, "0")
+    ttk.Label(upload_frame, text="(留空不启用；0为整块发送；POST/PUT 请求体为该文件，忽略请求体参数与压缩)", font=("微软雅黑",8)).pack(side=tk.LEFT, padx=(4, 2))
+
+    # 第十二行：WebSocket（目标为 ws:// / wss:// 时生效：并发数=连接数，总请求数=总消息数，请求体=消息模板）
+    ttk.Label(cfg_grid, text="WS消息速率：").grid(row=12, column=0, sticky=tk.W, padx=2, pady=3)
+    ws_frame = ttk.Frame(cfg_grid)
+    ws_frame.grid(row=12, column=1, columnspan=9, sticky=tk.W, padx=2, pady=3)
+    ws_rate_entry = ttk.Entry(ws_frame, width=8)
+    ws_rate_entry.pack(side=tk.LEFT)
+    ws_rate_entry.insert(0, "1")
+    ttk.Label(ws_frame, text="条/秒/连接 (目标以 ws:// 或 wss:// 开头时启用：并发数为长连接数，总请求数为总消息数，请求体参数为消息模板；0为收到回复后立即发下一条)",
+              font=("微软雅黑",8)).pack(side=tk.LEFT, padx=(4, 2))
+
+    # 第十三行：发压引擎（requests 完整功能 / raw 原始套接字，可选HTTP/1.1流水线）
+    ttk.Label(cfg_grid, text="发压引擎：").grid(row=13, column=0, sticky=tk.W, padx=2, pady=3)
+    engine_frame = ttk.Frame(cfg_grid)
+    engine_frame.grid(row=13, column=1, columnspan=9, sticky=tk.W, padx=2, pady=3)
+    engine_combo = ttk.Combobox(engine_frame, values=["requests", "raw"], width=9, state="readonly")
+    engine_combo.pack(side=tk.LEFT)
+    engine_combo.set("requests")
+    ttk.Label(engine_frame, text="流水线深度：").pack(side=tk.LEFT, padx=(12, 2))
+    pipeline_depth_entry = ttk.Entry(engine_frame, width=6)
+    pipeline_depth_entry.pack(side=tk.LEFT)
+    pipeline_depth_entry.insert(0, "1")
+    ttk.Label(engine_frame, text="(raw：预编码请求报文直接写套接字，只解析状态行，单核发压能力约为 requests 的10倍；不输出逐请求日志，"
+              "不支持分阶段耗时/预热/多接口/上传/压缩；深度>1 为HTTP/1.1流水线，响应时间含排队)", font=("微软雅黑",8)).pack(side=tk.LEFT, padx=(4, 2))
+
+    # 第十四行：流量回放（nginx 访问日志 / HAR，按原始时间间隔重放到目标地址的主机）
+    ttk.Label(cfg_grid, text="回放文件：").grid(row=14, column=0, sticky=tk.W, padx=2, pady=3)
+    replay_frame = ttk.Frame(cfg_grid)
+    replay_frame.grid(row=14, column=1, columnspan=9, sticky=tk.W, padx=2, pady=3)
+    replay_file_entry = ttk.Entry(replay_frame, width=40)
+    replay_file_entry.pack(side=tk.LEFT)
+    ttk.Button(replay_frame, text="选择", width=6, command=lambda: choose_replay_file(replay_file_entry)).pack(side=tk.LEFT, padx=2)
+    ttk.Label(replay_frame, text="速度：").pack(side=tk.LEFT, padx=(12, 2))
+    replay_speed_entry = ttk.Entry(replay_frame, width=6)
+    replay_speed_entry.pack(side=tk.LEFT)
+    replay_speed_entry.insert(0, "1")
+    ttk.Label(replay_frame, text="(留空不启用；1为原始节奏，N为N倍速，max为最快；请求发往目标地址的主机，总请求数为最多回放条数，并发数为发送线程数)",
+              font=("微软雅黑",8)).pack(side=tk.LEFT, padx=(4, 2))
+
+    # 第十五行：自动中止（滚动窗口内错误率/p99超标或出现拒绝连接风暴时提前结束本轮）
+    ttk.Label(cfg_grid, text="自动中止：").grid(row=15, column=0, sticky=tk.W, padx=2, pady=3)
+    abort_frame = ttk.Frame(cfg_grid)
+    abort_frame.grid(row=15, column=1, columnspan=9, sticky=tk.W, padx=2, pady=3)
+    ttk.Label(abort_frame, text="错误率>").pack(side=tk.LEFT, padx=(0, 2))
+    abort_error_pct_entry = ttk.Entry(abort_frame, width=6)
+    abort_error_pct_entry.pack(side=tk.LEFT)
+    ttk.Label(abort_frame, text="%  p99>").pack(side=tk.LEFT, padx=(4, 2))
+    abort_p99_entry = ttk.Entry(abort_frame, width=7)
+    abort_p99_entry.pack(side=tk.LEFT)
+    ttk.Label(abort_frame, text="ms  窗口：").pack(side=tk.LEFT, padx=(4, 2))
+    abort_window_entry = ttk.Entry(abort_frame, width=5)
+    abort_window_entry.pack(side=tk.LEFT)
+    abort_window_entry.insert(0, "10")
+    ttk.Label(abort_frame, text="s  拒绝连接≥").pack(side=tk.LEFT, padx=(4, 2))
+    abort_refused_entry = ttk.Entry(abort_frame, width=6)
+    abort_refused_entry.pack(side=tk.LEFT)
+    ttk.Label(abort_frame, text="次 (留空不启用；错误率/p99按最近窗口计算，窗口未满或请求过少时不判定；触发后立即停止并在报告中记录触发条件)",
+              font=("微软雅黑",8)).pack(side=tk.LEFT, padx=(4, 2))
+
+    # 第十六行：连接模式（复用长连接测吞吐 / 每请求新建连接测建连与TLS握手能力）
+    ttk.Label(cfg_grid, text="连接模式：").grid(row=16, column=0, sticky=tk.W, padx=2, pady=3)
+    conn_frame = ttk.Frame(cfg_grid)
+    conn_frame.grid(row=16, column=1, columnspan=9, sticky=tk.W, padx=2, pady=3)
+    conn_mode_combo = ttk.Combobox(conn_frame, values=list(CONN_MODES), width=9, state="readonly")
+    conn_mode_combo.pack(side=tk.LEFT)
+    conn_mode_combo.set("reuse")
+    ttk.Label(conn_frame, text="(reuse：复用长连接；resume：每请求新建TCP+TLS连接并尝试TLS会话恢复；new：每请求新建连接且完整握手。"
+              "报告分别给出新建连接/秒与握手次数、耗时；raw 引擎与 WebSocket 固定为长连接)", font=("微软雅黑",8)).pack(side=tk.LEFT, padx=(4, 2))
+
+    # 第十七行：慢请求/失败请求捕获（注入请求ID头，报告列出最慢K个与失败请求，便于在服务端日志中定位）
+    ttk.Label(cfg_grid, text="请求捕获：").grid(row=17, column=0, sticky=tk.W, padx=2, pady=3)
+    capture_frame = ttk.Frame(cfg_grid)
+    capture_frame.grid(row=17, column=1, columnspan=9, sticky=tk.W, padx=2, pady=3)
+    ttk.Label(capture_frame, text="最慢").pack(side=tk.LEFT, padx=(0, 2))
+    capture_top_k_entry = ttk.Entry(capture_frame, width=6)
+    capture_top_k_entry.pack(side=tk.LEFT)
+    ttk.Label(capture_frame, text="个  失败最多").pack(side=tk.LEFT, padx=(4, 2))
+    capture_failures_entry = ttk.Entry(capture_frame, width=6)
+    capture_failures_entry.pack(side=tk.LEFT)
+    ttk.Label(capture_frame, text="条  请求ID头：").pack(side=tk.LEFT, padx=(4, 2))
+    request_id_header_entry = ttk.Entry(capture_frame, width=16)
+    request_id_header_entry.pack(side=tk.LEFT)
+    request_id_header_entry.insert(0, DEFAULT_HEADER)
+    ttk.Label(capture_frame, text="(留空或0不启用；每个请求注入唯一请求ID，报告与导出列出最慢请求与失败请求的ID/时刻/分阶段耗时；raw 引擎与 WebSocket 不支持)",
+              font=("微软雅黑",8)).pack(side=tk.LEFT, padx=(4, 2))
+
+    # 第十八行：逐请求签名 / 动态请求头钩子（HMAC-SHA256、时间戳/随机串、JWT）
+    ttk.Label(cfg_grid, text="签名钩子：", font=("微软雅黑",9,"bold")).grid(row=18, column=0, sticky=tk.NW, padx=2, pady=3)
+    hooks_text = scrolledtext.ScrolledText(cfg_grid, width=48, height=2, font=("Consolas", 9))
+    hooks_text.grid(row=18, column=1, columnspan=6, padx=2, pady=3, sticky=tk.W+tk.E)
+    ttk.Label(cfg_grid, text='例 [{"type": "timestamp", "header": "X-Ts"},\n     {"type": "hmac_sha256", "key_env": "API_SECRET", "header": "X-Sign"}]\n类型：timestamp/nonce/hmac_sha256/jwt，留空不启用',
+              font=("微软雅黑",8), justify=tk.LEFT).grid(row=18, column=7, columnspan=3, sticky=tk.NW, padx=2, pady=3)
+
     # ✅ 功能按钮组【核心新增：💾 保存参数按钮，置顶优先】
     btn_frame = ttk.Frame(cfg_grid)
     btn_frame.grid(row=1, column=7, rowspan=2, columnspan=3, padx=5, pady=2, sticky=tk.N+tk.W)
@@ -399,13 +671,17 @@ def create_ui():
     # 原有按钮排序优化
     start_btn = ttk.Button(btn_frame, text="▶ 开始压测", width=11, command=lambda: start_test(
         url_entry.get(), method_combo.get(), thread_entry.get(), req_entry.get(),
-        timeout_entry.get(), headers_text.get(1.0, tk.END), data_text.get(1.0, tk.END)
+        timeout_entry.get(), headers_text.get(1.0, tk.END), data_text.get(1.0, tk.END), warmup_entry.get(),
+        generators_text.get(1.0, tk.END), soak_var.get(), soak_interval_entry.get(), endpoints_text.get(1.0, tk.END)
     ))
     start_btn.pack(fill=tk.X, pady=1)
 
     stop_btn = ttk.Button(btn_frame, text="■ 停止压测", width=11, command=stop_test, state=tk.DISABLED)
     stop_btn.pack(fill=tk.X, pady=1)
 
+    search_btn = ttk.Button(btn_frame, text="🔍 容量探测", width=11, command=start_capacity_search)
+    search_btn.pack(fill=tk.X, pady=1)
+
     clear_btn = ttk.Button(btn_frame, text="🗑 清空日志", width=11, command=lambda: clear_log())
     clear_btn.pack(fill=tk.X, pady=1)
     
@@ -415,6 +691,9 @@ def create_ui():
     export_btn = ttk.Button(btn_frame, text="📤 导出报告", width=11, command=export_report)
     export_btn.pack(fill=tk.X, pady=1)
 
+    history_btn = ttk.Button(btn_frame, text="📈 历史趋势", width=11, command=show_history_trend)
+    history_btn.pack(fill=tk.X, pady=1)
+
     # 实时日志区（左右分栏）
     log_container = ttk.Frame(top_main_frame)
     log_container.pack(fill=tk.BOTH, expand=True, padx=2, pady=4)
@@ -475,6 +754,14 @@ def create_ui():
     ttk.Label(base_metric_frame, text="⚠️ 最大RT：", font=("微软雅黑",9)).grid(row=0, column=8, sticky=tk.W, padx=8, pady=2)
     max_rt_label = ttk.Label(base_metric_frame, text="-- ms", font=("微软雅黑",9,"bold"), foreground="#cc6600")
     max_rt_label.grid(row=0, column=9, sticky=tk.W, padx=2, pady=2)
+    ttk.Label(base_metric_frame, text="📶 进度：", font=("微软雅黑",9)).grid(row=0, column=10, sticky=tk.W, padx=8, pady=2)
+    progress_label = ttk.Label(base_metric_frame, text="--", font=("微软雅黑",9,"bold"), foreground="#0055cc")
+    progress_label.grid(row=0, column=11, sticky=tk.W, padx=2, pady=2)
+
+    # 延迟热力图区（横轴时间，纵轴对数延迟，颜色为请求数；压测中增量绘制）
+    heatmap_frame = ttk.LabelFrame(bottom_report_frame, text="🌡 延迟热力图（每秒一列，颜色越深请求越多）", padding=4)
+    heatmap_frame.pack(fill=tk.X, padx=2, pady=3)
+    heatmap_view = HeatmapView(heatmap_frame)
 
     # 详情数据区
     detail_frame = ttk.LabelFrame(bottom_report_frame, text="详细数据明细", padding=6)
@@ -488,29 +775,71 @@ def create_ui():
         "url_entry": url_entry, "method_combo": method_combo, "thread_entry": thread_entry,
         "req_entry": req_entry, "timeout_entry": timeout_entry,
         "headers_text": headers_text, "data_text": data_text,
-        "config_list_combo": config_list_combo
+        "config_list_combo": config_list_combo, "search_entry": search_entry, "tags_entry": tags_entry,
+        "warmup_entry": warmup_entry, "search_btn": search_btn,
+        "slo_p99_entry": slo_p99_entry, "slo_error_entry": slo_error_entry,
+        "step_seconds_entry": step_seconds_entry, "max_thread_entry": max_thread_entry,
+        "generators_text": generators_text, "soak_var": soak_var, "soak_interval_entry": soak_interval_entry,
+        "metrics_port_entry": metrics_port_entry, "ui_refresh_entry": ui_refresh_entry,
+        "endpoints_text": endpoints_text, "encoding_combo": encoding_combo, "accept_encoding_entry": accept_encoding_entry,
+        "upload_file_entry": upload_file_entry, "upload_chunk_entry": upload_chunk_entry,
+        "ws_rate_entry": ws_rate_entry, "engine_combo": engine_combo, "pipeline_depth_entry": pipeline_depth_entry,
+        "replay_file_entry": replay_file_entry, "replay_speed_entry": replay_speed_entry,
+        "abort_error_pct_entry": abort_error_pct_entry, "abort_p99_entry": abort_p99_entry,
+        "abort_window_entry": abort_window_entry, "abort_refused_entry": abort_refused_entry,
+        "conn_mode_combo": conn_mode_combo, "capture_top_k_entry": capture_top_k_entry,
+        "capture_failures_entry": capture_failures_entry, "request_id_header_entry": request_id_header_entry,
+        "hooks_text": hooks_text
     })
 
 # ===================== 核心功能函数 =====================
 def log_print(content, level="INFO"):
-    """带时间、带颜色的日志打印函数，线程安全"""
+    """带时间、带颜色的日志打印函数，线程安全（仅追加到缓冲区，由界面刷新定时器统一刷入）"""
     time_str = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     log_content = f"[{time_str}] [{level}] {content}\n"
-    root.after(0, lambda: log_text.insert(tk.END, log_content))
-    root.after(0, lambda: log_text.see(tk.END))
     tag = level if level in ["INFO", "SUCCESS", "ERROR", "WARN", "PROGRESS"] else "INFO"
-    root.after(0, lambda: log_text.tag_add(tag, log_text.index("end-2l"), log_text.index("end-1l")))
+    log_buffer.append((log_content, tag))
+
+def show_response(content, tag="RESPONSE"):
+    """在右侧响应结果窗口追加内容，线程安全（同上，经缓冲区刷入）"""
+    response_buffer.append((content, tag))
+
+def ui_backlog():
+    """待刷入界面的条目数（压测机自检用）"""
+    return len(log_buffer) + len(response_buffer)
+
+def flush_text(widget, buffer):
+    """在Tk主线程中把缓冲区内容一次性插入控件（一次insert调用 + 一次滚动）"""
+    if not buffer:
+        return
+    args = []
+    for _ in range(len(buffer)):
+        content, tag = buffer.popleft()
+        args.extend((content, tag))
+    widget.insert(tk.END, *args)
+    trim_text(widget)
+    widget.see(tk.END)
+
+def trim_text(widget):
+    """超出行数上限时删除最早的行，保证文本控件内存有界"""
+    if text_line_limit is None:
+        return
+    lines = int(widget.index("end-1c").split(".")[0])
+    if lines > text_line_limit:
+        widget.delete(1.0, f"{lines - text_line_limit + 1}.0")
 
 def clear_log():
     """清空实时日志区和响应结果窗口"""
+    log_buffer.clear()
+    response_buffer.clear()
     log_text.delete(1.0, tk.END)
     response_text.delete(1.0, tk.END)
     log_print("日志区已清空，准备新一轮压测", "INFO")
 
 def validate_params(url, thread_num, total_req, timeout):
     """压测参数合法性校验"""
-    if not re.match(r'^https?://', url.strip()):
-        messagebox.showerror("参数错误", "目标API地址格式错误！必须以 http:// 或 https:// 开头")
+    if not re.match(r'^(https?|wss?)://', url.strip()):
+        messagebox.showerror("参数错误", "目标API地址格式错误！必须以 http:// 或 https://（WebSocket 为 ws:// 或 wss://）开头")
         return False
     try:
         thread_num = int(thread_num)
@@ -530,91 +859,91 @@ def validate_params(url, thread_num, total_req, timeout):
 
 def parse_json(text):
     """JSON文本解析"""
-    try:
-        return json.loads(text.strip()) if text.strip() else {}
-    except Exception as e:
-        log_print(f"JSON格式解析失败：{str(e)}，将使用空字典", "WARN")
-        return {}
-
-def send_request(url, method, headers, data_list, timeout):
-    """单请求发送逻辑"""
-    session = requests.Session()
-    data_index = 0
-    while True:
-        with test_data.lock:
-            if not test_data.is_running or test_data.current_request >= test_data.total_requests:
-                break
-            test_data.current_request += 1
-            current = test_data.current_request
-            total = test_data.total_requests
-
-        # 从参数列表中获取当前请求的数据
-        data = data_list[data_index % len(data_list)] if isinstance(data_list, list) and data_list else data_list
-        data_index += 1
-
-        log_print(f"正在压测：{current}/{total} 次请求", "PROGRESS")
-
-        # 在右侧窗口显示请求参数
-        request_info = f"\n{'='*60}\n请求 #{current}\n{'='*60}\n"
-        request_info += f"URL: {url}\n"
-        request_info += f"Method: {method}\n"
-        request_info += f"Headers: {json.dumps(headers, ensure_ascii=False, indent=2)}\n"
-        request_info += f"Data: {json.dumps(data, ensure_ascii=False, indent=2)}\n"
-        root.after(0, lambda: response_text.insert(tk.END, request_info, "REQUEST"))
-        root.after(0, lambda: response_text.see(tk.END))
+    return press_engine.parse_json(text, log_print)
 
-        try:
-            start_time = time.time()
-            if method.upper() == "GET":
-                resp = session.get(url, headers=headers, timeout=timeout)
-            elif method.upper() in ["POST", "PUT", "DELETE"]:
-                resp = getattr(session, method.lower())(url, headers=headers, json=data, timeout=timeout)
-            else:
-                raise Exception(f"不支持的请求方法：{method}")
-            rt = round((time.time() - start_time) * 1000, 2)
-
-            # 在右侧窗口显示响应结果
-            response_info = f"\n响应 #{current}\n"
-            response_info += f"状态码: {resp.status_code}\n"
-            response_info += f"响应时间: {rt}ms\n"
-            try:
-                response_data = resp.json()
-                response_info += f"响应内容:\n{json.dumps(response_data, ensure_ascii=False, indent=2)}\n"
-            except:
-                response_info += f"响应内容:\n{resp.text[:1000]}\n"
-            root.after(0, lambda: response_text.insert(tk.END, response_info, "RESPONSE"))
-            root.after(0, lambda: response_text.see(tk.END))
-
-            # 使用锁保护统计数据更新
-            with test_data.lock:
-                test_data.response_times.append(rt)
-                code = resp.status_code
-                test_data.status_code_dict[code] = test_data.status_code_dict.get(code, 0) + 1
-                if 200 <= code < 300:
-                    test_data.success_count += 1
-                else:
-                    test_data.fail_count += 1
-                test_data.completed_requests += 1  # 新增:记录已完成的请求数
-
-            log_print(f"请求成功 | 状态码：{code} | 响应时间：{rt}ms", "SUCCESS")
-        except Exception as e:
-            error_info = f"\n错误 #{current}\n"
-            error_info += f"错误信息: {str(e)}\n"
-            root.after(0, lambda: response_text.insert(tk.END, error_info, "ERROR"))
-            root.after(0, lambda: response_text.see(tk.END))
-
-            # 使用锁保护统计数据更新
-            with test_data.lock:
-                test_data.fail_count += 1
-                test_data.status_code_dict["ERROR"] = test_data.status_code_dict.get("ERROR", 0) + 1
-                test_data.completed_requests += 1  # 新增:记录已完成的请求数
-
-            log_print(f"请求失败 | 错误原因：{str(e)}", "ERROR")
-
-def start_test(url, method, thread_num, total_req, timeout, headers_str, data_str):
+def load_data_list(data_str):
+    """解析请求体参数：单个参数/参数数组，或 {"file": 路径} 从文件加载参数数组；失败返回None"""
+    return press_engine.load_data_list(data_str, log_print)
+
+def start_test(url, method, thread_num, total_req, timeout, headers_str, data_str, warmup_str="0", generators_str="",
+               soak=False, soak_interval="60", endpoints_str=""):
     """启动压测（自动保存参数保留）"""
+    global harness_monitor, payload_generator, soak_recorder, soak_summary, text_line_limit, run_active, ui_refresh_ms
+    global worker_threads, endpoint_mix, upload_source, ws_load, replay_plan, slo_guard, slo_summary, run_conn_mode, request_hooks
     if not validate_params(url, thread_num, total_req, timeout):
         return
+    try:
+        abort_rules = parse_rules(collect_config_data())
+        capture = parse_capture(collect_config_data())
+        hooks = parse_hooks(controls["hooks_text"].get(1.0, tk.END))
+    except ValueError as e:
+        messagebox.showerror("参数错误", str(e))
+        return
+    ws_rate = 0
+    if is_ws_url(url):
+        try:
+            ws_rate = float(controls["ws_rate_entry"].get().strip() or 0)
+            if ws_rate < 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("参数错误", "WS消息速率必须为非负数（条/秒/连接）！")
+            return
+    replay_path = "" if is_ws_url(url) else controls["replay_file_entry"].get().strip()
+    replay_speed = 0
+    if replay_path:
+        try:
+            replay_speed = parse_speed(controls["replay_speed_entry"].get())
+        except ValueError:
+            messagebox.showerror("参数错误", "回放速度格式错误！填写 1、10、0.5 或 max")
+            return
+        if not os.path.isfile(replay_path):
+            messagebox.showerror("参数错误", f"回放文件不存在：{replay_path}")
+            return
+    raw_mode = controls["engine_combo"].get() == "raw" and not is_ws_url(url) and not replay_path
+    pipeline_depth = controls["pipeline_depth_entry"].get().strip()
+    if raw_mode and (not pipeline_depth.isdigit() or int(pipeline_depth) < 1):
+        messagebox.showerror("参数错误", "流水线深度必须为正整数！")
+        return
+    refresh_str = controls["ui_refresh_entry"].get().strip()
+    if not refresh_str.isdigit() or int(refresh_str) < 20:
+        messagebox.showerror("参数错误", "界面刷新间隔必须为不小于20的整数（毫秒）！")
+        return
+    ui_refresh_ms = int(refresh_str)
+    try:
+        warmup_requests, warmup_seconds = press_engine.parse_warmup(warmup_str)
+    except ValueError:
+        messagebox.showerror("参数错误", "预热格式错误！填写请求数（如 50）或时长（如 10s）")
+        return
+    try:
+        generator_specs = parse_specs(generators_str)
+    except ValueError as e:
+        messagebox.showerror("参数错误", f"数据生成器配置错误：{str(e)}")
+        return
+    if soak:
+        try:
+            soak_interval = float(soak_interval)
+            if soak_interval <= 0:
+                raise ValueError
+        except ValueError:
+            messagebox.showerror("参数错误", "长稳模式汇总间隔必须为正数（秒）！")
+            return
+    upload_path = controls["upload_file_entry"].get().strip()
+    if (is_ws_url(url) or raw_mode or replay_path) and (warmup_requests or warmup_seconds or generator_specs or endpoints_str.strip() or upload_path):
+        mode_name = "WebSocket压测" if is_ws_url(url) else ("流量回放" if replay_path else "raw 引擎")
+        log_print(f"⚠️ {mode_name}不支持 预热/数据生成器/多接口组合/上传文件，本轮已忽略这些设置", "WARN")
+        warmup_requests, warmup_seconds, generator_specs, endpoints_str, upload_path = 0, 0, [], "", ""
+    conn_mode = controls["conn_mode_combo"].get() or "reuse"
+    if (is_ws_url(url) or raw_mode) and conn_mode != "reuse":
+        log_print(f"⚠️ {'WebSocket压测' if is_ws_url(url) else 'raw 引擎'}固定使用长连接，本轮忽略连接模式 {conn_mode}", "WARN")
+        conn_mode = "reuse"
+    run_conn_mode = conn_mode
+    if (is_ws_url(url) or raw_mode) and (capture or hooks):
+        log_print(f"⚠️ {'WebSocket压测' if is_ws_url(url) else 'raw 引擎'}不支持请求捕获/签名钩子，本轮已忽略", "WARN")
+        capture, hooks = None, None
+    if hooks and hooks.covers_body and (upload_path or (controls["encoding_combo"].get() or "none") != "none"):
+        messagebox.showerror("参数错误", "签名覆盖请求体（{body}/{body_sha256}）时不能同时启用请求体压缩或上传文件！")
+        return
+    request_hooks = hooks
     
     url = url.strip()
     thread_num = int(thread_num)
@@ -623,38 +952,35 @@ def start_test(url, method, thread_num, total_req, timeout, headers_str, data_st
     headers = parse_json(headers_str)
     data = parse_json(data_str)
 
-    with test_data.lock:
-        test_data.success_count = 0
-        test_data.fail_count = 0
-        test_data.response_times = []
-        test_data.status_code_dict = {}
-        test_data.current_request = 0
-        test_data.total_requests = total_req
-        test_data.completed_requests = 0  # 初始化已完成的请求数
-        test_data.thread_num = thread_num
-        test_data.is_running = True
-        test_data.test_start_time = time.time()
-
-    # 尝试解析data_str,如果data_str是文件路径则从文件加载
-    data = parse_json(data_str)
-    if isinstance(data, dict) and "file" in data:
-        # 如果data包含file字段,从文件加载参数数组
-        file_path = data["file"]
+    data_list = load_data_list(data_str)
+    if data_list is None:
+        return
+    try:
+        endpoints = parse_endpoints(endpoints_str, url, method, headers, data_list)
+    except ValueError as e:
+        messagebox.showerror("参数错误", f"接口组合配置错误：{str(e)}")
+        return
+    new_upload = None
+    if upload_path:
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data_list = json.load(f)
-            if not isinstance(data_list, list):
-                log_print(f"❌ 文件内容必须是JSON数组格式", "ERROR")
-                return
-            log_print(f"✅ 从文件加载了 {len(data_list)} 组参数", "SUCCESS")
-        except Exception as e:
-            log_print(f"❌ 加载参数文件失败：{str(e)}", "ERROR")
+            new_upload = UploadSource(upload_path, float(controls["upload_chunk_entry"].get().strip() or 0))
+        except (OSError, ValueError) as e:
+            messagebox.showerror("参数错误", f"上传文件不可用：{str(e)}")
             return
-    else:
-        # 使用单个参数或参数数组
-        data_list = data if isinstance(data, list) else [data]
+
+    # 以上为参数校验/解析，任一失败都直接返回，不改动上一轮的运行状态；以下开始重置本轮数据
+    test_data.reset(total_req, thread_num)
+    test_data.keep_samples = not soak
+    test_data.capture = capture
+    heatmap_view.reset()
+    text_line_limit = SOAK_TEXT_LINES if soak else None
+    endpoint_mix = EndpointMix(endpoints) if endpoints else None
+    close_upload_source()
+    upload_source = new_upload
+    wire = WireOptions(controls["encoding_combo"].get() or "none", controls["accept_encoding_entry"].get(), upload_source)
 
     # 清空响应窗口
+    response_buffer.clear()
     response_text.delete(1.0, tk.END)
     response_text.insert(tk.END, "=== 压测开始 ===\n")
 
@@ -662,50 +988,296 @@ def start_test(url, method, thread_num, total_req, timeout, headers_str, data_st
     controls["stop_btn"]["state"] = tk.NORMAL
     log_print(f"✅ 压测任务启动 | 目标API：{url} | 方法：{method} | 并发数：{thread_num} | 总请求数：{total_req}", "INFO")
     log_print(f"📋 参数数量：{len(data_list)} 组", "INFO")
-
-    for _ in range(thread_num):
-        t = threading.Thread(target=send_request, args=(url, method, headers, data_list, timeout), daemon=True)
+    if conn_mode != "reuse":
+        log_print(f"🔗 连接模式：{CONN_MODES[conn_mode]}（新建连接/秒与握手统计见报告）", "INFO")
+    if capture:
+        log_print(f"🔖 已启用请求捕获：{capture.describe()}", "INFO")
+    if hooks:
+        log_print(f"🔏 已启用签名钩子：{', '.join(hooks.names)}（密钥已预先解析）", "INFO")
+    if wire.compress or wire.accept_encoding:
+        log_print(f"📦 传输选项：请求体压缩 {wire.request_encoding} | Accept-Encoding {wire.accept_encoding or '默认'}", "INFO")
+    if upload_source:
+        log_print(f"📤 上传模式：{upload_path}（{round(upload_source.size / 1048576, 2)}MB，内存映射共享，"
+                  f"{f'分块 {upload_source.chunk_size // 1024}KB' if upload_source.chunk_size else '整块发送'}）", "INFO")
+    if endpoint_mix:
+        shares = endpoint_mix.shares()
+        log_print("🔀 多接口混合压测：" + " | ".join(f"{e.name}({e.method}) {shares[e.name]}%" for e in endpoints), "INFO")
+
+    # 本轮压测内DNS解析只做一次
+    http_timing.dns_cache.reset(enabled=True)
+    if warmup_requests or warmup_seconds:
+        test_data.warmup = press_engine.WarmupPlan(test_data, thread_num, warmup_requests, warmup_seconds, log_print)
+        log_print(f"🔥 预热开始：{f'{warmup_requests} 次请求' if warmup_requests else f'{warmup_seconds} 秒'}（每个线程预先建立连接）", "INFO")
+
+    # 合成数据：后台批量预生成，工作线程按共享游标领取
+    stop_payload_generator()
+    payload_generator, payload = None, None
+    if generator_specs:
+        payload_generator = PayloadGenerator(generator_specs).start()
+        payload = PayloadRenderer(payload_generator, headers, data_list)
+        if endpoint_mix:
+            endpoint_mix.attach_generator(payload_generator)
+        log_print(f"🧬 已启用数据生成器：{', '.join(generator_specs)}（每个请求领取唯一一行数据）", "INFO")
+
+    update_metrics_exporter(controls["metrics_port_entry"].get().strip())
+    harness_monitor = HarnessMonitor(test_data, log=log_print, backlog_func=ui_backlog)
+    harness_monitor.start()
+    slo_summary = None
+    slo_guard = SloGuard(test_data, abort_rules, log=log_print).start() if abort_rules else None
+    if slo_guard:
+        log_print(f"🛡️ 已启用自动中止：{abort_rules.describe()}", "INFO")
+    # 长稳模式：工作线程不输出逐请求日志/响应，由记录器按间隔汇总
+    soak_summary = None
+    soak_recorder = SoakRecorder(test_data, interval=soak_interval, log=log_print).start() if soak else None
+    worker_log, worker_show = (press_engine._noop, press_engine._noop) if soak else (log_print, show_response)
+    ws_load, replay_plan = None, None
+    if replay_path:
+        # 流量回放：读取线程流式解析文件，发送线程按原始时间间隔（或倍速）取出发送
+        replay_plan = ReplayPlan(test_data, replay_path, url, replay_speed, headers, total_req, log_print).start()
+        worker_threads = [threading.Thread(target=replay_worker, args=(test_data, replay_plan, timeout, worker_log, conn_mode, hooks), daemon=True)
+                          for _ in range(thread_num)]
+        log_print(f"📼 流量回放：{replay_path} | {f'{replay_speed}倍速' if replay_speed else '最快速度'} | "
+                  f"发送线程 {thread_num} | 最多 {total_req} 条", "INFO")
+        for t in worker_threads:
+            t.start()
+        run_active = True
+        return
+    if is_ws_url(url):
+        # WebSocket：单个事件循环线程承载全部长连接；预热/多接口/上传/数据生成器不适用
+        ws_load = WsLoad(test_data, url, thread_num, total_req, ws_rate, headers, data_list, timeout, worker_log).start()
+        worker_threads = [ws_load.thread]
+        log_print(f"🔌 WebSocket压测：{thread_num} 条长连接 | 每连接 {ws_rate or '闭环'} 条/秒 | 共 {total_req} 条消息", "INFO")
+        run_active = True
+        return
+    if raw_mode:
+        # raw 引擎：每个线程一条长连接，预编码请求报文直接写套接字（不输出逐请求日志/响应内容）
+        target = RawTarget(url, method, headers, data_list)
+        depth = int(pipeline_depth)
+        worker_threads = [threading.Thread(target=send_raw, args=(test_data, target, timeout, depth, worker_log), daemon=True)
+                          for _ in range(thread_num)]
+        log_print(f"⚡ raw 引擎：{thread_num} 条长连接 | 流水线深度 {depth} | 预编码报文 {len(target.requests)} 条", "INFO")
+        for t in worker_threads:
+            t.start()
+        run_active = True
+        return
+    worker_threads = [threading.Thread(target=send_request, args=(test_data, url, method, headers, data_list, timeout, worker_log, worker_show, test_data.warmup, None, payload, endpoint_mix, wire, conn_mode, hooks), daemon=True)
+                      for _ in range(thread_num)]
+    for t in worker_threads:
         t.start()
-    root.after(500, check_test_finish)
+    run_active = True  # 由界面刷新定时器检测完成
 
 def stop_test():
     """强制停止压测"""
-    with test_data.lock:
-        test_data.is_running = False
-    test_data.test_end_time = time.time()
+    if active_search is not None:
+        active_search.stop()
+        log_print("⚠️ 容量探测已被强制停止，正在等待当前步骤收尾...", "WARN")
+        return
+    if run_active:
+        finish_test("⚠️ 压测任务已被强制停止", "WARN")
+
+def stop_payload_generator():
+    """停止后台数据生成线程（保留对象以便报表读取消耗行数）"""
+    if payload_generator is not None:
+        payload_generator.stop()
+
+def format_payload_usage():
+    """报表中的合成数据段落"""
+    if payload_generator is None:
+        return ""
+    return f"🧬 合成数据：生成器 {', '.join(payload_generator.specs)} | 共领取 {payload_generator.consumed} 行（每行仅使用一次）\n"
+
+def stop_harness_monitor():
+    """停止压测机自检并保存汇总，client-bound 时在日志中给出明确提示"""
+    global harness_summary
+    if harness_monitor is None:
+        return
+    harness_summary = harness_monitor.stop()
+    if harness_summary["client_bound"]:
+        log_print("⚠️ 本次压测期间压测机处于 client-bound 状态，响应时间/QPS 可能低估服务端能力，建议降低并发或增加压测机", "WARN")
+
+def update_metrics_exporter(port_str):
+    """按指标端口启动/切换/关闭实时指标服务（服务跨轮次常驻，每轮计数从0开始）；
+    只填端口时仅监听本机，填写 地址:端口 时按指定地址监听"""
+    global metrics_exporter
+    listen = parse_listen(port_str)
+    if metrics_exporter is not None and listen == (metrics_exporter.host, metrics_exporter.port):
+        return
+    if metrics_exporter is not None:
+        metrics_exporter.stop()
+        metrics_exporter = None
+    if listen is None:
+        if port_str:
+            log_print(f"⚠️ 指标端口格式错误：{port_str}，已跳过指标导出", "WARN")
+        return
+    host, port = listen
+    try:
+        metrics_exporter = MetricsExporter(lambda: test_data, port, host).start()
+        log_print(f"📡 实时指标已开放：http://{host}:{metrics_exporter.port}/metrics"
+                  f"{'（仅本机可访问，需远程抓取时填写 0.0.0.0:端口）' if host == '127.0.0.1' else ''}", "INFO")
+    except OSError as e:
+        log_print(f"❌ 指标服务启动失败（{host}:{port}）：{str(e)}", "ERROR")
+
+def choose_upload_file(entry):
+    path = filedialog.askopenfilename(title="选择上传文件")
+    if path:
+        entry.delete(0, tk.END)
+        entry.insert(0, path)
+
+def choose_replay_file(entry):
+    path = filedialog.askopenfilename(title="选择回放文件", filetypes=[("访问日志 / HAR", "*.log *.gz *.har *.txt"), ("所有文件", "*.*")])
+    if path:
+        entry.delete(0, tk.END)
+        entry.insert(0, path)
+
+def close_upload_source():
+    """释放上一轮的上传文件映射"""
+    global upload_source
+    if upload_source is not None:
+        upload_source.close()
+        upload_source = None
+
+def stop_slo_guard():
+    """停止自动中止守护并保存汇总（含触发的规则）"""
+    global slo_guard, slo_summary
+    if slo_guard is None:
+        return
+    slo_summary = slo_guard.stop()
+    slo_guard = None
+
+def stop_soak_recorder():
+    """停止长稳记录器：补录最后一个间隔并生成长稳汇总"""
+    global soak_recorder, soak_summary
+    if soak_recorder is None:
+        return
+    soak_summary = soak_recorder.stop()
+    soak_recorder = None
+
+# ===================== 容量探测（自动寻找最大可持续吞吐） =====================
+def start_capacity_search():
+    """按SLO自动爬坡+二分寻找最大可持续并发/吞吐，后台线程执行"""
+    global active_search
+    url = controls["url_entry"].get().strip()
+    method = controls["method_combo"].get()
+    if is_ws_url(url):
+        messagebox.showerror("参数错误", "容量探测仅支持 HTTP(S) 目标！")
+        return
+    if not validate_params(url, controls["thread_entry"].get(), controls["req_entry"].get(), controls["timeout_entry"].get()):
+        return
+    try:
+        config = SearchConfig(
+            slo_p99_ms=float(controls["slo_p99_entry"].get()),
+            slo_error_pct=float(controls["slo_error_entry"].get()),
+            start_concurrency=int(controls["thread_entry"].get()),
+            max_concurrency=int(controls["max_thread_entry"].get()),
+            step_seconds=float(controls["step_seconds_entry"].get()),
+        )
+        if config.slo_p99_ms <= 0 or config.step_seconds <= 0 or config.max_concurrency < config.start_concurrency:
+            raise ValueError
+    except ValueError:
+        messagebox.showerror("参数错误", "SLO、每步时长必须为正数，最大并发不能小于并发数！")
+        return
+    headers = parse_json(controls["headers_text"].get(1.0, tk.END))
+    data_list = load_data_list(controls["data_text"].get(1.0, tk.END))
+    if data_list is None:
+        return
+
+    http_timing.dns_cache.reset(enabled=True)
+    active_search = CapacitySearch(url, method, headers, data_list, int(controls["timeout_entry"].get()), config, log_print)
+    controls["start_btn"]["state"] = tk.DISABLED
+    controls["search_btn"]["state"] = tk.DISABLED
+    controls["stop_btn"]["state"] = tk.NORMAL
+    search = active_search
+    threading.Thread(target=lambda: _run_capacity_search(search), daemon=True).start()
+
+def _run_capacity_search(search):
+    result = search.run()
+    root.after(0, lambda: finish_capacity_search(result))
+
+def finish_capacity_search(result):
+    """探测结束：恢复按钮并在报表区展示结论与负载-延迟曲线"""
+    global active_search
+    active_search = None
     controls["start_btn"]["state"] = tk.NORMAL
+    controls["search_btn"]["state"] = tk.NORMAL
     controls["stop_btn"]["state"] = tk.DISABLED
-    log_print("⚠️ 压测任务已被强制停止", "WARN")
+    best = result["best"]
+    if best:
+        qps_label.config(text=f"QPS：{best['qps']} req/s")
+        log_print(f"🏁 容量探测完成：最大可持续吞吐 {best['qps']} req/s @ 并发 {best['concurrency']}", "SUCCESS")
+    else:
+        log_print("🏁 容量探测完成：起始并发即无法满足SLO", "WARN")
+    detail_text.delete(1.0, tk.END)
+    detail_text.insert(tk.END, format_search_result(result))
+
+def ui_tick():
+    """界面唯一的刷新定时器：刷入日志/响应缓冲区，渲染最新统计快照，并检测压测是否结束"""
+    flush_text(log_text, log_buffer)
+    flush_text(response_text, response_buffer)
+    if run_active:
+        snap = press_engine.snapshot(test_data)
+        render_live_stats(snap)
+        heatmap_view.update(press_engine.heatmap_columns(test_data, heatmap_view.next_sec))
+        if not snap["running"] or snap["completed"] >= snap["total_requests"] or not any(t.is_alive() for t in worker_threads):
+            if slo_guard is not None and slo_guard.triggered:
+                finish_test("🛑 已触发自动中止规则，压测提前结束！正在生成统计报告...", "WARN")
+            else:
+                finish_test("🎉 压测任务执行完成！正在生成统计报告...", "SUCCESS")
+    root.after(ui_refresh_ms, ui_tick)
+
+def render_live_stats(snap):
+    """压测进行中按快照更新统计区（最终数值由 generate_report 覆盖）"""
+    completed, total = snap["completed"], snap["total_requests"]
+    elapsed = snap["time"] - snap["start_time"]
+    rt_hist = snap["rt_hist"]
+    success_rate_label.config(text=f"成功率：{round(snap['success'] / completed * 100, 2) if completed else '--'} %")
+    qps_label.config(text=f"QPS：{round(completed / elapsed, 2) if completed and elapsed > 0 else '--'} req/s")
+    avg_rt_label.config(text=f"平均响应时间：{round(rt_hist.mean(), 2)} ms")
+    success_label.config(text=f"{snap['success']}")
+    fail_label.config(text=f"{snap['fail']}")
+    total_time_label.config(text=f"{round(elapsed, 2)} s")
+    min_rt_label.config(text=f"{round(rt_hist.min, 2)} ms")
+    max_rt_label.config(text=f"{round(rt_hist.max, 2)} ms")
+    progress_label.config(text=f"{completed}/{total}（{round(completed / total * 100, 1) if total else 0}%）")
+
+def finish_test(message, level):
+    """结束本轮压测：停止工作线程与各后台组件，生成报告"""
+    global run_active
+    run_active = False
+    press_engine.cancel_run(test_data)  # 在途请求的连接被关闭，立即返回而不必等到超时
+    test_data.test_end_time = time.perf_counter()
+    deadline = test_data.test_end_time + CANCEL_GRACE_SECONDS
+    for t in worker_threads:
+        t.join(max(deadline - time.perf_counter(), 0))
+    stop_harness_monitor()
+    stop_slo_guard()
+    stop_payload_generator()
+    stop_soak_recorder()
+    controls["start_btn"]["state"] = tk.NORMAL
+    controls["stop_btn"]["state"] = tk.DISABLED
+    log_print(message, level)
+    render_live_stats(press_engine.snapshot(test_data))
+    heatmap_view.update(press_engine.heatmap_columns(test_data, heatmap_view.next_sec))
     generate_report()
-
-def check_test_finish():
-    """轮询检查压测完成状态"""
-    if test_data.is_running and test_data.completed_requests < test_data.total_requests:
-        root.after(500, check_test_finish)
-        return
-    if test_data.is_running:
-        with test_data.lock:
-            test_data.is_running = False
-        test_data.test_end_time = time.time()
-        controls["start_btn"]["state"] = tk.NORMAL
-        controls["stop_btn"]["state"] = tk.DISABLED
-        log_print("🎉 压测任务执行完成！正在生成统计报告...", "SUCCESS")
-        generate_report()
+    close_upload_source()
 
 def generate_report():
     """生成压测报告"""
-    total_req = test_data.total_requests
-    success_cnt = test_data.success_count
-    fail_cnt = test_data.fail_count
-    total_time = round(test_data.test_end_time - test_data.test_start_time, 2) if test_data.test_end_time else 0
-    success_rate = round((success_cnt / total_req) * 100, 2) if total_req > 0 else 0
-    qps = round(total_req / total_time, 2) if total_time > 0 else 0
-
-    rt_list = test_data.response_times
-    avg_rt = round(sum(rt_list)/len(rt_list), 2) if rt_list else 0
-    min_rt = round(min(rt_list), 2) if rt_list else 0
-    max_rt = round(max(rt_list), 2) if rt_list else 0
-    code_dist = test_data.status_code_dict
+    global last_summary
+    summary = press_engine.build_summary(test_data)
+    summary["harness"] = harness_summary
+    summary["soak"] = soak_summary
+    summary["upload"] = upload_source.summary(summary["active_time"], summary["p50_rt"]) if upload_source else None
+    summary["websocket"] = ws_load.summary(summary["active_time"]) if ws_load else None
+    summary["replay"] = replay_plan.summary(summary["active_time"]) if replay_plan else None
+    summary["slo_abort"] = slo_summary
+    summary["conn_mode"] = run_conn_mode
+    summary["hooks"] = request_hooks.summary() if request_hooks else None
+    last_summary = summary
+    total_req = summary["total_requests"]
+    success_cnt, fail_cnt = summary["success"], summary["fail"]
+    total_time, success_rate, qps = summary["total_time"], summary["success_rate"], summary["qps"]
+    avg_rt, min_rt, max_rt = summary["avg_rt"], summary["min_rt"], summary["max_rt"]
+    code_dist = summary["status_codes"]
 
     # 更新统计区UI
     success_rate_label.config(text=f"成功率：{success_rate} %")
@@ -718,30 +1290,75 @@ def generate_report():
     max_rt_label.config(text=f"{max_rt} ms")
 
     detail_content = f"""【压测详情汇总】
-📌 目标API：{controls['url_entry'].get()} | 请求方法：{controls['method_combo'].get()}
-📌 并发数：{test_data.thread_num} | 总请求数：{total_req} | 压测总耗时：{total_time} s
-✅ 成功数：{success_cnt} | ❌ 失败数：{fail_cnt} | 📈 成功率：{success_rate}% | ⚡ QPS：{qps} req/s
-⏳ 响应时间：平均 {avg_rt}ms | 最小 {min_rt}ms | 最大 {max_rt}ms
-📋 状态码分布：{code_dist}
-"""
+📌 目标API：{f"多接口组合（{len(summary['endpoints'])} 个）" if summary['endpoints'] else controls['url_entry'].get()} | 请求方法：{controls['method_combo'].get()}
+📌 并发数：{test_data.thread_num} | 总请求数：{total_req} | 压测总耗时：{total_time} s | 有效时长：{summary['active_time']} s
+✅ 成功数：{success_cnt} | ❌ 失败数：{fail_cnt} | 🚫 已取消：{summary['cancelled']} | ⏸ 未发送：{summary['unsent']}{f" | 仍在途：{summary['in_flight']}" if summary['in_flight'] else ""}
+📈 成功率：{success_rate}%（按已完成 {summary['completed']} 次计） | ⚡ QPS：{qps} req/s（已完成数 / 有效时长）
+⏳ 响应时间：平均 {avg_rt}ms | 最小 {min_rt}ms | 最大 {max_rt}ms | p50 {summary['p50_rt']}ms | p90 {summary['p90_rt']}ms | p99 {summary['p99_rt']}ms
+📋 状态码分布：{code_dist}{f" | 异常类型：{summary['error_types']}" if summary['error_types'] else ""}
+{press_engine.format_warmup(summary['warmup'])}{format_payload_usage()}{press_engine.format_endpoints(summary['endpoints'], endpoint_mix.shares() if endpoint_mix else None)}{format_bandwidth(summary['bandwidth'])}{format_upload(summary['upload'])}{format_websocket(summary['websocket'])}{format_replay(summary['replay'])}{format_abort(slo_summary)}{press_engine.format_connections(summary['connections'], run_conn_mode)}{press_engine.format_phases(summary['phases'])}{format_capture(summary['capture'])}{format_hooks(summary['hooks'])}{format_summary(harness_summary)}{format_soak(soak_summary)}"""
     detail_text.delete(1.0, tk.END)
     detail_text.insert(tk.END, detail_content)
+    if soak_summary:
+        save_soak_report(soak_summary, summary)
+    record_history(summary)
     log_print("📊 压测报告已生成，查看下方统计区", "INFO")
 
+def get_run_history():
+    global run_history
+    if run_history is None:
+        run_history = RunHistory()
+    return run_history
+
+def record_history(summary):
+    """每轮压测结束自动写入历史库（失败只记日志，不影响报告）"""
+    config_data = redact_config(collect_config_data())
+    try:
+        run_id = get_run_history().record(summary, config_data, controls["config_list_combo"].get().strip(),
+                                          config_hash(config_data), source="gui")
+        log_print(f"🗄 已记录到压测历史 #{run_id}", "INFO")
+    except Exception as e:
+        log_print(f"⚠️ 写入压测历史失败：{str(e)}", "WARN")
+
+def show_history_trend():
+    """在报表区展示当前目标（多接口压测为各接口）最近30轮的 p99 / QPS 趋势"""
+    history = get_run_history()
+    names = list(last_summary["endpoints"]) if last_summary and last_summary.get("endpoints") else []
+    parts = []
+    if names:
+        for name in names:
+            parts.append(format_trend(history.trend("p99_rt", 30, endpoint=name), "p99_rt", f"接口 {name}"))
+    else:
+        url = controls["url_entry"].get().strip()
+        parts.append(format_trend(history.trend("p99_rt", 30, target=url), "p99_rt", url))
+        parts.append(format_trend(history.trend("qps", 30, target=url), "qps", url))
+    detail_text.delete(1.0, tk.END)
+    detail_text.insert(tk.END, "\n".join(parts))
+
 def export_report():
-    """导出压测报告"""
+    """导出压测报告（.txt 文本报表 / .json 含分阶段直方图的结构化数据 / .html 文本报表 + 延迟热力图）"""
     if test_data.total_requests == 0:
         messagebox.showwarning("提示", "暂无压测数据，无法导出报告！")
         return
     file_path = filedialog.asksaveasfilename(
         title="保存压测报告", defaultextension=".txt",
-        filetypes=[("文本文件", "*.txt"), ("所有文件", "*.*")],
+        filetypes=[("文本文件", "*.txt"), ("JSON数据", "*.json"), ("HTML报告", "*.html"), ("所有文件", "*.*")],
         initialfile=f"API压测报告_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
     )
     if not file_path:
         return
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(detail_text.get(1.0, tk.END))
+    if file_path.lower().endswith(".json"):
+        export_data = dict(last_summary or press_engine.build_summary(test_data))
+        export_data["config"] = redact_config(collect_config_data())
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(export_data, f, ensure_ascii=False, indent=2)
+    elif file_path.lower().endswith((".html", ".htm")):
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(render_html(last_summary or press_engine.build_summary(test_data), detail_text.get(1.0, tk.END),
+                                os.path.splitext(os.path.basename(file_path))[0]))
+    else:
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(detail_text.get(1.0, tk.END))
     messagebox.showinfo("成功", f"压测报告已导出至：\n{file_path}")
     log_print(f"💾 压测报告已导出到本地文件：{file_path}", "SUCCESS")
 
@@ -750,4 +1367,5 @@ if __name__ == "__main__":
     create_ui()
     load_config() # 启动自动加载参数
     log_print("欢迎使用 PyApiPress API压力测试工具（终极完整版），支持手动/自动保存参数！", "INFO")
+    ui_tick()
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,143 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import press_engine
+
+# ===================== 实时指标导出（OpenMetrics / Prometheus） =====================
+# 在本地端口提供 /metrics，供 Prometheus 抓取压测端的实时负载与延迟，叠加到服务端看板：
+#   apipress_requests_total{result}      已完成请求（success/fail）
+#   apipress_responses_total{code}       状态码分布（异常计为 ERROR）
+#   apipress_errors_total{type}          异常类型分布
+#   apipress_bytes_total{direction,kind}  发送/接收字节数（wire 线上 / decoded 解码后）
+#   apipress_in_flight / apipress_threads / apipress_running   当前状态
+#   apipress_latency_seconds             响应时间直方图；apipress_phase_seconds{phase} 分阶段直方图
+# 抓取在独立线程中进行，仅在复制快照时短暂持有统计锁；快照按 min_interval 缓存，多个抓取方不会重复加锁
+# 用法：界面填写"指标端口"（如 9464）默认只监听 127.0.0.1；需要其他机器上的 Prometheus 抓取时
+# 显式填写 监听地址:端口（如 0.0.0.0:9464），Prometheus 配置 static_configs: ["压测机IP:9464"]
+
+PREFIX = "apipress"
+DEFAULT_HOST = "127.0.0.1"
+# 导出的固定分桶上界（毫秒），由对数直方图累计得到
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+OPENMETRICS_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+PROMETHEUS_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def parse_listen(text):
+    """解析指标端口设置："9464" → (127.0.0.1, 9464)；"0.0.0.0:9464" → 显式指定监听地址。格式错误返回 None"""
+    host, sep, port = str(text or "").strip().rpartition(":")
+    host = host.strip("[]") if sep else DEFAULT_HOST
+    if not port.isdigit() or not host:
+        return None
+    return host, int(port)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram(lines, name, hist, **labels):
+    counts = hist.cumulative(BUCKETS_MS)
+    for bound, n in zip(BUCKETS_MS, counts):
+        lines.append(f"{name}_bucket{_labels(**labels, le=f'{bound / 1000:g}')} {n}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {hist.count}")
+    lines.append(f"{name}_count{_labels(**labels)} {hist.count}")
+    lines.append(f"{name}_sum{_labels(**labels)} {hist.total / 1000:.6f}")
+
+
+def render(snap, openmetrics=True):
+    """将引擎快照渲染为 OpenMetrics（或 Prometheus 0.0.4 文本）格式"""
+    lines = []
+
+    def meta(name, kind, help_text):
+        # OpenMetrics 的 counter 元数据不带 _total 后缀，Prometheus 文本格式则带
+        meta_name = name if openmetrics or kind != "counter" else f"{name}_total"
+        lines.append(f"# HELP {meta_name} {help_text}")
+        lines.append(f"# TYPE {meta_name} {kind}")
+
+    meta(f"{PREFIX}_requests", "counter", "Completed requests by result")
+    lines.append(f"{PREFIX}_requests_total{_labels(result='success')} {snap['success']}")
+    lines.append(f"{PREFIX}_requests_total{_labels(result='fail')} {snap['fail']}")
+    meta(f"{PREFIX}_responses", "counter", "Completed requests by status code")
+    for code, n in sorted(snap["status_codes"].items(), key=lambda kv: str(kv[0])):
+        lines.append(f"{PREFIX}_responses_total{_labels(code=code)} {n}")
+    meta(f"{PREFIX}_errors", "counter", "Failed requests by exception type")
+    for kind, n in sorted(snap["error_types"].items()):
+        lines.append(f"{PREFIX}_errors_total{_labels(type=kind)} {n}")
+    meta(f"{PREFIX}_bytes", "counter", "Bytes transferred (wire = on the network, decoded = after decompression)")
+    for key, (direction, kind) in (("sent", ("sent", "wire")), ("sent_decoded", ("sent", "decoded")),
+                                   ("recv", ("received", "wire")), ("recv_decoded", ("received", "decoded"))):
+        lines.append(f"{PREFIX}_bytes_total{_labels(direction=direction, kind=kind)} {snap['bytes'][key]}")
+    meta(f"{PREFIX}_in_flight", "gauge", "Requests started but not yet completed")
+    lines.append(f"{PREFIX}_in_flight {max(snap['started'] - snap['completed'], 0)}")
+    meta(f"{PREFIX}_threads", "gauge", "Configured concurrency of the current run")
+    lines.append(f"{PREFIX}_threads {snap['thread_num']}")
+    meta(f"{PREFIX}_running", "gauge", "1 while a run is in progress")
+    lines.append(f"{PREFIX}_running {1 if snap['running'] else 0}")
+    meta(f"{PREFIX}_latency_seconds", "histogram", "Total request latency")
+    _histogram(lines, f"{PREFIX}_latency_seconds", snap["rt_hist"])
+    meta(f"{PREFIX}_phase_seconds", "histogram", "Request latency by phase (dns/connect/tls/tls_resumed/ttfb/transfer)")
+    for phase, hist in snap["phase_hist"].items():
+        _histogram(lines, f"{PREFIX}_phase_seconds", hist, phase=phase)
+    if openmetrics:
+        lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsExporter:
+    """后台HTTP指标服务；source 为返回当前 TestData 的函数（每轮压测的 TestData 可能不同）"""
+    def __init__(self, source, port, host=DEFAULT_HOST, min_interval=0.5):
+        self.source = source
+        self.port = port
+        self.host = host
+        self.min_interval = min_interval
+        self._cache = None
+        self._cache_at = 0.0
+        self._cache_lock = threading.Lock()
+        self.server = None
+
+    def current_snapshot(self):
+        with self._cache_lock:
+            now = time.perf_counter()
+            if self._cache is None or now - self._cache_at >= self.min_interval:
+                self._cache = press_engine.snapshot(self.source())
+                self._cache_at = now
+            return self._cache
+
+    def start(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+                body = render(exporter.current_snapshot(), openmetrics).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", OPENMETRICS_TYPE if openmetrics else PROMETHEUS_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,182 @@
+import json
+import os
+import queue
+import random
+import re
+import string
+import threading
+import uuid
+
+try:
+    import numpy as np
+except ImportError:  # 未安装NumPy时退化为标准库逐个生成（仍在后台线程，不占热路径）
+    np = None
+
+# ===================== 合成请求数据生成器 =====================
+# 配置示例（"generators" 字段，JSON对象）：
+#   {"user_id": {"type": "int", "min": 1, "max": 1000000},
+#    "name":    {"type": "string", "length": 12},
+#    "req_id":  {"type": "uuid"},
+#    "order_no":{"type": "sequence", "start": 100000, "step": 1},
+#    "city":    {"type": "choice", "values": ["bj", "sh", "gz"], "weights": [5, 3, 2]}}
+# 请求头/请求体中用 ${gen.名称} 引用；整个字符串恰为占位符时保留原类型（如int）。
+# 取值按大批量（默认8192行）在后台线程预生成，工作线程通过共享游标逐行领取，每行只会被使用一次
+
+PLACEHOLDER = re.compile(r"\$\{gen\.(\w+)\}")
+ALPHABET = string.ascii_letters + string.digits
+GENERATOR_TYPES = ("int", "string", "uuid", "sequence", "choice")
+
+
+def parse_specs(text):
+    """解析生成器配置文本，返回 {名称: 规格}；格式错误抛 ValueError"""
+    text = (text or "").strip()
+    if not text:
+        return {}
+    try:
+        specs = json.loads(text)
+    except Exception as e:
+        raise ValueError(f"生成器配置不是合法JSON：{e}")
+    if not isinstance(specs, dict):
+        raise ValueError("生成器配置必须是JSON对象")
+    for name, spec in specs.items():
+        if not isinstance(spec, dict) or spec.get("type") not in GENERATOR_TYPES:
+            raise ValueError(f"生成器 {name} 类型错误，可选：{'/'.join(GENERATOR_TYPES)}")
+        if spec["type"] == "choice" and not spec.get("values"):
+            raise ValueError(f"生成器 {name} 缺少 values")
+    return specs
+
+
+def _column(spec, offset, size, rng):
+    """生成一列（size个值），返回Python列表"""
+    kind = spec["type"]
+    if kind == "sequence":
+        start, step = spec.get("start", 0), spec.get("step", 1)
+        first = start + offset * step
+        if np is not None:
+            return np.arange(first, first + size * step, step, dtype=np.int64)[:size].tolist()
+        return list(range(first, first + size * step, step))[:size]
+    if kind == "int":
+        low, high = int(spec.get("min", 0)), int(spec.get("max", 2 ** 31 - 1))
+        if np is not None:
+            return rng.integers(low, high + 1, size=size, dtype=np.int64).tolist()
+        return [random.randint(low, high) for _ in range(size)]
+    if kind == "string":
+        length = int(spec.get("length", 16))
+        alphabet = spec.get("alphabet", ALPHABET)
+        if np is not None:
+            codes = np.frombuffer(alphabet.encode("ascii"), dtype=np.uint8)
+            chars = codes[rng.integers(0, len(codes), size=(size, length))]
+            return [row.tobytes().decode("ascii") for row in chars]
+        return ["".join(random.choices(alphabet, k=length)) for _ in range(size)]
+    if kind == "uuid":
+        raw = rng.bytes(16 * size) if np is not None else os.urandom(16 * size)
+        return [str(uuid.UUID(bytes=raw[i * 16:(i + 1) * 16], version=4)) for i in range(size)]
+    if kind == "choice":
+        values = spec["values"]
+        weights = spec.get("weights")
+        if np is not None:
+            p = None
+            if weights:
+                total = float(sum(weights))
+                p = [w / total for w in weights]
+            return [values[i] for i in rng.choice(len(values), size=size, p=p).tolist()]
+        return random.choices(values, weights=weights, k=size)
+    raise ValueError(f"未知生成器类型：{kind}")
+
+
+def compile_template(template):
+    """将含 ${gen.x} 占位符的数据结构预编译为渲染函数 render(row)，不含占位符的部分直接复用"""
+    if isinstance(template, dict):
+        parts = [(k, compile_template(v)) for k, v in template.items()]
+        if all(fn is None for _, fn in parts):
+            return None
+        return lambda row: {k: (fn(row) if fn else template[k]) for k, fn in parts}
+    if isinstance(template, list):
+        parts = [compile_template(v) for v in template]
+        if all(fn is None for fn in parts):
+            return None
+        return lambda row: [fn(row) if fn else template[i] for i, fn in enumerate(parts)]
+    if isinstance(template, str) and "${gen." in template:
+        whole = PLACEHOLDER.fullmatch(template)
+        if whole:
+            name = whole.group(1)
+            return lambda row: row[name]
+        return lambda row: PLACEHOLDER.sub(lambda m: str(row[m.group(1)]), template)
+    return None
+
+
+class PayloadGenerator:
+    """批量预生成 + 共享游标：next_row() 线程安全，全局每行只领取一次"""
+    def __init__(self, specs, batch_size=8192, seed=None):
+        self.specs = specs
+        self.batch_size = batch_size
+        self.rng = np.random.default_rng(seed) if np is not None else None
+        self._ready = queue.Queue(maxsize=2)  # 后台预生成的批次（双缓冲）
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._next_offset = 0
+        self._rows = []
+        self._cursor = 0
+        self.consumed = 0
+        self._thread = None
+
+    def _make_batch(self):
+        offset = self._next_offset
+        self._next_offset += self.batch_size
+        columns = {name: _column(spec, offset, self.batch_size, self.rng) for name, spec in self.specs.items()}
+        names = list(columns)
+        return [dict(zip(names, values)) for values in zip(*(columns[n] for n in names))]
+
+    def _produce(self):
+        while not self._stop.is_set():
+            batch = self._make_batch()
+            while not self._stop.is_set():
+                try:
+                    self._ready.put(batch, timeout=0.2)
+                    break
+                except queue.Full:
+                    continue
+
+    def start(self):
+        """同步生成首批（避免首个请求等待），其余批次交给后台线程"""
+        self._rows = self._make_batch()
+        self._cursor = 0
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _next_batch(self):
+        """取下一批：后台线程已停止（stop() 或异常退出）且无现成批次时在当前线程同步生成，不会无限等待"""
+        while True:
+            try:
+                return self._ready.get(timeout=0.2)
+            except queue.Empty:
+                if not self._thread.is_alive():  # 后台线程已退出，不会再并发推进 _next_offset
+                    return self._make_batch()
+
+    def next_row(self):
+        with self._lock:
+            if self._cursor >= len(self._rows):
+                self._rows = self._next_batch()
+                self._cursor = 0
+            row = self._rows[self._cursor]
+            self._cursor += 1
+            self.consumed += 1
+            return row
+
+
+class PayloadRenderer:
+    """按请求渲染 请求头/请求体：每次调用领取生成器的一行"""
+    def __init__(self, generator, headers, data_list):
+        self.generator = generator
+        self.render_headers = compile_template(headers)
+        self.render_data = [compile_template(d) for d in data_list] if isinstance(data_list, list) else [compile_template(data_list)]
+
+    def render(self, headers, data, data_pos):
+        row = self.generator.next_row()
+        fn = self.render_data[data_pos % len(self.render_data)] if self.render_data else None
+        return (self.render_headers(row) if self.render_headers else headers,
+                fn(row) if fn else data)
@@ -0,0 +1,824 @@
+import threading
+import time
+import json
+import re
+from harness_monitor import TimedLock
+from http_timing import CONN_MODES, PHASES, CancelScope, new_session, set_cancel_scope, timed_request
+from press_stats import EndpointStats, LatencyHeatmap, LatencyHistogram
+from request_capture import CaptureBuffer
+import bandwidth
+
+# ===================== 压测引擎（无界面依赖） =====================
+# 工作线程主循环与统计数据，不直接操作Tk控件：
+# 日志/响应输出通过 log(content, level)、show(text, tag) 回调交给调用方（界面或基准测试）
+
+MAX_ERROR_TYPES = 32  # 异常类型分布的上限，超出部分归入"其他"
+CLAIM_BATCH = 16  # 每个线程一次预留的请求序号个数（临近领完时自动缩小，避免尾部个别线程囤号）
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+class StatsShard:
+    """统计分片：每个工作线程一个，只有所属线程写入；读取方（快照/汇总/窗口）逐个分片短暂加锁合并。
+    各线程记录结果时互不争用同一把锁，在无GIL（free-threaded）解释器下可随核数扩展"""
+    def __init__(self):
+        self.lock = TimedLock()
+        self.success = 0
+        self.fail = 0
+        self.cancelled = 0
+        self.response_times = []
+        self.status_codes = {}
+        self.error_types = {}
+        self.rt_hist = LatencyHistogram()
+        self.phase_hist = {phase: LatencyHistogram() for phase in PHASES}
+        self.endpoint_stats = {}
+        self.bytes = dict.fromkeys(bandwidth.SIZE_KEYS, 0)
+        self.bandwidth_series = []  # 每秒 [秒, 发送字节, 接收字节]
+        self.heatmap = LatencyHeatmap()
+        self.capture = None  # 慢请求/失败请求捕获（启用 request_capture 时首次记录创建）
+        self.last_complete_time = 0
+        self.claim_next = 0  # 本线程预留的请求序号区间 [claim_next, claim_end)，只有所属线程读写
+        self.claim_end = 0
+        self.claimed = 0     # 本线程实际领取（已发出或正在发出）的请求数
+        self.new_window()
+
+    def new_window(self):
+        self.window_hist = LatencyHistogram()
+        self.window_success = 0
+        self.window_fail = 0
+
+    def merge(self, other, full=True):
+        """把另一个分片的累计数据并入本分片（调用方持有 other 的锁）；
+        full=False 时跳过随压测时长增长的逐请求样本、带宽序列与热力图，供高频快照使用"""
+        self.success += other.success
+        self.fail += other.fail
+        self.cancelled += other.cancelled
+        for code, n in other.status_codes.items():
+            self.status_codes[code] = self.status_codes.get(code, 0) + n
+        for kind, n in other.error_types.items():
+            if kind not in self.error_types and len(self.error_types) >= MAX_ERROR_TYPES:
+                kind = "其他"
+            self.error_types[kind] = self.error_types.get(kind, 0) + n
+        self.rt_hist.merge(other.rt_hist)
+        for phase, hist in other.phase_hist.items():
+            self.phase_hist[phase].merge(hist)
+        for name, stats in other.endpoint_stats.items():
+            _endpoint_stats(self, name).merge(stats)
+        for key in bandwidth.SIZE_KEYS:
+            self.bytes[key] += other.bytes[key]
+        self.last_complete_time = max(self.last_complete_time, other.last_complete_time)
+        if not full:
+            return
+        self.response_times.extend(other.response_times)
+        if other.bandwidth_series:
+            series = {sec: [sec, sent, recv] for sec, sent, recv in self.bandwidth_series}
+            for sec, sent, recv in other.bandwidth_series:
+                point = series.setdefault(sec, [sec, 0, 0])
+                point[1] += sent
+                point[2] += recv
+            self.bandwidth_series = sorted(series.values())
+        self.heatmap.merge(other.heatmap)
+        if other.capture is not None:
+            if self.capture is None:
+                self.capture = CaptureBuffer(other.capture.top_k, other.capture.max_failures)
+            self.capture.merge(other.capture)
+
+
+class TestData:
+    """统一管理压测所有统计数据，线程安全：
+    预留序号/运行状态由 lock 保护；请求结果记录在各工作线程自己的 StatsShard 中，读取时合并"""
+    def __init__(self):
+        self.lock = TimedLock()  # 取号锁，带等待/持有耗时统计，供压测机自检使用
+        self.current_request = 0  # 已预留给各线程的最大序号（含线程尚未用完的预留）
+        self.total_requests = 0
+        self.thread_num = 0
+        self.is_running = False
+        self.test_start_time = 0
+        self.test_end_time = 0
+        self.cancel_scope = CancelScope()
+        self.warmup = None  # 本轮的预热计划（WarmupPlan），无预热时为None
+        self.keep_samples = True  # 是否保留逐请求响应时间列表与带宽序列；长稳模式关闭，仅用直方图（内存恒定）
+        self.capture = None  # 本轮的请求捕获设置（request_capture.RequestCapture），未启用时为None
+        self.shards = []
+        self._local = threading.local()
+        self.window_start = time.perf_counter()
+
+    def reset(self, total_requests, thread_num):
+        """新一轮压测前重置统计数据（旧分片整体丢弃，上一轮残留线程的写入不会混入本轮）"""
+        with self.lock:
+            self.current_request = 0
+            self.total_requests = total_requests
+            self.thread_num = thread_num
+            self.warmup = None
+            self.capture = None
+            self.shards = []
+            self._local = threading.local()
+            self.window_start = time.perf_counter()
+            self.is_running = True
+            self.test_start_time = time.perf_counter()  # 单调时钟，仅用于计算耗时
+            self.test_end_time = 0
+            self.cancel_scope = CancelScope()
+
+    def shard(self):
+        """当前线程的统计分片（首次调用时创建并登记）"""
+        local = self._local
+        shard = getattr(local, "shard", None)
+        if shard is None:
+            shard = local.shard = StatsShard()
+            with self.lock:
+                self.shards.append(shard)
+        return shard
+
+    def merged(self, full=True):
+        """合并所有分片，返回一个独立的 StatsShard（逐个分片短暂加锁；full 含义见 StatsShard.merge）"""
+        total = StatsShard()
+        with self.lock:
+            shards = list(self.shards)
+        for shard in shards:
+            with shard.lock:
+                total.merge(shard, full)
+        return total
+
+    def started_requests(self):
+        """已实际领取的请求数（各线程已领取数之和，不含预留未用的序号）"""
+        with self.lock:
+            shards = list(self.shards)
+        return sum(shard.claimed for shard in shards)
+
+    def lock_stats(self):
+        """取号锁 + 各分片锁的累计 (获取次数, 等待ns, 持有ns)，供压测机自检计算争用"""
+        locks = [self.lock] + list(self.shards)
+        locks = [getattr(lock, "lock", lock) for lock in locks]
+        return (sum(lock.acquisitions for lock in locks), sum(lock.wait_ns for lock in locks),
+                sum(lock.hold_ns for lock in locks))
+
+    def reset_lock_stats(self):
+        self.lock.reset_stats()
+        for shard in list(self.shards):
+            shard.lock.reset_stats()
+
+    # 以下为合并后的只读视图（兼容直接读取累计值的调用方，每次访问都会合并一次）
+    @property
+    def success_count(self):
+        return self.merged(False).success
+
+    @property
+    def fail_count(self):
+        return self.merged(False).fail
+
+    @property
+    def cancelled_count(self):
+        return self.merged(False).cancelled
+
+    @property
+    def completed_requests(self):
+        merged = self.merged(False)
+        return merged.success + merged.fail
+
+    @property
+    def response_times(self):
+        return self.merged().response_times
+
+    @property
+    def status_code_dict(self):
+        return self.merged(False).status_codes
+
+    @property
+    def rt_hist(self):
+        return self.merged(False).rt_hist
+
+
+# ===================== 预热阶段 =====================
+def parse_warmup(text):
+    """解析预热配置："50" → 预热50次请求；"10s" → 预热10秒；空/0 → 不预热。返回 (请求数, 秒数)"""
+    text = str(text or "").strip().lower()
+    if not text or text == "0":
+        return 0, 0
+    if text.endswith("s"):
+        seconds = float(text[:-1])
+        if seconds < 0:
+            raise ValueError("预热时长不能为负数")
+        return 0, seconds
+    count = int(text)
+    if count < 0:
+        raise ValueError("预热请求数不能为负数")
+    return count, 0
+
+
+class WarmupPlan:
+    """预热计划：按请求数或时长预热（每个线程至少发1次以建立连接），
+    全部线程预热结束后同步进入正式压测，并从此刻开始计时；预热请求单独统计"""
+    def __init__(self, test_data, thread_num, requests=0, seconds=0, log=_noop):
+        self.test_data = test_data
+        self.requests = requests
+        self.seconds = seconds
+        self.log = log
+        self.issued = 0
+        self.errors = 0
+        self.rt_hist = LatencyHistogram()
+        self.status_code_dict = {}
+        self.start_time = time.perf_counter()
+        self.end_time = 0
+        self.lock = threading.Lock()
+        self.barrier = threading.Barrier(thread_num, action=self._begin_steady)
+
+    def take(self, first):
+        """领取一次预热请求名额"""
+        if not self.test_data.is_running:
+            return False
+        with self.lock:
+            if first or (self.seconds and time.perf_counter() - self.start_time < self.seconds) or self.issued < self.requests:
+                self.issued += 1
+                return True
+        return False
+
+    def record(self, rt, code):
+        with self.lock:
+            self.rt_hist.record(rt)
+            self.status_code_dict[code] = self.status_code_dict.get(code, 0) + 1
+
+    def record_error(self):
+        with self.lock:
+            self.errors += 1
+            self.status_code_dict["ERROR"] = self.status_code_dict.get("ERROR", 0) + 1
+
+    def wait(self):
+        """等待所有线程预热完成；停止压测时屏障被中止，直接返回"""
+        try:
+            self.barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+
+    def abort(self):
+        self.barrier.abort()
+
+    def _begin_steady(self):
+        # 由最后一个到达屏障的线程执行：正式压测从此刻开始计时
+        self.end_time = time.perf_counter()
+        self.test_data.test_start_time = self.end_time
+        self.log(f"🔥 预热完成：{self.issued} 次请求 | 耗时 {round(self.end_time - self.start_time, 2)}s | "
+                 f"错误 {self.errors}，开始正式压测（预热数据不计入统计）", "INFO")
+
+    def summary(self):
+        return {
+            "requests": self.issued,
+            "errors": self.errors,
+            "duration": round((self.end_time or time.perf_counter()) - self.start_time, 2),
+            "rt": self.rt_hist.summary(),
+            "status_codes": dict(self.status_code_dict),
+        }
+
+
+def format_warmup(warmup):
+    """报表中的预热段落"""
+    if not warmup:
+        return ""
+    rt = warmup["rt"]
+    return (f"🔥 预热(不计入统计)：{warmup['requests']} 次 | 耗时 {warmup['duration']}s | 错误 {warmup['errors']} | "
+            f"响应时间 平均 {rt['mean']}ms / p99 {rt['p99']}ms / 最大 {rt['max']}ms\n")
+
+
+def record_response(test_data, rt, code, phases, success, endpoint=None, sizes=None, request_id=None):
+    """记录一次完成的请求（含分阶段耗时），调用方无需持锁；endpoint 为多接口混合压测的接口名，
+    sizes 为 bandwidth.measure 的字节数，request_id 为启用请求捕获时注入的请求ID"""
+    shard = test_data.shard()
+    now = time.perf_counter()
+    sec = max(int(now - test_data.test_start_time), 0)
+    with shard.lock:
+        if sizes is not None:
+            _record_sizes(shard, sizes, sec if test_data.keep_samples else None)
+        if endpoint is not None:
+            _endpoint_stats(shard, endpoint).record(rt, code, success)
+        if test_data.keep_samples:
+            shard.response_times.append(rt)
+        shard.rt_hist.record(rt)
+        shard.window_hist.record(rt)
+        shard.heatmap.record(sec, rt)
+        for phase, value in phases.items():
+            shard.phase_hist[phase].record(value)
+        shard.status_codes[code] = shard.status_codes.get(code, 0) + 1
+        if request_id is not None:
+            _capture_buffer(shard, test_data).record(rt, request_id, code, phases, success)
+        if success:
+            shard.success += 1
+            shard.window_success += 1
+        else:
+            shard.fail += 1
+            shard.window_fail += 1
+        shard.last_complete_time = now
+
+
+def _record_sizes(shard, sizes, sec=None):
+    totals = shard.bytes
+    for key, n in zip(bandwidth.SIZE_KEYS, sizes):
+        totals[key] += n
+    if sec is not None:
+        series = shard.bandwidth_series
+        if not series or series[-1][0] != sec:
+            series.append([sec, 0, 0])
+        series[-1][1] += sizes[0]
+        series[-1][2] += sizes[2]
+
+
+def _capture_buffer(shard, test_data):
+    buffer = shard.capture
+    if buffer is None:
+        buffer = shard.capture = CaptureBuffer(test_data.capture.top_k, test_data.capture.max_failures)
+    return buffer
+
+
+def _endpoint_stats(shard, endpoint):
+    stats = shard.endpoint_stats.get(endpoint)
+    if stats is None:
+        stats = shard.endpoint_stats[endpoint] = EndpointStats()
+    return stats
+
+
+def _is_refused(error):
+    """沿异常链（requests/urllib3 的包装异常）查找连接被拒绝"""
+    for _ in range(6):
+        if error is None or isinstance(error, ConnectionRefusedError):
+            return error is not None
+        wrapped = error.args[0] if error.args and isinstance(error.args[0], BaseException) else None
+        error = wrapped or getattr(error, "reason", None) or error.__cause__
+    return False
+
+
+def error_type(error):
+    """异常归类键：按异常类名统计，避免以异常原文为键导致分布无限增长；
+    被库包装的"连接被拒绝"单独归为 ConnectionRefusedError（自动中止规则据此识别拒绝连接风暴）"""
+    if error is None:
+        return "ERROR"
+    if isinstance(error, OSError) and _is_refused(error):
+        return "ConnectionRefusedError"
+    return type(error).__name__
+
+
+def record_error(test_data, error=None, endpoint=None, request_id=None):
+    """记录一次失败的请求（异常/超时等无状态码的情况）"""
+    kind = error_type(error)
+    shard = test_data.shard()
+    with shard.lock:
+        if endpoint is not None:
+            _endpoint_stats(shard, endpoint).record_error()
+        if request_id is not None:
+            _capture_buffer(shard, test_data).record_error(request_id, error)
+        shard.fail += 1
+        shard.window_fail += 1
+        shard.status_codes["ERROR"] = shard.status_codes.get("ERROR", 0) + 1
+        if kind not in shard.error_types and len(shard.error_types) >= MAX_ERROR_TYPES:
+            kind = "其他"
+        shard.error_types[kind] = shard.error_types.get(kind, 0) + 1
+        shard.last_complete_time = time.perf_counter()
+
+
+def record_failure(test_data, error, endpoint=None, request_id=None):
+    """请求异常：本轮已取消时计为"取消"（连接被主动关闭），否则计为失败"""
+    if test_data.cancel_scope.cancelled:
+        shard = test_data.shard()
+        with shard.lock:
+            shard.cancelled += 1
+        return False
+    record_error(test_data, error, endpoint, request_id)
+    return True
+
+
+def claim_request(test_data):
+    """领取下一个请求序号（从1开始）；已停止或已领完时返回 (None, 总数)。
+    每个线程一次在取号锁下预留一小段序号，之后逐个从本线程分片中领取，热路径不再争用全局锁；
+    序号全局唯一，但不同线程之间不保证按发出顺序递增"""
+    shard = test_data.shard()
+    if not test_data.is_running:
+        return None, test_data.total_requests
+    if shard.claim_next >= shard.claim_end:
+        with test_data.lock:
+            remaining = test_data.total_requests - test_data.current_request
+            if not test_data.is_running or remaining <= 0:
+                return None, test_data.total_requests
+            batch = max(min(CLAIM_BATCH, remaining // (test_data.thread_num * 4 or 1)), 1)
+            shard.claim_next = test_data.current_request + 1
+            test_data.current_request += batch
+            shard.claim_end = test_data.current_request + 1
+    seq = shard.claim_next
+    shard.claim_next += 1
+    shard.claimed += 1
+    return seq, test_data.total_requests
+
+
+def end_run(test_data):
+    """结束一轮压测并记录结束时间；只有第一个调用方返回True（自然结束与手动停止并发时只收尾一次）"""
+    with test_data.lock:
+        if not test_data.is_running:
+            return False
+        test_data.is_running = False
+        test_data.test_end_time = time.perf_counter()
+    return True
+
+
+def cancel_run(test_data):
+    """立即停止一轮压测：不再领取新请求，并关闭在途请求的连接（阻塞中的请求立即返回）"""
+    with test_data.lock:
+        test_data.is_running = False
+    if test_data.warmup:
+        test_data.warmup.abort()  # 唤醒仍在等待预热屏障的线程
+    test_data.cancel_scope.cancel()
+
+
+def take_window(test_data):
+    """取出当前统计窗口并开启新窗口，返回 (直方图, 成功数, 失败数, 窗口秒数)"""
+    hist, success, fail = LatencyHistogram(), 0, 0
+    with test_data.lock:
+        shards = list(test_data.shards)
+        now = time.perf_counter()
+        seconds = now - test_data.window_start
+        test_data.window_start = now
+    for shard in shards:
+        with shard.lock:
+            hist.merge(shard.window_hist)
+            success += shard.window_success
+            fail += shard.window_fail
+            shard.new_window()
+    return hist, success, fail, seconds
+
+
+def heatmap_columns(test_data, since_sec):
+    """合并各分片热力图第 since_sec 秒之后的列（界面增量绘制用，开销与压测时长无关）"""
+    with test_data.lock:
+        shards = list(test_data.shards)
+    columns = {}
+    for shard in shards:
+        with shard.lock:
+            part = shard.heatmap.since(since_sec)
+        for sec, counts in part:
+            column = columns.setdefault(sec, {})
+            for band, n in counts.items():
+                column[band] = column.get(band, 0) + n
+    return sorted(columns.items())
+
+
+def snapshot(test_data):
+    """复制一份当前统计（计数 + 直方图拷贝），合并时逐个分片短暂加锁，不影响其他工作线程；
+    快照创建后不再修改，界面刷新/指标导出等读取方可随意持有"""
+    with test_data.lock:
+        head = {
+            "time": time.perf_counter(),
+            "start_time": test_data.test_start_time,
+            "running": test_data.is_running,
+            "total_requests": test_data.total_requests,
+            "thread_num": test_data.thread_num,
+        }
+    head["started"] = test_data.started_requests()
+    merged = test_data.merged(full=False)
+    head.update({
+        "completed": merged.success + merged.fail,
+        "success": merged.success,
+        "fail": merged.fail,
+        "status_codes": merged.status_codes,
+        "error_types": merged.error_types,
+        "bytes": merged.bytes,
+        "rt_hist": merged.rt_hist,
+        "phase_hist": merged.phase_hist,
+    })
+    return head
+
+
+def build_summary(test_data):
+    """汇总统计数据为字典，供界面报表与导出共用"""
+    merged = test_data.merged()
+    total_req = test_data.total_requests
+    success_cnt = merged.success
+    fail_cnt = merged.fail
+    completed = success_cnt + fail_cnt
+    total_time = round(test_data.test_end_time - test_data.test_start_time, 2) if test_data.test_end_time else 0
+    # 有效时长：开始 → 最后一个请求完成（不含停止后等待/收尾时间）
+    active_end = merged.last_complete_time or test_data.test_end_time
+    active_time = active_end - test_data.test_start_time if active_end else 0
+    started = test_data.started_requests()
+    rt_hist = merged.rt_hist
+    return {
+        "total_requests": total_req,
+        "completed": completed,
+        "success": success_cnt,
+        "fail": fail_cnt,
+        "cancelled": merged.cancelled,
+        "in_flight": max(started - completed - merged.cancelled, 0),
+        "unsent": max(total_req - started, 0) if total_req != float("inf") else 0,
+        "total_time": total_time,
+        "active_time": round(active_time, 3),
+        "success_rate": round((success_cnt / completed) * 100, 2) if completed > 0 else 0,
+        "qps": round(completed / active_time, 2) if active_time > 0 else 0,
+        "avg_rt": round(rt_hist.mean(), 2),
+        "min_rt": round(rt_hist.min, 2),
+        "max_rt": round(rt_hist.max, 2),
+        "p50_rt": round(rt_hist.percentile(50), 2),
+        "p90_rt": round(rt_hist.percentile(90), 2),
+        "p99_rt": round(rt_hist.percentile(99), 2),
+        "status_codes": merged.status_codes,
+        "error_types": merged.error_types,
+        "endpoints": {name: stats.summary(active_time) for name, stats in merged.endpoint_stats.items()},
+        "bandwidth": bandwidth.summarize(merged.bytes, active_time, merged.bandwidth_series),
+        "phases": {phase: hist.to_dict() for phase, hist in merged.phase_hist.items()},
+        "connections": connection_summary(merged.phase_hist, completed, active_time),
+        "heatmap": merged.heatmap.to_dict(),
+        "warmup": test_data.warmup.summary() if test_data.warmup else None,
+        "capture": _capture_summary(test_data, merged),
+    }
+
+
+def _capture_summary(test_data, merged):
+    capture = test_data.capture
+    if capture is None:
+        return None
+    data = merged.capture.summary() if merged.capture is not None else {"slowest": [], "failures": [], "failures_dropped": 0}
+    return {"header": capture.header, "run_id": capture.run_id, **data}
+
+
+def connection_summary(phase_hist, completed, active_time):
+    """建连统计：新建连接数即 connect 阶段样本数，TLS握手按完整/会话恢复区分（raw/WebSocket 引擎不产生阶段数据）"""
+    new = phase_hist["connect"].count
+    full, resumed = phase_hist["tls"].count, phase_hist["tls_resumed"].count
+    return {
+        "new": new,
+        "new_per_sec": round(new / active_time, 2) if active_time > 0 else 0,
+        "requests_per_connection": round(completed / new, 2) if new else 0,
+        "tls_full": full,
+        "tls_resumed": resumed,
+        "resume_rate": round(resumed / (full + resumed) * 100, 2) if full + resumed else 0,
+        "connect_p50": round(phase_hist["connect"].percentile(50), 3),
+        "tls_full_p50": round(phase_hist["tls"].percentile(50), 3),
+        "tls_resumed_p50": round(phase_hist["tls_resumed"].percentile(50), 3),
+    }
+
+
+def format_connections(connections, mode=None):
+    """报表中的建连段落（新建连接/秒 与 请求/秒 分开衡量）"""
+    if not connections or not connections["new"]:
+        return ""
+    line = (f"🔗 连接：{CONN_MODES.get(mode, mode) if mode else ''}{' | ' if mode else ''}新建连接 {connections['new']} 次"
+            f"（{connections['new_per_sec']} 次/秒，TCP建连 p50 {connections['connect_p50']}ms） | "
+            f"平均每连接 {connections['requests_per_connection']} 个请求")
+    if connections["tls_full"] or connections["tls_resumed"]:
+        line += (f"\n   TLS握手：完整 {connections['tls_full']} 次（p50 {connections['tls_full_p50']}ms） | "
+                 f"会话恢复 {connections['tls_resumed']} 次（p50 {connections['tls_resumed_p50']}ms） | "
+                 f"恢复率 {connections['resume_rate']}%")
+    return line + "\n"
+
+
+def format_phases(phases):
+    """报表中的分阶段耗时段落"""
+    names = {"dns": "DNS解析", "connect": "TCP建连", "tls": "TLS握手", "tls_resumed": "TLS恢复", "ttfb": "首字节", "transfer": "传输"}
+    lines = ["🧭 分阶段耗时(ms)   样本数 /   平均 /  p50 /  p90 /  p99 /  最大"]
+    for phase in PHASES:
+        h = phases[phase]
+        lines.append(f"   {names[phase]:<6} {h['count']:>8} / {h['mean']:>8} / {h['p50']:>6} / {h['p90']:>6} / {h['p99']:>6} / {h['max']:>6}")
+    return "\n".join(lines) + "\n"
+
+
+def format_endpoints(endpoints, shares=None):
+    """报表中的多接口分项段落（合计见上方总体指标）"""
+    if not endpoints:
+        return ""
+    lines = ["🔀 分接口统计：名称 | 占比 | 请求数 | 成功率 | QPS | 平均 | p50 | p99 | 状态码"]
+    for name, e in endpoints.items():
+        share = f"{shares[name]}%" if shares and name in shares else "-"
+        lat = e["latency"]
+        lines.append(f"   {name} | {share} | {e['requests']} | {e['success_rate']}% | {e['qps']} | "
+                     f"{lat['mean']}ms | {lat['p50']}ms | {lat['p99']}ms | {e['status_codes']}")
+    return "\n".join(lines) + "\n"
+
+
+def parse_json(text, log=_noop):
+    """JSON文本解析"""
+    try:
+        return json.loads(text.strip()) if text.strip() else {}
+    except Exception as e:
+        log(f"JSON格式解析失败：{str(e)}，将使用空字典", "WARN")
+        return {}
+
+
+def load_data_list(data_str, log=_noop):
+    """解析请求体参数：单个参数/参数数组，或 {"file": 路径} 从文件加载参数数组；失败返回None"""
+    data = parse_json(data_str, log)
+    if isinstance(data, dict) and "file" in data:
+        # 如果data包含file字段,从文件加载参数数组
+        file_path = data["file"]
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                data_list = json.load(f)
+            if not isinstance(data_list, list):
+                log(f"❌ 文件内容必须是JSON数组格式", "ERROR")
+                return None
+            log(f"✅ 从文件加载了 {len(data_list)} 组参数", "SUCCESS")
+            return data_list
+        except Exception as e:
+            log(f"❌ 加载参数文件失败：{str(e)}", "ERROR")
+            return None
+    # 使用单个参数或参数数组
+    return data if isinstance(data, list) else [data]
+
+
+def _send_once(session, url, method, headers, data, timeout, wire=None):
+    """按请求方法发送一次请求，返回 (resp, 响应时间ms, 分阶段耗时)；
+    wire 启用请求体压缩时发送预压缩的JSON，并在 resp.decoded_body_len 记录压缩前字节数；
+    wire 带上传文件时 POST/PUT 直接发送共享内存映射（不复制文件内容）；
+    data 为字节串时（签名钩子已序列化请求体）原样发送"""
+    if method.upper() == "GET":
+        return timed_request(session, "GET", url, headers=headers, timeout=timeout)
+    elif wire is not None and wire.upload is not None and method.upper() in ("POST", "PUT"):
+        upload = wire.upload
+        return timed_request(session, method.upper(), url, headers={**headers, **upload.headers}, data=upload.body(), timeout=timeout)
+    elif method.upper() in ["POST", "PUT", "DELETE"]:
+        if isinstance(data, bytes):
+            return timed_request(session, method.upper(), url, headers=headers, data=data, timeout=timeout)
+        if wire is not None and wire.compress:
+            body, raw_len = wire.encode(data)
+            result = timed_request(session, method.upper(), url, headers={**headers, **wire.body_headers}, data=body, timeout=timeout)
+            result[0].decoded_body_len = raw_len
+            return result
+        return timed_request(session, method.upper(), url, headers=headers, json=data, timeout=timeout)
+    raise Exception(f"不支持的请求方法：{method}")
+
+
+def _pick_data(data_list, data_pos):
+    return data_list[data_pos % len(data_list)] if isinstance(data_list, list) and data_list else data_list
+
+
+def _prepare_request(seq, url, method, headers, data_list, payload=None, mix=None):
+    """按请求序号确定本次请求，返回 (接口名, url, method, headers, data)；单接口压测时接口名为None"""
+    name = None
+    if mix:
+        endpoint, seq = mix.pick(seq)
+        name, url, method, headers, data_list, payload = (endpoint.name, endpoint.url, endpoint.method,
+                                                          endpoint.headers, endpoint.data_list, endpoint.renderer)
+    data = _pick_data(data_list, seq)
+    if payload:
+        headers, data = payload.render(headers, data, seq)
+    return name, url, method, headers, data
+
+
+def _run_warmup(warmup, session, url, method, headers, data_list, timeout, payload=None, mix=None, wire=None, hooks=None):
+    """预热：在本线程的Session上建立连接并发送预热请求，结束后等待其他线程"""
+    first = True
+    data_index = 0
+    while warmup.take(first):
+        first = False
+        _, req_url, req_method, req_headers, data = _prepare_request(data_index, url, method, headers, data_list, payload, mix)
+        data_index += 1
+        try:
+            if hooks is not None:
+                req_headers, data = hooks.apply(req_method, req_url, req_headers, data)
+            resp, rt, _ = _send_once(session, req_url, req_method, req_headers, data, timeout, wire)
+            warmup.record(rt, resp.status_code)
+        except Exception:
+            warmup.record_error()
+    warmup.wait()
+
+
+def send_request(test_data, url, method, headers, data_list, timeout, log=_noop, show=_noop, warmup=None, session=None, payload=None,
+                 mix=None, wire=None, conn_mode="reuse", hooks=None):
+    """单请求发送逻辑（每个工作线程一个Session，按 conn_mode 复用或每请求新建连接；可传入已有Session以沿用其热连接）
+    payload 为 payload_gen.PayloadRenderer 时，每个请求领取一行合成数据渲染请求头/请求体；
+    mix 为 endpoint_mix.EndpointMix 时，按权重在多个接口间分配请求（忽略 url/method/headers/data_list/payload）；
+    wire 为 bandwidth.WireOptions 时按其设置压缩请求体 / 指定 Accept-Encoding；
+    hooks 为 request_hooks.HookChain 时每个请求发送前执行签名/动态请求头钩子"""
+    session = session or new_session(conn_mode)
+    if wire is not None:
+        wire.apply_session(session)
+    set_cancel_scope(test_data.cancel_scope)
+    capture = test_data.capture
+    # 日志/响应输出为空回调时（基准测试、批量压测、容量探测、长稳模式）跳过逐请求的格式化与响应JSON解析
+    verbose_log, verbose_show = log is not _noop, show is not _noop
+    if warmup:
+        _run_warmup(warmup, session, url, method, headers, data_list, timeout, payload, mix, wire, hooks)
+    while True:
+        current, total = claim_request(test_data)
+        if current is None:
+            break
+
+        # 按全局请求序号从参数列表取数据（各线程共享游标，不再各自从第0组开始）
+        endpoint, req_url, req_method, req_headers, data = _prepare_request(current - 1, url, method, headers, data_list, payload, mix)
+        request_id = None
+        if capture is not None:
+            request_id = capture.request_id(current)
+            req_headers = {**req_headers, capture.header: request_id}
+
+        if verbose_log:
+            log(f"正在压测：{current}/{total} 次请求", "PROGRESS")
+
+        try:
+            # 签名钩子在 try 内执行：钩子异常（序列化/签名失败）与请求异常一样计为失败，不会终止工作线程
+            if hooks is not None:
+                req_headers, data = hooks.apply(req_method, req_url, req_headers, data)
+
+            # 在响应窗口显示请求参数
+            if verbose_show:
+                request_info = f"\n{'='*60}\n请求 #{current}{f' [{endpoint}]' if endpoint else ''}\n{'='*60}\n"
+                request_info += f"URL: {req_url}\n"
+                request_info += f"Method: {req_method}\n"
+                request_info += f"Headers: {json.dumps(req_headers, ensure_ascii=False, indent=2)}\n"
+                request_info += f"Data: {data.decode('utf-8', 'replace') if isinstance(data, bytes) else json.dumps(data, ensure_ascii=False, indent=2)}\n"
+                show(request_info, "REQUEST")
+
+            resp, rt, phases = _send_once(session, req_url, req_method, req_headers, data, timeout, wire)
+            rt = round(rt, 2)
+            sizes = bandwidth.measure(resp, getattr(resp, "decoded_body_len", None))
+
+            # 在响应窗口显示响应结果
+            if verbose_show:
+                response_info = f"\n响应 #{current}\n"
+                response_info += f"状态码: {resp.status_code}\n"
+                response_info += f"响应时间: {rt}ms\n"
+                try:
+                    response_data = resp.json()
+                    response_info += f"响应内容:\n{json.dumps(response_data, ensure_ascii=False, indent=2)}\n"
+                except Exception:
+                    response_info += f"响应内容:\n{resp.text[:1000]}\n"
+                show(response_info, "RESPONSE")
+
+            code = resp.status_code
+            record_response(test_data, rt, code, phases, 200 <= code < 300, endpoint, sizes, request_id)
+
+            if verbose_log:
+                log(f"请求成功 | 状态码：{code} | 响应时间：{rt}ms", "SUCCESS")
+        except Exception as e:
+            if not record_failure(test_data, e, endpoint, request_id):
+                break  # 本轮已取消
+            if verbose_show:
+                show(f"\n错误 #{current}\n错误信息: {str(e)}\n", "ERROR")
+            if verbose_log:
+                log(f"请求失败 | 错误原因：{str(e)}", "ERROR")
+
+
+# ===================== 链式调用：变量替换+API2压测 =====================
+def extract_json_value(json_data, key_path):
+    """根据键路径提取JSON值，支持多级路径 例：data.user.id → 逐层取值"""
+    try:
+        keys = key_path.split(".")
+        value = json_data
+        for k in keys:
+            if isinstance(value, dict) and k in value:
+                value = value[k]
+            else:
+                return None
+        return value
+    except Exception:
+        return None
+
+
+def replace_variables(content, data_dict):
+    """替换内容中的 ${变量名} 为API1响应的实际值，支持多级路径"""
+    if not content or not data_dict:
+        return content
+    # 正则匹配 ${xxx.xxx} 格式的变量
+    pattern = r"\$\{([\w\.]+)\}"
+    matches = re.findall(pattern, content)
+    for key_path in matches:
+        real_value = extract_json_value(data_dict, key_path)
+        if real_value is not None:
+            # 区分字符串/数字类型，保持原始格式
+            if isinstance(real_value, (int, float, bool)):
+                content = content.replace(f"${{{key_path}}}", str(real_value))
+            else:
+                content = content.replace(f"${{{key_path}}}", json.dumps(real_value).strip('"'))
+    return content
+
+
+def send_chain_request(test_data, url, method, timeout, raw_headers, raw_data, variables, log=_noop):
+    """链式调用核心：变量替换+调用API2（每次请求新建Session）"""
+    set_cancel_scope(test_data.cancel_scope)
+    while True:
+        current, total = claim_request(test_data)
+        if current is None:
+            break
+
+        log(f"📶 链式压测进度：{current}/{total} 次请求", "PROGRESS")
+        try:
+            # 变量替换：API2请求头/体 替换为API1的实际值
+            replaced_headers = replace_variables(raw_headers, variables)
+            replaced_data = replace_variables(raw_data, variables)
+            headers = parse_json(replaced_headers, log)
+            data = parse_json(replaced_data, log)
+
+            # 发送API2请求
+            session = new_session()
+            if method not in ["GET", "POST", "PUT", "DELETE"]:
+                raise Exception(f"不支持的请求方法：{method}")
+            if method in ["POST", "PUT"]:
+                resp, rt, phases = timed_request(session, method, url, headers=headers, json=data, timeout=timeout)
+            else:
+                resp, rt, phases = timed_request(session, method, url, headers=headers, timeout=timeout)
+
+            resp.raise_for_status()
+            rt = round(rt, 2)
+
+            # 统计数据
+            code = resp.status_code
+            record_response(test_data, rt, code, phases, True, sizes=bandwidth.measure(resp))
+            log(f"✅ API2请求成功 | 状态码：{code} | 响应时间：{rt}ms", "SUCCESS")
+
+        except Exception as e:
+            if not record_failure(test_data, e):
+                break  # 本轮已取消
+            log(f"❌ API2请求失败：{str(e)}", "ERROR")
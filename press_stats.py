@@ -0,0 +1,222 @@
+import math
+
+# ===================== 统计工具：对数分桶延迟直方图 =====================
+# 固定相对精度（约5%）的对数分桶，记录/合并均为 O(1)，内存与样本数无关，
+# 用于分阶段耗时、分位数（p50/p90/p99）以及后续的实时导出
+
+
+class LatencyHistogram:
+    """对数分桶延迟直方图（单位：毫秒）"""
+    MIN_MS = 0.01        # 下限10µs，更小的值计入第0桶
+    GROWTH = 1.05        # 相邻桶上界之比，决定相对误差
+    _LOG_GROWTH = math.log(GROWTH)
+
+    def __init__(self):
+        self.buckets = {}  # 桶序号 → 计数（稀疏存储）
+        self.count = 0
+        self.total = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    @classmethod
+    def bucket_index(cls, value_ms):
+        if value_ms <= cls.MIN_MS:
+            return 0
+        return int(math.log(value_ms / cls.MIN_MS) / cls._LOG_GROWTH) + 1
+
+    @classmethod
+    def bucket_upper(cls, index):
+        """桶上界（毫秒）"""
+        return cls.MIN_MS * cls.GROWTH ** index
+
+    def record(self, value_ms):
+        index = self.bucket_index(value_ms)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        if self.count == 0 or value_ms < self.min:
+            self.min = value_ms
+        if value_ms > self.max:
+            self.max = value_ms
+        self.count += 1
+        self.total += value_ms
+
+    def merge(self, other):
+        for index, n in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + n
+        if other.count:
+            self.min = other.min if self.count == 0 else min(self.min, other.min)
+            self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def copy(self):
+        """浅拷贝（仅复制稀疏桶字典），供快照在短暂持锁期间使用"""
+        other = LatencyHistogram()
+        other.buckets = dict(self.buckets)
+        other.count, other.total, other.min, other.max = self.count, self.total, self.min, self.max
+        return other
+
+    def difference(self, older):
+        """本直方图减去更早的一份累计直方图，得到两次快照之间的增量（最小/最大值取所在桶的边界近似）"""
+        delta = LatencyHistogram()
+        for index, n in self.buckets.items():
+            n -= older.buckets.get(index, 0)
+            if n > 0:
+                delta.buckets[index] = n
+        delta.count = self.count - older.count
+        delta.total = self.total - older.total
+        if delta.buckets:
+            low, high = min(delta.buckets), max(delta.buckets)
+            delta.min = self.bucket_upper(low - 1) if low else 0.0
+            delta.max = min(self.bucket_upper(high), self.max)
+        return delta
+
+    def cumulative(self, bounds_ms):
+        """按给定上界(ms，升序)统计累计计数，用于导出固定分桶（近似到所在对数桶上界）"""
+        counts = [0] * len(bounds_ms)
+        for index, n in self.buckets.items():
+            upper = min(self.bucket_upper(index), self.max)
+            for i, bound in enumerate(bounds_ms):
+                if upper <= bound:
+                    counts[i] += n
+                    break
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        return counts
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, pct):
+        """分位数：返回所在桶上界（不超过实际最大值）"""
+        if not self.count:
+            return 0
+        rank = max(math.ceil(self.count * pct / 100), 1)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(max(self.bucket_upper(index), self.min), self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": round(self.mean(), 3),
+            "min": round(self.min, 3),
+            "p50": round(self.percentile(50), 3),
+            "p90": round(self.percentile(90), 3),
+            "p99": round(self.percentile(99), 3),
+            "max": round(self.max, 3),
+        }
+
+    def to_dict(self):
+        """导出：汇总 + 非空桶（上界ms → 计数）"""
+        data = self.summary()
+        data["buckets"] = [[round(self.bucket_upper(i), 4), self.buckets[i]] for i in sorted(self.buckets)]
+        return data
+
+
+class EndpointStats:
+    """单个接口的统计：响应时间直方图 + 状态码分布（由调用方持锁更新）"""
+    def __init__(self):
+        self.rt_hist = LatencyHistogram()
+        self.status_codes = {}
+        self.success = 0
+        self.fail = 0
+
+    def record(self, rt, code, success):
+        self.rt_hist.record(rt)
+        self.status_codes[code] = self.status_codes.get(code, 0) + 1
+        if success:
+            self.success += 1
+        else:
+            self.fail += 1
+
+    def record_error(self):
+        self.status_codes["ERROR"] = self.status_codes.get("ERROR", 0) + 1
+        self.fail += 1
+
+    def merge(self, other):
+        self.rt_hist.merge(other.rt_hist)
+        for code, n in other.status_codes.items():
+            self.status_codes[code] = self.status_codes.get(code, 0) + n
+        self.success += other.success
+        self.fail += other.fail
+
+    def summary(self, active_time):
+        completed = self.success + self.fail
+        return {
+            "requests": completed,
+            "success": self.success,
+            "fail": self.fail,
+            "success_rate": round(self.success / completed * 100, 2) if completed else 0,
+            "qps": round(completed / active_time, 2) if active_time > 0 else 0,
+            "latency": self.rt_hist.summary(),
+            "status_codes": dict(self.status_codes),
+        }
+
+
+class LatencyHeatmap:
+    """延迟热力图数据：每秒一列，每列按对数延迟带计数（稀疏存储）；
+    只保留最近 MAX_COLUMNS 秒，长时间压测内存有界"""
+    BASE_MS = 0.1        # 第0带上界
+    GROWTH = 1.5         # 相邻延迟带上界之比
+    BANDS = 34           # 0.1ms ~ 约65s，超出计入最高带
+    MAX_COLUMNS = 3600
+    _LOG_GROWTH = math.log(GROWTH)
+
+    def __init__(self):
+        self.start = 0      # columns[0] 对应的秒
+        self.columns = []   # 每秒 {带序号: 计数}
+
+    @classmethod
+    def band_index(cls, value_ms):
+        if value_ms <= cls.BASE_MS:
+            return 0
+        return min(int(math.ceil(math.log(value_ms / cls.BASE_MS) / cls._LOG_GROWTH)), cls.BANDS - 1)
+
+    @classmethod
+    def band_upper(cls, index):
+        """延迟带上界（毫秒）"""
+        return cls.BASE_MS * cls.GROWTH ** index
+
+    def record(self, sec, value_ms):
+        column = self._column(sec)
+        if column is not None:
+            band = self.band_index(value_ms)
+            column[band] = column.get(band, 0) + 1
+
+    def merge(self, other):
+        for i, counts in enumerate(other.columns):
+            column = self._column(other.start + i) if counts else None
+            if column is not None:
+                for band, n in counts.items():
+                    column[band] = column.get(band, 0) + n
+
+    def _column(self, sec):
+        """第 sec 秒的列（按需补齐），早于保留范围时返回None"""
+        pos = sec - self.start
+        if pos < 0:
+            return None
+        if pos >= len(self.columns):
+            self.columns.extend({} for _ in range(pos + 1 - len(self.columns)))
+            overflow = len(self.columns) - self.MAX_COLUMNS
+            if overflow > 0:
+                # 按10%成批丢弃最早的列，摊销删除开销
+                drop = max(overflow, self.MAX_COLUMNS // 10)
+                del self.columns[:drop]
+                self.start += drop
+                pos -= drop
+        return self.columns[pos]
+
+    def since(self, sec):
+        """复制第 sec 秒（含）之后的列，返回 [(秒, {带序号: 计数}), ...]"""
+        first = max(sec - self.start, 0)
+        return [(self.start + i, dict(self.columns[i])) for i in range(first, len(self.columns))]
+
+    def to_dict(self):
+        """导出：延迟带上界 + 每秒非空带 [秒, [[带序号, 计数], ...]]"""
+        return {
+            "bands_ms": [round(self.band_upper(i), 4) for i in range(self.BANDS)],
+            "columns": [[self.start + i, sorted(column.items())] for i, column in enumerate(self.columns)],
+        }
@@ -0,0 +1,205 @@
+import collections
+import json
+import socket
+import ssl
+import time
+from urllib.parse import urlsplit
+
+import press_engine
+
+# ===================== 原始套接字引擎（HTTP/1.1 + 可选流水线） =====================
+# 小响应体接口的瓶颈往往是 requests/urllib3 自身（组装请求头、连接池簿记、构造 Response 对象），而不是服务端。
+# 本引擎在压测开始前把每组参数的完整请求报文预先编码为字节串，工作线程直接写入各自的长连接，
+# 响应只解析状态行与 Content-Length / chunked 边界，不构造任何响应对象：
+#   流水线深度 1   一问一答（与 send_request 语义相同，只是更轻）
+#   流水线深度 N   同一连接上最多 N 个未回复请求，一次 sendall 批量写出，按顺序配对响应
+# 流水线下响应时间包含在连接上排队的时间；服务端返回 Connection: close 时，未回复的请求在新连接上重发，
+# 连接异常断开/超时时未回复的请求计为失败。不输出逐请求日志/响应内容，不支持分阶段耗时、预热、多接口与压缩。
+
+RECV_SIZE = 65536
+USER_AGENT = "PyApiPress-raw"
+_BODY_METHODS = ("POST", "PUT", "DELETE")
+
+
+class RawTarget:
+    """目标地址 + 预编码的请求报文（按参数数组顺序，每组一条）"""
+    def __init__(self, url, method, headers, data_list):
+        parts = urlsplit(url)
+        self.secure = parts.scheme.lower() == "https"
+        self.host = parts.hostname
+        self.port = parts.port or (443 if self.secure else 80)
+        self.method = method.upper()
+        if self.method != "GET" and self.method not in _BODY_METHODS:
+            raise ValueError(f"不支持的请求方法：{method}")
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        data_list = data_list if isinstance(data_list, list) and data_list else [data_list]
+        self.requests = [self._encode(path, parts.netloc, headers or {}, data) for data in data_list]
+        self._ssl_context = ssl.create_default_context() if self.secure else None
+
+    def _encode(self, path, netloc, headers, data):
+        body = b""
+        fields = {"Host": netloc, "User-Agent": USER_AGENT, "Accept": "*/*", "Connection": "keep-alive"}
+        if self.method in _BODY_METHODS:
+            # 与 requests 的 json= 参数编码一致
+            body = json.dumps(data).encode("utf-8")
+            fields["Content-Type"] = "application/json"
+        for name, value in headers.items():
+            for existing in [k for k in fields if k.lower() == str(name).lower()]:
+                del fields[existing]
+            fields[str(name)] = str(value)
+        if body:
+            fields["Content-Length"] = str(len(body))
+        head = f"{self.method} {path} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in fields.items()) + "\r\n"
+        return head.encode("latin-1") + body
+
+    def connect(self, timeout):
+        sock = socket.create_connection((self.host, self.port), timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        if self._ssl_context is not None:
+            sock = self._ssl_context.wrap_socket(sock, server_hostname=self.host)
+        sock.settimeout(timeout)
+        return sock
+
+
+def parse_responses(buf, pos):
+    """从缓冲区 pos 处解析尽可能多的完整响应，返回 ([(状态码, 报文字节数, 是否Connection: close)], 新pos)；
+    不完整的响应留在缓冲区等待更多数据。无长度标识的响应（读到连接关闭为止）按不完整处理，由调用方在EOF时收尾"""
+    done = []
+    while True:
+        end = buf.find(b"\r\n\r\n", pos)
+        if end < 0:
+            break
+        head = bytes(buf[pos:end]).lower()
+        code = int(head[9:12])
+        body_start = end + 4
+        close = b"\r\nconnection: close" in head
+        if 100 <= code < 200:
+            pos = body_start  # 100 Continue 等临时响应，不对应请求
+            continue
+        if code in (204, 304):
+            body_end = body_start
+        elif b"\r\ntransfer-encoding: chunked" in head:
+            body_end = _chunked_end(buf, body_start)
+            if body_end < 0:
+                break
+        else:
+            i = head.find(b"\r\ncontent-length:")
+            if i < 0:
+                break
+            j = head.find(b"\r\n", i + 2)
+            body_end = body_start + int(head[i + 17:j if j > 0 else len(head)])
+            if body_end > len(buf):
+                break
+        done.append((code, body_end - pos, close))
+        pos = body_end
+    return done, pos
+
+
+def _chunked_end(buf, pos):
+    """chunked 响应体的结束位置（含末尾 trailer），数据不完整时返回 -1"""
+    while True:
+        line_end = buf.find(b"\r\n", pos)
+        if line_end < 0:
+            return -1
+        size = int(bytes(buf[pos:line_end]).split(b";")[0], 16)
+        if size == 0:
+            trailer_end = buf.find(b"\r\n\r\n", line_end)
+            return trailer_end + 4 if trailer_end >= 0 else -1
+        pos = line_end + 2 + size + 2
+        if pos > len(buf):
+            return -1
+
+
+def _close(sock):
+    try:
+        sock.close()
+    except OSError:
+        pass
+
+
+def send_raw(test_data, target, timeout, depth=1, log=press_engine._noop):
+    """原始套接字工作线程：一条长连接，最多 depth 个在途请求"""
+    scope = test_data.cancel_scope
+    requests_bytes = target.requests
+    count = len(requests_bytes)
+    sock = None
+    buf = bytearray()
+    inflight = collections.deque()  # (发送时刻, 请求报文)
+    retry = collections.deque()     # 服务端主动关闭连接后需要重发的请求报文
+    while True:
+        if sock is None:
+            try:
+                sock = target.connect(timeout)
+                scope.register(sock)
+            except (OSError, ValueError) as e:
+                sock = None
+                if retry:
+                    retry.popleft()
+                elif press_engine.claim_request(test_data)[0] is None:
+                    break
+                if not press_engine.record_failure(test_data, e):
+                    break
+                log(f"建立连接失败：{str(e)}", "ERROR")
+                continue
+            buf.clear()
+        batch = []
+        while retry and len(inflight) + len(batch) < depth:
+            batch.append(retry.popleft())
+        while len(inflight) + len(batch) < depth:
+            seq, _ = press_engine.claim_request(test_data)
+            if seq is None:
+                break
+            batch.append(requests_bytes[(seq - 1) % count])
+        try:
+            if batch:
+                now = time.perf_counter()
+                sock.sendall(b"".join(batch) if len(batch) > 1 else batch[0])
+                inflight.extend((now, req) for req in batch)
+            if not inflight:
+                break
+            data = sock.recv(RECV_SIZE)
+        except OSError as e:  # 含 socket.timeout / ssl.SSLError
+            data, error = None, e
+        if data:
+            buf += data
+            done, pos = parse_responses(buf, 0)
+            if done:
+                del buf[:pos]
+                now = time.perf_counter()
+                for code, size, close in done:
+                    sent_at, req = inflight.popleft()
+                    press_engine.record_response(test_data, round((now - sent_at) * 1000, 2), code, {}, 200 <= code < 300,
+                                                 sizes=(len(req), len(req), size, size))
+                    if close:
+                        retry.extend(req for _, req in inflight)
+                        inflight.clear()
+                        _close(sock)
+                        sock = None
+                        break
+            continue
+        if data is not None:
+            if inflight and b"\r\n\r\n" in buf:
+                # 无长度标识的响应以连接关闭为结束
+                sent_at, req = inflight.popleft()
+                code = int(bytes(buf[9:12]))
+                press_engine.record_response(test_data, round((time.perf_counter() - sent_at) * 1000, 2), code, {},
+                                             200 <= code < 300, sizes=(len(req), len(req), len(buf), len(buf)))
+                retry.extend(req for _, req in inflight)
+                inflight.clear()
+                _close(sock)
+                sock = None
+                continue
+            error = ConnectionResetError("服务端关闭了连接")
+        # 连接异常/超时：未回复的请求计为失败（已停止时计为取消）
+        _close(sock)
+        sock = None
+        cancelled = False
+        while inflight:
+            inflight.popleft()
+            if not press_engine.record_failure(test_data, error):
+                cancelled = True
+        if cancelled or scope.cancelled:
+            break
+        log(f"连接中断：{str(error)}", "ERROR")
+    if sock is not None:
+        _close(sock)
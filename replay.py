@@ -0,0 +1,286 @@
+import gzip
+import json
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+import bandwidth
+import press_engine
+from http_timing import new_session, set_cancel_scope, timed_request
+from press_stats import LatencyHistogram
+
+# ===================== 流量回放：nginx 访问日志 / HAR =====================
+# 把生产流量（访问日志或浏览器导出的HAR）按原始时间间隔重放到目标环境：
+#   回放速度   1 = 原始节奏；N = N倍速（间隔缩短为1/N）；max / 0 = 不等待，尽快发送
+#   目标地址   日志中的路径（HAR中的URL只取路径+查询）拼接到「目标API地址」的 scheme://host 上，不会打到原始主机
+#   总请求数   最多回放的条数（文件先读完则以实际条数为准）；并发数为发送线程数
+# 文件逐行/逐条流式读取（.gz 日志直接解压读取，HAR按条增量解析），读取线程与发送线程之间是有界队列，
+# 内存占用与文件大小无关。访问日志没有请求体，请求头使用界面配置的请求头；HAR 回放原始请求头与请求体（界面请求头覆盖同名项）。
+# 报告给出回放滞后（实际发出时刻 - 计划时刻）：滞后持续增大说明并发数不足以跟上原始流量。
+
+QUEUE_SIZE = 10000
+HAR_CHUNK = 1 << 20
+SLEEP_SLICE = 0.2  # 等待计划时刻时每次最长休眠，便于及时响应停止
+# 访问日志（combined / main 格式前缀）：$remote_addr - $remote_user [$time_local] "$request" $status ...
+ACCESS_LOG_RE = re.compile(r'^\S+ \S+ \S+ \[([^\]]+)\] "([A-Z]+) (\S+)(?: HTTP/[\d.]+)?" (\d{3})')
+# 不回放的请求头：HTTP/2 伪头、逐跳头与由客户端重新计算的头
+SKIP_HEADERS = {"host", "content-length", "connection", "keep-alive", "transfer-encoding", "upgrade", "te", "proxy-connection"}
+
+
+def parse_speed(text):
+    """回放速度："1" / "10" / "0.5" / "max"（返回0）"""
+    text = str(text).strip().lower()
+    if text in ("", "max", "0"):
+        return 0.0
+    speed = float(text[:-1] if text.endswith("x") else text)
+    if speed < 0:
+        raise ValueError("回放速度不能为负数")
+    return speed
+
+
+def iter_access_log(path):
+    """逐行解析访问日志，产出 (时间戳秒, 方法, 路径, 请求头, 请求体, 原始状态码)；无法识别的行产出 None"""
+    opener = gzip.open if path.endswith(".gz") else open
+    last_text, last_ts = None, 0.0
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            m = ACCESS_LOG_RE.match(line)
+            if m is None:
+                yield None
+                continue
+            time_text, method, target, status = m.groups()
+            if time_text != last_text:  # 同一秒内的行共用解析结果（strptime 是逐行解析的主要开销）
+                last_text, last_ts = time_text, datetime.strptime(time_text, "%d/%b/%Y:%H:%M:%S %z").timestamp()
+            yield last_ts, method, target, None, None, int(status)
+
+
+def iter_har_entries(f, chunk=HAR_CHUNK):
+    """增量解析HAR中 log.entries 数组的每一项（按块读取，缓冲区只保留未解析部分）"""
+    decoder = json.JSONDecoder()
+    buf = ""
+    while True:
+        i = buf.find('"entries"')
+        j = buf.find("[", i) if i >= 0 else -1
+        if j >= 0:
+            pos = j + 1
+            break
+        more = f.read(chunk)
+        if not more:
+            return
+        buf = buf[-16:] + more if i < 0 else buf + more
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buf) and buf[pos] == "]":
+            return
+        if pos < len(buf):
+            try:
+                entry, pos = decoder.raw_decode(buf, pos)
+                yield entry
+                continue
+            except json.JSONDecodeError:
+                pass  # 条目不完整，继续读取
+        more = f.read(chunk)
+        if not more:
+            return
+        buf, pos = buf[pos:] + more, 0
+
+
+def _har_time(text):
+    return datetime.fromisoformat(text.replace("Z", "+00:00")).timestamp()
+
+
+def iter_har(path):
+    """逐条解析HAR，产出格式同 iter_access_log（URL取路径+查询）"""
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for entry in iter_har_entries(f):
+            try:
+                req = entry["request"]
+                parts = urlsplit(req["url"])
+                target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+                headers = {h["name"]: h["value"] for h in req.get("headers", [])
+                           if not h["name"].startswith(":") and h["name"].lower() not in SKIP_HEADERS}
+                body = (req.get("postData") or {}).get("text")
+                body = body.encode("utf-8") if body else None
+                status = (entry.get("response") or {}).get("status") or None
+                yield _har_time(entry["startedDateTime"]), req["method"].upper(), target, headers, body, status
+            except (KeyError, TypeError, ValueError):
+                yield None
+
+
+def open_entries(path):
+    """按扩展名/首字符识别文件格式"""
+    if path.lower().endswith(".har"):
+        return iter_har(path)
+    if not path.endswith(".gz"):
+        with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+            head = f.read(64).lstrip()
+        if head.startswith("{"):
+            return iter_har(path)
+    return iter_access_log(path)
+
+
+class ReplayPlan:
+    """一轮回放：读取线程解析文件并按原始时间偏移排入有界队列，发送线程（replay_worker）按计划时刻取出发送"""
+    def __init__(self, test_data, path, base_url, speed=1.0, headers=None, limit=0, log=press_engine._noop):
+        parts = urlsplit(base_url)
+        self.base = f"{parts.scheme}://{parts.netloc}"
+        self.test_data = test_data
+        self.path = path
+        self.speed = speed
+        self.headers = headers or {}
+        self.limit = limit
+        self.log = log
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.entries = open_entries(path)
+        self.parsed = 0
+        self.skipped = 0
+        self.source_span = 0.0  # 已排队条目在原始流量中的时间跨度（秒）
+        self.finished = False
+        self.start_time = None
+        self._stats = []  # 每个发送线程一份 [滞后直方图, 状态码一致数, 不一致数]，汇总时合并
+        self._lock = threading.Lock()
+        self._reader = None
+
+    def start(self):
+        self.start_time = time.perf_counter()
+        self._reader = threading.Thread(target=self._read, daemon=True)
+        self._reader.start()
+        return self
+
+    def _put(self, item):
+        while self.test_data.is_running:
+            try:
+                self.queue.put(item, timeout=SLEEP_SLICE)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _read(self):
+        first_ts = None
+        try:
+            for entry in self.entries:
+                if entry is None:
+                    self.skipped += 1
+                    continue
+                ts, method, target, headers, body, status = entry
+                if first_ts is None:
+                    first_ts = ts
+                offset = ts - first_ts
+                self.source_span = max(self.source_span, offset)
+                merged = {**headers, **self.headers} if headers else self.headers
+                if not self._put((offset, method, self.base + target, merged, body, status)):
+                    break
+                self.parsed += 1
+                if self.limit and self.parsed >= self.limit:
+                    break
+        except (OSError, ValueError) as e:
+            self.log(f"❌ 回放文件读取失败：{str(e)}", "ERROR")
+        finally:
+            self.finished = True
+            # 文件先于"总请求数"读完时以实际条数为准，避免报告中出现虚假的"未发送"
+            with self.test_data.lock:
+                self.test_data.total_requests = min(self.test_data.total_requests, self.parsed)
+            self.log(f"📜 回放文件读取完成：{self.parsed} 条（无法识别 {self.skipped} 行）", "INFO")
+
+    def next_item(self):
+        """取出下一条；读取结束且队列为空、或已停止时返回None"""
+        while self.test_data.is_running:
+            try:
+                return self.queue.get(timeout=SLEEP_SLICE)
+            except queue.Empty:
+                if self.finished and self.queue.empty():
+                    return None
+        return None
+
+    def wait_due(self, offset):
+        """等待到计划时刻，返回滞后毫秒数（max速度为0）"""
+        if not self.speed:
+            return 0.0
+        due = self.start_time + offset / self.speed
+        while True:
+            delay = due - time.perf_counter()
+            if delay <= 0 or not self.test_data.is_running:
+                return max(-delay, 0.0) * 1000
+            time.sleep(min(delay, SLEEP_SLICE))
+
+    def new_stats(self):
+        stats = [LatencyHistogram(), 0, 0]
+        with self._lock:
+            self._stats.append(stats)
+        return stats
+
+    def summary(self, active_time):
+        lag = LatencyHistogram()
+        matched = mismatched = 0
+        with self._lock:
+            for hist, same, diff in self._stats:
+                lag.merge(hist)
+                matched += same
+                mismatched += diff
+        return {
+            "file": self.path,
+            "speed": self.speed,
+            "parsed": self.parsed,
+            "skipped": self.skipped,
+            "source_span": round(self.source_span, 3),
+            "replay_span": round(active_time, 3),
+            "lag_ms": lag.summary(),
+            "status_matched": matched,
+            "status_mismatched": mismatched,
+        }
+
+
+def replay_worker(test_data, plan, timeout, log=press_engine._noop, conn_mode="reuse", hooks=None):
+    """回放发送线程：每条请求的结果按普通请求计入统计，另记录滞后与原始状态码是否一致；
+    hooks 为 request_hooks.HookChain 时按回放的请求重新签名"""
+    session = new_session(conn_mode)
+    set_cancel_scope(test_data.cancel_scope)
+    stats = plan.new_stats()
+    capture = test_data.capture
+    while True:
+        item = plan.next_item()
+        if item is None:
+            break
+        offset, method, url, headers, body, status = item
+        lag = plan.wait_due(offset)
+        seq = press_engine.claim_request(test_data)[0]
+        if seq is None:
+            break
+        stats[0].record(lag)
+        request_id = None
+        if capture is not None:
+            request_id = capture.request_id(seq)
+            headers = {**headers, capture.header: request_id}
+        try:
+            if hooks is not None:
+                headers, body = hooks.apply(method, url, headers, body)
+            resp, rt, phases = timed_request(session, method, url, headers=headers, data=body, timeout=timeout)
+            code = resp.status_code
+            press_engine.record_response(test_data, round(rt, 2), code, phases, 200 <= code < 300,
+                                         sizes=bandwidth.measure(resp), request_id=request_id)
+            if status is not None:
+                if code == status:
+                    stats[1] += 1
+                else:
+                    stats[2] += 1
+        except Exception as e:
+            if not press_engine.record_failure(test_data, e, request_id=request_id):
+                break
+            log(f"回放请求失败 | {method} {url} | {str(e)}", "ERROR")
+
+
+def format_replay(replay):
+    """报表中的回放段落"""
+    if not replay:
+        return ""
+    lag = replay["lag_ms"]
+    speed = f"{replay['speed']}倍速" if replay["speed"] else "最快速度"
+    return (f"📼 流量回放：{replay['file']}（{speed}） | 读取 {replay['parsed']} 条，无法识别 {replay['skipped']} 行 | "
+            f"原始跨度 {replay['source_span']}s → 回放 {replay['replay_span']}s\n"
+            f"   回放滞后：平均 {lag['mean']}ms / p99 {lag['p99']}ms / 最大 {lag['max']}ms | "
+            f"与原始状态码一致 {replay['status_matched']} 次，不一致 {replay['status_mismatched']} 次\n")
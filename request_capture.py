@@ -0,0 +1,119 @@
+import heapq
+import secrets
+import time
+from datetime import datetime
+
+# ===================== 慢请求/失败请求捕获（请求ID关联服务端日志） =====================
+# p99 突刺时需要在服务端日志里找到"那几个"请求：启用后每个请求注入唯一请求ID头（本轮随机前缀-请求序号），
+# 各工作线程的统计分片中保留：
+#   最慢的 top_k 个请求   最小堆，堆顶为其中最快的一个；绝大多数请求只与堆顶比较一次即返回
+#   失败请求              异常与非2xx响应，按发生顺序最多保留 max_failures 条（超出只计数）
+# 每条记录：请求ID、开始时刻（墙钟，与服务端日志对齐）、响应时间、状态码、分阶段耗时 / 异常原文。
+# 汇总时合并各分片，进入报告、导出JSON与HTML报告；内存上限与压测时长无关。
+
+DEFAULT_HEADER = "X-Request-ID"
+MAX_ERROR_TEXT = 300
+
+
+class RequestCapture:
+    """本轮的捕获设置与请求ID生成"""
+    def __init__(self, top_k=20, max_failures=100, header=DEFAULT_HEADER):
+        self.top_k = top_k
+        self.max_failures = max_failures
+        self.header = header
+        self.run_id = secrets.token_hex(4)  # 区分不同轮次，同一服务端日志中不会撞号
+
+    def request_id(self, seq):
+        return f"{self.run_id}-{seq}"
+
+    def describe(self):
+        return f"请求ID头 {self.header}（前缀 {self.run_id}） | 最慢 {self.top_k} 个 + 失败最多 {self.max_failures} 条"
+
+
+def parse_capture(config_data):
+    """从配置数据解析捕获设置，格式错误抛 ValueError；最慢个数与失败条数均为0（或未填写）时返回 None"""
+    try:
+        top_k = int(str(config_data.get("capture_top_k") or 0).strip() or 0)
+        max_failures = int(str(config_data.get("capture_failures") or 0).strip() or 0)
+    except ValueError:
+        raise ValueError("慢请求捕获个数、失败请求条数必须为非负整数")
+    if top_k < 0 or max_failures < 0:
+        raise ValueError("慢请求捕获个数、失败请求条数必须为非负整数")
+    header = str(config_data.get("request_id_header") or "").strip() or DEFAULT_HEADER
+    if not top_k and not max_failures:
+        return None
+    return RequestCapture(top_k, max_failures, header)
+
+
+class CaptureBuffer:
+    """单个统计分片内的捕获数据（由调用方持分片锁更新）"""
+    def __init__(self, top_k, max_failures):
+        self.top_k = top_k
+        self.max_failures = max_failures
+        self.slowest = []   # 最小堆 [(响应时间, 请求ID, 开始时刻, 状态码, 分阶段耗时)]
+        self.failures = []  # [(开始时刻, 请求ID, 响应时间, 状态码, 分阶段耗时或异常原文)]
+        self.failures_dropped = 0
+
+    def record(self, rt, request_id, code, phases, success):
+        slowest = self.slowest
+        if len(slowest) < self.top_k:
+            heapq.heappush(slowest, (rt, request_id, time.time() - rt / 1000, code, phases))
+        elif self.top_k and rt > slowest[0][0]:
+            heapq.heapreplace(slowest, (rt, request_id, time.time() - rt / 1000, code, phases))
+        if not success:
+            self._add_failure(request_id, rt, code, phases)
+
+    def record_error(self, request_id, error):
+        text = f"{type(error).__name__}: {error}"[:MAX_ERROR_TEXT] if error is not None else "ERROR"
+        self._add_failure(request_id, None, "ERROR", text)
+
+    def _add_failure(self, request_id, rt, code, detail):
+        if len(self.failures) < self.max_failures:
+            started = time.time() - rt / 1000 if rt else time.time()
+            self.failures.append((started, request_id, rt, code, detail))
+        else:
+            self.failures_dropped += 1
+
+    def merge(self, other):
+        self.slowest = heapq.nlargest(self.top_k, self.slowest + other.slowest)
+        heapq.heapify(self.slowest)
+        failures = sorted(self.failures + other.failures, key=lambda f: f[0])
+        self.failures = failures[:self.max_failures]
+        self.failures_dropped += other.failures_dropped + len(failures) - len(self.failures)
+
+    def summary(self):
+        slowest = [{"request_id": rid, "started_at": _wall(ts), "rt": round(rt, 2), "status": code,
+                    "phases": {k: round(v, 3) for k, v in phases.items()}}
+                   for rt, rid, ts, code, phases in sorted(self.slowest, reverse=True)]
+        failures = []
+        for ts, rid, rt, code, detail in sorted(self.failures, key=lambda f: f[0]):
+            item = {"request_id": rid, "started_at": _wall(ts), "rt": round(rt, 2) if rt is not None else None, "status": code}
+            if isinstance(detail, dict):
+                item["phases"] = {k: round(v, 3) for k, v in detail.items()}
+            else:
+                item["error"] = detail
+            failures.append(item)
+        return {"slowest": slowest, "failures": failures, "failures_dropped": self.failures_dropped}
+
+
+def _wall(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def format_capture(capture, limit=10):
+    """报表中的慢请求/失败请求段落（完整列表见导出JSON）"""
+    if not capture:
+        return ""
+    lines = []
+    if capture["slowest"]:
+        lines.append(f"🐢 最慢请求（按请求头 {capture['header']} 在服务端日志中检索，共 {len(capture['slowest'])} 条，显示前 {limit} 条）：")
+        for item in capture["slowest"][:limit]:
+            phases = " ".join(f"{k}={v}" for k, v in item["phases"].items())
+            lines.append(f"   {item['request_id']} | {item['started_at']} | {item['rt']}ms | {item['status']} | {phases}")
+    if capture["failures"]:
+        dropped = f"，另有 {capture['failures_dropped']} 条未保留" if capture["failures_dropped"] else ""
+        lines.append(f"🧯 失败请求（保留 {len(capture['failures'])} 条{dropped}，显示前 {limit} 条）：")
+        for item in capture["failures"][:limit]:
+            detail = item.get("error") or f"{item['rt']}ms"
+            lines.append(f"   {item['request_id']} | {item['started_at']} | {item['status']} | {detail}")
+    return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,359 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from urllib.parse import urlsplit
+
+try:
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import padding
+except ImportError:  # 未安装 cryptography 时仅支持 HS256 等对称签名的 JWT
+    serialization = None
+
+# ===================== 逐请求签名 / 动态请求头钩子 =====================
+# 配置示例（"hooks" 字段，JSON数组，按顺序执行）：
+#   [{"type": "timestamp", "header": "X-Timestamp"},
+#    {"type": "nonce", "header": "X-Nonce"},
+#    {"type": "hmac_sha256", "key_env": "API_SECRET", "header": "X-Signature",
+#     "message": "{method}\n{path}\n{timestamp}\n{nonce}\n{body_sha256}"},
+#    {"type": "jwt", "alg": "HS256", "key": "secret", "claims": {"sub": "press"}, "ttl": 300}]
+#   timestamp    当前时间（unit: s/ms），写入请求头 header 和/或请求体字段 field
+#   nonce        随机串（bytes 字节熵，十六进制），写入 header 和/或 field
+#   hmac_sha256  对 message 模板签名，output: hex/base64，prefix 为请求头值前缀
+#                模板字段：{method} {path} {query} {timestamp} {nonce} {body} {body_sha256}
+#   jwt          每个请求签发 JWT（iat/exp/jti + claims），默认写入 Authorization: Bearer；
+#                refresh_seconds > 0 时在该时间内复用同一令牌；alg: HS256/HS384/HS512，RS256（需安装 cryptography）
+# 密钥（key 明文 / key_env 环境变量 / key_file 文件；key_encoding: utf8/hex/base64）在压测开始前解析一次：
+# HMAC 预先完成密钥填充，每个请求只 copy() 已初始化的摘要对象；RSA 私钥只加载一次。
+# 签名覆盖请求体（{body}/{body_sha256}）时，请求体在钩子中序列化为最终发送的字节（与 requests 的 json= 编码一致），
+# 因此不能同时启用请求体压缩或上传文件；写入请求体字段的钩子必须排在这类签名钩子之前。
+# 导出报告 / 压测历史中的配置经 redact_config 处理：明文 key 替换为 REDACTED（key_env / key_file 只是引用，原样保留）。
+# 每个钩子的 CPU 耗时（线程CPU时间）按线程分别累计，报告给出平均每次耗时，便于确认高RPS下签名开销可忽略。
+
+HOOK_TYPES = ("timestamp", "nonce", "hmac_sha256", "jwt")
+MESSAGE_FIELD = re.compile(r"\{(\w+)\}")
+MESSAGE_FIELDS = ("method", "path", "query", "timestamp", "nonce", "body", "body_sha256")
+BODY_FIELDS = ("body", "body_sha256")
+DEFAULT_MESSAGE = "{method}\n{path}\n{timestamp}\n{body_sha256}"
+JWT_HASHES = {"HS256": hashlib.sha256, "HS384": hashlib.sha384, "HS512": hashlib.sha512}
+URL_CACHE_SIZE = 1024
+REDACTED = "***"
+
+
+def _b64url(raw):
+    return base64.urlsafe_b64encode(raw).rstrip(b"=")
+
+
+def _load_key(spec, name):
+    """解析密钥材料（只在构建钩子时调用一次）"""
+    if spec.get("key_file"):
+        with open(spec["key_file"], "rb") as f:
+            raw = f.read().strip()
+    elif spec.get("key_env"):
+        value = os.environ.get(spec["key_env"])
+        if value is None:
+            raise ValueError(f"钩子 {name} 的环境变量 {spec['key_env']} 未设置")
+        raw = value.encode("utf-8")
+    elif spec.get("key") is not None:
+        raw = str(spec["key"]).encode("utf-8")
+    else:
+        raise ValueError(f"钩子 {name} 缺少密钥（key / key_env / key_file）")
+    encoding = spec.get("key_encoding", "utf8")
+    try:
+        if encoding == "hex":
+            return bytes.fromhex(raw.decode("ascii"))
+        if encoding == "base64":
+            return base64.b64decode(raw, validate=True)
+    except ValueError as e:
+        raise ValueError(f"钩子 {name} 的密钥不是合法的 {encoding}：{e}")
+    if encoding != "utf8":
+        raise ValueError(f"钩子 {name} 的 key_encoding 可选 utf8/hex/base64")
+    return raw
+
+
+class SignContext:
+    """单个请求在钩子链中的可变状态（请求头为副本，不修改共享模板）"""
+    __slots__ = ("method", "url", "headers", "data", "values", "_body", "_parts")
+
+    def __init__(self, method, url, headers, data):
+        self.method = method
+        self.url = url
+        self.headers = dict(headers)
+        self.data = data
+        self.values = {}
+        self._body = None
+        self._parts = None
+
+    def set_field(self, field, value):
+        if isinstance(self.data, dict):
+            self.data = {**self.data, field: value}
+
+    def body(self):
+        """最终发送的请求体字节（首次调用时序列化，之后不再改变）"""
+        if self._body is None:
+            if self.method == "GET" or self.data is None:
+                self._body = b""
+            elif isinstance(self.data, (bytes, bytearray)):
+                self._body = bytes(self.data)
+            else:
+                self._body = json.dumps(self.data).encode("utf-8")
+        return self._body
+
+    def url_parts(self, cache):
+        if self._parts is None:
+            parts = cache.get(self.url)
+            if parts is None:
+                if len(cache) >= URL_CACHE_SIZE:
+                    cache.clear()
+                split = urlsplit(self.url)
+                parts = cache[self.url] = (split.path or "/", split.query)
+            self._parts = parts
+        return self._parts
+
+
+class TimestampHook:
+    def __init__(self, spec, name):
+        self.header = spec.get("header")
+        self.field = spec.get("field")
+        if not self.header and not self.field:
+            raise ValueError(f"钩子 {name} 需要 header 或 field")
+        if spec.get("unit", "s") not in ("s", "ms"):
+            raise ValueError(f"钩子 {name} 的 unit 可选 s/ms")
+        self.millis = spec.get("unit") == "ms"
+        self.writes_body = bool(self.field)
+
+    def apply(self, ctx):
+        value = int(time.time() * 1000) if self.millis else int(time.time())
+        ctx.values["timestamp"] = text = str(value)
+        if self.header:
+            ctx.headers[self.header] = text
+        if self.field:
+            ctx.set_field(self.field, value)
+
+
+class NonceHook:
+    def __init__(self, spec, name):
+        self.header = spec.get("header")
+        self.field = spec.get("field")
+        if not self.header and not self.field:
+            raise ValueError(f"钩子 {name} 需要 header 或 field")
+        self.size = int(spec.get("bytes", 16))
+        self.writes_body = bool(self.field)
+
+    def apply(self, ctx):
+        ctx.values["nonce"] = value = secrets.token_hex(self.size)
+        if self.header:
+            ctx.headers[self.header] = value
+        if self.field:
+            ctx.set_field(self.field, value)
+
+
+class HmacHook:
+    def __init__(self, spec, name):
+        self.header = spec.get("header", "X-Signature")
+        self.prefix = spec.get("prefix", "")
+        self.output = spec.get("output", "hex")
+        if self.output not in ("hex", "base64"):
+            raise ValueError(f"钩子 {name} 的 output 可选 hex/base64")
+        self._mac = hmac.new(_load_key(spec, name), digestmod=hashlib.sha256)  # 密钥填充只做一次，每个请求 copy()
+        template = spec.get("message", DEFAULT_MESSAGE)
+        self.parts = []  # 预编译的消息模板：(字面量字节, None) 或 (None, 字段名)
+        pos = 0
+        for m in MESSAGE_FIELD.finditer(template):
+            if m.group(1) not in MESSAGE_FIELDS:
+                raise ValueError(f"钩子 {name} 的签名模板字段 {{{m.group(1)}}} 不支持，可选：{' '.join(MESSAGE_FIELDS)}")
+            if m.start() > pos:
+                self.parts.append((template[pos:m.start()].encode("utf-8"), None))
+            self.parts.append((None, m.group(1)))
+            pos = m.end()
+        if pos < len(template):
+            self.parts.append((template[pos:].encode("utf-8"), None))
+        fields = {field for _, field in self.parts if field}
+        self.covers_body = bool(fields & set(BODY_FIELDS))
+        self.needs_url = bool(fields & {"path", "query"})
+        self.url_cache = {}
+
+    def _field(self, ctx, field):
+        if field == "method":
+            return ctx.method.encode("ascii")
+        if field == "body":
+            return ctx.body()
+        if field == "body_sha256":
+            return hashlib.sha256(ctx.body()).hexdigest().encode("ascii")
+        if field in ("path", "query"):
+            path, query = ctx.url_parts(self.url_cache)
+            return (path if field == "path" else query).encode("utf-8")
+        return ctx.values.get(field, "").encode("utf-8")
+
+    def apply(self, ctx):
+        mac = self._mac.copy()
+        for literal, field in self.parts:
+            mac.update(literal if field is None else self._field(ctx, field))
+        digest = mac.hexdigest() if self.output == "hex" else base64.b64encode(mac.digest()).decode("ascii")
+        ctx.headers[self.header] = self.prefix + digest
+
+
+class JwtHook:
+    def __init__(self, spec, name):
+        self.alg = spec.get("alg", "HS256")
+        self.header = spec.get("header", "Authorization")
+        self.prefix = spec.get("prefix", "Bearer " if self.header.lower() == "authorization" else "")
+        self.claims = spec.get("claims") or {}
+        if not isinstance(self.claims, dict):
+            raise ValueError(f"钩子 {name} 的 claims 必须是JSON对象")
+        self.ttl = int(spec.get("ttl", 300))
+        self.refresh_seconds = float(spec.get("refresh_seconds", 0))
+        key = _load_key(spec, name)
+        if self.alg in JWT_HASHES:
+            self._mac = hmac.new(key, digestmod=JWT_HASHES[self.alg])
+            self._private_key = None
+        elif self.alg == "RS256":
+            if serialization is None:
+                raise ValueError(f"钩子 {name} 使用 RS256 需要安装 cryptography（pip install cryptography）")
+            try:
+                self._private_key = serialization.load_pem_private_key(key, password=None)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"钩子 {name} 的RSA私钥无法解析：{e}")
+        else:
+            raise ValueError(f"钩子 {name} 的 alg 可选 {'/'.join(JWT_HASHES)}/RS256")
+        self._head = _b64url(json.dumps({"alg": self.alg, "typ": "JWT"}, separators=(",", ":")).encode("utf-8")) + b"."
+        self._local = threading.local()  # 每个线程各自缓存令牌（refresh_seconds > 0 时）
+
+    def _sign(self, signing_input):
+        if self._private_key is None:
+            mac = self._mac.copy()
+            mac.update(signing_input)
+            return mac.digest()
+        return self._private_key.sign(signing_input, padding.PKCS1v15(), hashes.SHA256())
+
+    def mint(self):
+        now = int(time.time())
+        claims = {**self.claims, "iat": now, "exp": now + self.ttl, "jti": secrets.token_hex(8)}
+        signing_input = self._head + _b64url(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+        return (signing_input + b"." + _b64url(self._sign(signing_input))).decode("ascii")
+
+    def apply(self, ctx):
+        if self.refresh_seconds > 0:
+            cached = getattr(self._local, "token", None)
+            now = time.monotonic()
+            if cached is None or now - cached[0] >= self.refresh_seconds:
+                cached = self._local.token = (now, self.mint())
+            token = cached[1]
+        else:
+            token = self.mint()
+        ctx.headers[self.header] = self.prefix + token
+
+
+_HOOK_CLASSES = {"timestamp": TimestampHook, "nonce": NonceHook, "hmac_sha256": HmacHook, "jwt": JwtHook}
+
+
+def parse_hooks(text):
+    """解析钩子配置文本为钩子链，格式/密钥错误抛 ValueError；未填写时返回 None"""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        specs = json.loads(text)
+    except Exception as e:
+        raise ValueError(f"签名钩子配置不是合法JSON：{e}")
+    if isinstance(specs, dict):
+        specs = [specs]
+    if not isinstance(specs, list) or not specs:
+        raise ValueError("签名钩子配置必须是JSON数组")
+    return HookChain(specs)
+
+
+def redact_hooks(text):
+    """钩子配置文本中的明文密钥替换为 REDACTED；无法解析的配置整体替换（可能含明文密钥）"""
+    text = (text or "").strip()
+    if not text:
+        return text
+    try:
+        specs = json.loads(text)
+    except Exception:
+        return REDACTED
+    items = specs if isinstance(specs, list) else [specs]
+    for spec in items:
+        if isinstance(spec, dict) and spec.get("key") is not None:
+            spec["key"] = REDACTED
+    return json.dumps(specs, ensure_ascii=False)
+
+
+def redact_config(config_data):
+    """返回去除钩子明文密钥后的配置副本，用于导出报告与写入压测历史（不修改原配置）"""
+    if not config_data.get("hooks"):
+        return config_data
+    return {**config_data, "hooks": redact_hooks(config_data["hooks"])}
+
+
+class HookChain:
+    """按顺序执行的钩子链；apply 在工作线程中调用，各钩子的线程CPU耗时按线程分别累计"""
+    def __init__(self, specs):
+        self.hooks = []
+        self.names = []
+        self.covers_body = False
+        for i, spec in enumerate(specs):
+            if not isinstance(spec, dict) or spec.get("type") not in HOOK_TYPES:
+                raise ValueError(f"第 {i + 1} 个钩子类型错误，可选：{'/'.join(HOOK_TYPES)}")
+            name = spec.get("name") or f"{spec['type']}#{i + 1}"
+            try:
+                hook = _HOOK_CLASSES[spec["type"]](spec, name)
+            except (TypeError, OSError) as e:
+                raise ValueError(f"钩子 {name} 配置错误：{e}")
+            if getattr(hook, "writes_body", False) and self.covers_body:
+                raise ValueError(f"钩子 {name} 写入请求体字段，必须排在签名请求体的钩子之前")
+            self.covers_body = self.covers_body or getattr(hook, "covers_body", False)
+            self.hooks.append(hook)
+            self.names.append(name)
+        self._stats = []  # 每个线程一份 [[次数, CPU纳秒], ...]
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+
+    def _thread_stats(self):
+        stats = getattr(self._local, "stats", None)
+        if stats is None:
+            stats = self._local.stats = [[0, 0] for _ in self.hooks]
+            with self._stats_lock:
+                self._stats.append(stats)
+        return stats
+
+    def apply(self, method, url, headers, data):
+        """执行钩子链，返回 (请求头, 请求体)；签名覆盖请求体时请求体为最终发送的字节"""
+        stats = self._thread_stats()
+        ctx = SignContext(method.upper(), url, headers, data)
+        clock = time.thread_time_ns
+        for hook, stat in zip(self.hooks, stats):
+            t0 = clock()
+            hook.apply(ctx)
+            stat[0] += 1
+            stat[1] += clock() - t0
+        if ctx._body is None:
+            return ctx.headers, ctx.data
+        if ctx._body and not any(k.lower() == "content-type" for k in ctx.headers):
+            ctx.headers["Content-Type"] = "application/json"
+        return ctx.headers, ctx._body
+
+    def summary(self):
+        totals = [[0, 0] for _ in self.hooks]
+        with self._stats_lock:
+            for stats in self._stats:
+                for total, (calls, ns) in zip(totals, stats):
+                    total[0] += calls
+                    total[1] += ns
+        return [{"name": name, "calls": calls, "cpu_ms": round(ns / 1e6, 3),
+                 "avg_us": round(ns / calls / 1000, 2) if calls else 0}
+                for name, (calls, ns) in zip(self.names, totals)]
+
+
+def format_hooks(hooks):
+    """报表中的签名钩子段落"""
+    if not hooks:
+        return ""
+    items = " | ".join(f"{h['name']} 平均 {h['avg_us']}µs（{h['calls']} 次，共 {h['cpu_ms']}ms）" for h in hooks)
+    total = round(sum(h["cpu_ms"] for h in hooks), 3)
+    return f"🔏 签名钩子CPU耗时：{items} | 合计 {total}ms\n"
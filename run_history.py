@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+# ===================== 压测历史：本地SQLite记录 + 趋势查询 =====================
+# 每轮压测结束自动写入一行（界面/批量压测均会记录），包含配置指纹、目标、吞吐、分位数与状态码分布，
+# 多接口压测另按接口各记一行。按 (目标/配置/接口, 时间) 建索引，"最近N轮"查询只扫描N行，
+# 数千轮历史下依然即时返回。
+# 命令行：
+#   python run_history.py list --last 20
+#   python run_history.py trend --target https://api.xx.com/list --metric p99_rt --last 30
+#   python run_history.py trend --config order_create      |  --endpoint 列表
+#   python run_history.py show 128
+
+HISTORY_FILE = "run_history.db"
+# 可查询趋势的指标：字段 → 显示名
+METRICS = {"qps": "QPS", "success_rate": "成功率%", "avg_rt": "平均RT", "p50_rt": "p50", "p90_rt": "p90",
+           "p99_rt": "p99", "max_rt": "最大RT"}
+ENDPOINT_METRICS = {"qps": "qps", "success_rate": "success_rate", "avg_rt": "avg_rt", "p50_rt": "p50_rt", "p99_rt": "p99_rt"}
+
+
+def _compact(summary):
+    """存档用的报告数据：去掉直方图桶、带宽序列与热力图等大字段"""
+    data = dict(summary)
+    data.pop("heatmap", None)
+    if data.get("phases"):
+        data["phases"] = {k: {f: v for f, v in h.items() if f != "buckets"} for k, h in data["phases"].items()}
+    if data.get("bandwidth"):
+        data["bandwidth"] = {k: v for k, v in data["bandwidth"].items() if k != "series"}
+    return data
+
+
+class RunHistory:
+    """压测历史库（WAL模式，界面写入时命令行可同时查询）"""
+    def __init__(self, db_path=HISTORY_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS runs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                ts REAL NOT NULL,
+                source TEXT NOT NULL DEFAULT '',
+                config_name TEXT NOT NULL DEFAULT '',
+                config_hash TEXT NOT NULL DEFAULT '',
+                target TEXT NOT NULL DEFAULT '',
+                method TEXT NOT NULL DEFAULT '',
+                thread_num INTEGER NOT NULL DEFAULT 0,
+                completed INTEGER NOT NULL DEFAULT 0,
+                qps REAL NOT NULL DEFAULT 0,
+                success_rate REAL NOT NULL DEFAULT 0,
+                avg_rt REAL NOT NULL DEFAULT 0,
+                p50_rt REAL NOT NULL DEFAULT 0,
+                p90_rt REAL NOT NULL DEFAULT 0,
+                p99_rt REAL NOT NULL DEFAULT 0,
+                max_rt REAL NOT NULL DEFAULT 0,
+                status_codes TEXT NOT NULL DEFAULT '{}',
+                summary TEXT NOT NULL DEFAULT '{}'
+            );
+            CREATE INDEX IF NOT EXISTS idx_runs_ts ON runs(ts);
+            CREATE INDEX IF NOT EXISTS idx_runs_target_ts ON runs(target, ts);
+            CREATE INDEX IF NOT EXISTS idx_runs_config_ts ON runs(config_name, ts);
+            CREATE INDEX IF NOT EXISTS idx_runs_hash_ts ON runs(config_hash, ts);
+            CREATE TABLE IF NOT EXISTS run_endpoints (
+                run_id INTEGER NOT NULL,
+                ts REAL NOT NULL,
+                name TEXT NOT NULL,
+                requests INTEGER NOT NULL DEFAULT 0,
+                qps REAL NOT NULL DEFAULT 0,
+                success_rate REAL NOT NULL DEFAULT 0,
+                avg_rt REAL NOT NULL DEFAULT 0,
+                p50_rt REAL NOT NULL DEFAULT 0,
+                p99_rt REAL NOT NULL DEFAULT 0,
+                status_codes TEXT NOT NULL DEFAULT '{}',
+                PRIMARY KEY (run_id, name)
+            );
+            CREATE INDEX IF NOT EXISTS idx_run_endpoints_name_ts ON run_endpoints(name, ts);
+        """)
+        self.conn.commit()
+
+    def record(self, summary, config_data, config_name="", config_hash="", source="gui"):
+        """写入一轮压测结果，返回记录ID"""
+        ts = time.time()
+        with self._lock, self.conn:
+            cur = self.conn.execute(
+                "INSERT INTO runs (ts, source, config_name, config_hash, target, method, thread_num, completed, qps, success_rate,"
+                " avg_rt, p50_rt, p90_rt, p99_rt, max_rt, status_codes, summary) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                (ts, source, config_name, config_hash, str(config_data.get("target_url", "")),
+                 str(config_data.get("request_method", "")).upper(), int(config_data.get("thread_num") or 0),
+                 summary.get("completed", 0), summary["qps"], summary["success_rate"], summary["avg_rt"],
+                 summary["p50_rt"], summary["p90_rt"], summary["p99_rt"], summary["max_rt"],
+                 json.dumps(summary["status_codes"], ensure_ascii=False),
+                 json.dumps(_compact(summary), ensure_ascii=False, default=str)))
+            run_id = cur.lastrowid
+            self.conn.executemany(
+                "INSERT INTO run_endpoints (run_id, ts, name, requests, qps, success_rate, avg_rt, p50_rt, p99_rt, status_codes)"
+                " VALUES (?,?,?,?,?,?,?,?,?,?)",
+                [(run_id, ts, name, e["requests"], e["qps"], e["success_rate"], e["latency"]["mean"], e["latency"]["p50"],
+                  e["latency"]["p99"], json.dumps(e["status_codes"], ensure_ascii=False))
+                 for name, e in (summary.get("endpoints") or {}).items()])
+        return run_id
+
+    def recent(self, limit=20):
+        cur = self.conn.execute("SELECT id, ts, source, config_name, target, method, thread_num, qps, success_rate, p50_rt, p99_rt"
+                                " FROM runs ORDER BY ts DESC LIMIT ?", (limit,))
+        return [dict(zip([c[0] for c in cur.description], row)) for row in cur]
+
+    def trend(self, metric="p99_rt", last=30, target=None, config=None, endpoint=None):
+        """某目标/配置/接口最近 last 轮的指标序列（按时间正序），每项 {id, ts, value, ...}"""
+        if endpoint:
+            if metric not in ENDPOINT_METRICS:
+                raise ValueError(f"接口趋势不支持指标 {metric}，可选：{', '.join(ENDPOINT_METRICS)}")
+            sql = (f"SELECT run_id AS id, ts, {metric} AS value, requests, success_rate FROM run_endpoints"
+                   " WHERE name = ? ORDER BY ts DESC LIMIT ?")
+            args = (endpoint, last)
+        else:
+            if metric not in METRICS:
+                raise ValueError(f"不支持的指标 {metric}，可选：{', '.join(METRICS)}")
+            column, value = ("target", target) if target else ("config_name", config)
+            if not value:
+                raise ValueError("请指定 目标URL、配置名 或 接口名")
+            sql = (f"SELECT id, ts, {metric} AS value, qps, success_rate, thread_num, config_hash FROM runs"
+                   f" WHERE {column} = ? ORDER BY ts DESC LIMIT ?")
+            args = (value, last)
+        cur = self.conn.execute(sql, args)
+        rows = [dict(zip([c[0] for c in cur.description], row)) for row in cur]
+        return rows[::-1]
+
+    def get(self, run_id):
+        row = self.conn.execute("SELECT summary FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def close(self):
+        self.conn.close()
+
+
+def _time_str(ts):
+    return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M")
+
+
+def format_trend(rows, metric="p99_rt", title=""):
+    """趋势文本：逐轮数值 + 横条 + 与中位数对比"""
+    name = METRICS.get(metric, metric)
+    if not rows:
+        return f"📈 {title} 暂无历史记录\n"
+    values = [r["value"] for r in rows]
+    top = max(values) or 1
+    median = sorted(values)[len(values) // 2]
+    lines = [f"📈 {title} 最近 {len(rows)} 轮 {name} 趋势（中位数 {median}，最小 {min(values)}，最大 {max(values)}）"]
+    for r in rows:
+        bar = "█" * max(int(r["value"] / top * 30), 1 if r["value"] else 0)
+        lines.append(f"   #{r['id']:<6} {_time_str(r['ts'])} {r['value']:>10} {bar}")
+    if median:
+        change = (values[-1] - median) / median * 100
+        lines.append(f"   最近一轮相对中位数：{change:+.1f}%")
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PyApiPress 压测历史查询")
+    parser.add_argument("--db", default=HISTORY_FILE, help="历史库文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_list = sub.add_parser("list", help="最近的压测记录")
+    p_list.add_argument("--last", type=int, default=20)
+    p_trend = sub.add_parser("trend", help="指标趋势")
+    group = p_trend.add_mutually_exclusive_group(required=True)
+    group.add_argument("--target", help="目标URL")
+    group.add_argument("--config", help="配置名")
+    group.add_argument("--endpoint", help="多接口压测中的接口名")
+    p_trend.add_argument("--metric", default="p99_rt", help=f"指标：{', '.join(METRICS)}")
+    p_trend.add_argument("--last", type=int, default=30)
+    p_show = sub.add_parser("show", help="查看某轮的完整报告数据")
+    p_show.add_argument("run_id", type=int)
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"历史库不存在：{args.db}")
+        return 1
+    history = RunHistory(args.db)
+    if args.command == "list":
+        for r in history.recent(args.last):
+            print(f"#{r['id']:<6} {_time_str(r['ts'])} [{r['source']}] {r['config_name'] or '-'} {r['method']} {r['target']} | "
+                  f"并发 {r['thread_num']} | QPS {r['qps']} | 成功率 {r['success_rate']}% | p50 {r['p50_rt']}ms | p99 {r['p99_rt']}ms")
+    elif args.command == "trend":
+        try:
+            rows = history.trend(args.metric, args.last, args.target, args.config, args.endpoint)
+        except ValueError as e:
+            parser.error(str(e))
+        print(format_trend(rows, args.metric, args.target or args.config or args.endpoint), end="")
+    else:
+        data = history.get(args.run_id)
+        if data is None:
+            print(f"记录不存在：#{args.run_id}")
+            return 1
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import collections
+import threading
+
+import press_engine
+from press_stats import LatencyHistogram
+
+# ===================== SLO 自动中止 =====================
+# 目标服务已经异常时继续打满"总请求数"既浪费时间又会加重故障。压测期间后台每 TICK_SECONDS 取一次统计快照，
+# 在最近 window 秒的滚动窗口上（两次累计快照相减，不占用 take_window，与长稳记录器互不影响）评估中止规则：
+#   错误率   窗口内失败占比 > error_pct%
+#   p99      窗口内响应时间 p99 > p99_ms
+#   拒绝连接 窗口内 ConnectionRefusedError ≥ refused 次（服务宕机/端口未监听时立即中止，不必等满窗口）
+# 错误率与p99需要窗口已满且窗口内请求数不少于 min_requests，避免启动初期个别请求误触发。
+# 触发后调用 cancel_run 停止本轮（在途请求被取消），报告记录触发的规则与当时的窗口数值；未触发则照常结束。
+# 规则值为0表示不启用该项。
+
+TICK_SECONDS = 0.5
+REFUSED_KEY = "ConnectionRefusedError"
+
+
+class AbortRules:
+    """自动中止规则（0 为不启用）"""
+    def __init__(self, error_pct=0.0, p99_ms=0.0, window=10.0, refused=0, min_requests=20):
+        self.error_pct = error_pct
+        self.p99_ms = p99_ms
+        self.window = window
+        self.refused = refused
+        self.min_requests = min_requests
+
+    @property
+    def enabled(self):
+        return bool(self.error_pct or self.p99_ms or self.refused)
+
+    def describe(self):
+        parts = []
+        if self.error_pct:
+            parts.append(f"错误率 > {self.error_pct}%")
+        if self.p99_ms:
+            parts.append(f"p99 > {self.p99_ms}ms")
+        if self.refused:
+            parts.append(f"拒绝连接 ≥ {self.refused} 次")
+        return f"{' 或 '.join(parts)}（滚动窗口 {self.window}s）"
+
+
+def parse_rules(config_data):
+    """从配置数据解析中止规则，格式错误抛 ValueError；均未填写时返回 None"""
+    def number(key, cast=float):
+        text = str(config_data.get(key) or "").strip()
+        if not text:
+            return cast(0)
+        value = cast(text)
+        if value < 0:
+            raise ValueError
+        return value
+
+    try:
+        rules = AbortRules(number("abort_error_pct"), number("abort_p99_ms"), number("abort_window") or 10.0,
+                           number("abort_refused", int))
+    except ValueError:
+        raise ValueError("自动中止规则必须为非负数（错误率%、p99毫秒、窗口秒数、拒绝连接次数）")
+    return rules if rules.enabled else None
+
+
+class SloGuard:
+    """后台评估中止规则；triggered 为触发信息（未触发为None）"""
+    def __init__(self, test_data, rules, log=press_engine._noop):
+        self.test_data = test_data
+        self.rules = rules
+        self.log = log
+        self.samples = collections.deque()  # (时刻, 成功数, 失败数, 拒绝连接数, 累计直方图)
+        self.triggered = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        # 以压测开始时刻为第一个窗口起点
+        self.samples.append((self.test_data.test_start_time, 0, 0, 0, LatencyHistogram()))
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(TICK_SECONDS):
+            if not self.test_data.is_running:
+                continue
+            self.triggered = self.check()
+            if self.triggered:
+                press_engine.cancel_run(self.test_data)
+                self.log(f"🛑 触发自动中止：{self.triggered['message']}", "ERROR")
+                return
+
+    def check(self):
+        """采样一次并评估规则，返回触发信息或None"""
+        snap = press_engine.snapshot(self.test_data)
+        now = snap["time"]
+        sample = (now, snap["success"], snap["fail"], snap["error_types"].get(REFUSED_KEY, 0), snap["rt_hist"])
+        self.samples.append(sample)
+        rules = self.rules
+        while len(self.samples) > 1 and now - self.samples[1][0] >= rules.window:
+            self.samples.popleft()
+        first = self.samples[0]
+        span = now - first[0]
+        elapsed = round(now - snap["start_time"], 2)
+        success, fail, refused = sample[1] - first[1], sample[2] - first[2], sample[3] - first[3]
+        if rules.refused and refused >= rules.refused:
+            return self._hit("refused", refused, rules.refused, span, elapsed,
+                             f"{round(span, 1)}s 内拒绝连接 {refused} 次（阈值 {rules.refused}）")
+        count = success + fail
+        if span < rules.window * 0.95 or count < rules.min_requests:
+            return None
+        if rules.error_pct:
+            error_pct = round(fail / count * 100, 2)
+            if error_pct > rules.error_pct:
+                return self._hit("error_rate", error_pct, rules.error_pct, span, elapsed,
+                                 f"最近 {round(span, 1)}s 错误率 {error_pct}%（{fail}/{count}，阈值 {rules.error_pct}%）")
+        if rules.p99_ms:
+            hist = sample[4].difference(first[4])
+            p99 = round(hist.percentile(99), 2)
+            if p99 > rules.p99_ms:
+                return self._hit("p99", p99, rules.p99_ms, span, elapsed,
+                                 f"最近 {round(span, 1)}s p99 {p99}ms（{count} 次，阈值 {rules.p99_ms}ms）")
+        return None
+
+    @staticmethod
+    def _hit(rule, value, threshold, span, elapsed, message):
+        return {"rule": rule, "value": value, "threshold": threshold, "window_seconds": round(span, 2),
+                "at_seconds": elapsed, "message": message}
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.summary()
+
+    def summary(self):
+        return {"rules": self.rules.describe(), "triggered": self.triggered}
+
+
+def format_abort(slo):
+    """报表中的自动中止段落"""
+    if not slo:
+        return ""
+    hit = slo["triggered"]
+    if hit is None:
+        return f"✅ 自动中止规则全程未触发：{slo['rules']}\n"
+    return f"🛑 已自动中止（第 {hit['at_seconds']}s）：{hit['message']} | 规则：{slo['rules']}\n"
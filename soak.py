@@ -0,0 +1,178 @@
+import collections
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+
+import press_engine
+from config_store import atomic_write_json
+
+try:
+    import psutil
+except ImportError:  # 未安装psutil时按平台退化读取RSS
+    psutil = None
+
+# ===================== 长稳压测（内存受限） =====================
+# 数小时级别的压测不能把每个请求都留在内存里：
+#   - 逐请求响应时间列表关闭，统计只进对数直方图（内存与请求数无关）
+#   - 每个汇总间隔取出一个统计窗口，追加一行到 intervals.jsonl，内存中只保留最近 N 个窗口
+#   - 定期把累计统计原子写入 snapshot.json，进程意外退出也能拿到最近一次快照
+#   - 全程跟踪压测工具自身的RSS，最终报告由累计直方图 + 间隔文件生成
+# 输出目录：soak_runs/soak_时间戳/
+
+SOAK_DIR = "soak_runs"
+INTERVALS_FILE = "intervals.jsonl"
+SNAPSHOT_FILE = "snapshot.json"
+REPORT_FILE = "report.json"
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+def process_rss_mb():
+    """当前进程常驻内存(MB)，无法获取时返回None"""
+    if psutil is not None:
+        return round(psutil.Process().memory_info().rss / 1048576, 2)
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 2)
+    except OSError:
+        pass
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return round(counters.WorkingSetSize / 1048576, 2)
+        except Exception:
+            pass
+    return None
+
+
+class SoakRecorder:
+    """后台按间隔落盘的长稳记录器：start() 后每 interval 秒汇总一次，stop() 返回长稳汇总"""
+    def __init__(self, test_data, interval=60.0, keep_windows=60, out_dir=None, log=_noop):
+        self.test_data = test_data
+        self.interval = interval
+        self.windows = collections.deque(maxlen=keep_windows)  # 最近N个间隔汇总（滚动窗口）
+        self.out_dir = out_dir or os.path.join(SOAK_DIR, f"soak_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        self.log = log
+        self.rss_start = None
+        self.rss_peak = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._index = 0
+
+    def start(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.rss_start = process_rss_mb()
+        self.rss_peak = self.rss_start or 0.0
+        press_engine.take_window(self.test_data)  # 丢弃启动前（含预热）的窗口
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self.log(f"🕒 长稳模式：每 {self.interval}s 汇总一次，输出目录 {self.out_dir}", "INFO")
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """取出一个统计窗口：追加间隔汇总并刷新累计快照"""
+        hist, success, fail, seconds = press_engine.take_window(self.test_data)
+        rss = process_rss_mb()
+        if rss is not None:
+            self.rss_peak = max(self.rss_peak, rss)
+        self._index += 1
+        count = success + fail
+        window = {
+            "index": self._index,
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "seconds": round(seconds, 3),
+            "requests": count,
+            "success": success,
+            "fail": fail,
+            "qps": round(count / seconds, 2) if seconds > 0 else 0,
+            "error_pct": round(fail / count * 100, 2) if count else 0,
+            "avg_rt": round(hist.mean(), 2),
+            "p50_rt": round(hist.percentile(50), 2),
+            "p99_rt": round(hist.percentile(99), 2),
+            "max_rt": round(hist.max, 2),
+            "rss_mb": rss,
+        }
+        self.windows.append(window)
+        with open(os.path.join(self.out_dir, INTERVALS_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(window, ensure_ascii=False) + "\n")
+        snapshot = press_engine.build_summary(self.test_data)
+        snapshot["snapshot_time"] = window["time"]
+        snapshot["rss_mb"] = rss
+        atomic_write_json(os.path.join(self.out_dir, SNAPSHOT_FILE), snapshot)
+        self.log(f"🕒 间隔#{self._index}：{count} 次 | QPS {window['qps']} | p99 {window['p99_rt']}ms | "
+                 f"错误率 {window['error_pct']}% | RSS {rss if rss is not None else '--'}MB", "INFO")
+        return window
+
+    def stop(self):
+        """停止后台线程，补录最后一个不满间隔的窗口，并从间隔文件生成长稳汇总"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+        return self.summary()
+
+    def summary(self):
+        # 流式读取间隔文件（而非内存中的滚动窗口），覆盖整个运行期
+        intervals, qps_min, qps_max, worst = 0, None, 0, None
+        with open(os.path.join(self.out_dir, INTERVALS_FILE), "r", encoding="utf-8") as f:
+            for line in f:
+                window = json.loads(line)
+                if not window["requests"]:
+                    continue
+                intervals += 1
+                qps_min = window["qps"] if qps_min is None else min(qps_min, window["qps"])
+                qps_max = max(qps_max, window["qps"])
+                if worst is None or window["p99_rt"] > worst["p99_rt"]:
+                    worst = window
+        rss_end = process_rss_mb()
+        return {
+            "dir": self.out_dir,
+            "interval_seconds": self.interval,
+            "intervals": intervals,
+            "qps_min": qps_min or 0,
+            "qps_max": qps_max,
+            "worst_interval": worst,
+            "rss_start_mb": self.rss_start,
+            "rss_peak_mb": max(self.rss_peak, rss_end or 0) or None,
+            "rss_end_mb": rss_end,
+        }
+
+
+def save_report(soak_summary, report):
+    """将最终报告写入长稳输出目录"""
+    atomic_write_json(os.path.join(soak_summary["dir"], REPORT_FILE), report)
+
+
+def format_soak(summary):
+    """压测报告中的长稳段落"""
+    if not summary:
+        return ""
+    text = (f"🕒 长稳模式：{summary['intervals']} 个有效间隔（每 {summary['interval_seconds']}s） | "
+            f"间隔QPS {summary['qps_min']} ~ {summary['qps_max']} | "
+            f"RSS 起始 {summary['rss_start_mb']}MB / 峰值 {summary['rss_peak_mb']}MB / 结束 {summary['rss_end_mb']}MB\n")
+    worst = summary["worst_interval"]
+    if worst:
+        text += f"   最差间隔：#{worst['index']}（{worst['time']}）p99 {worst['p99_rt']}ms | 错误率 {worst['error_pct']}%\n"
+    return text + f"   间隔明细：{os.path.join(summary['dir'], INTERVALS_FILE)}\n"
@@ -0,0 +1,345 @@
+import argparse
+import collections
+import fnmatch
+import os
+import platform
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+
+import http_timing
+from http_timing import CONN_MODES
+import press_engine
+from bandwidth import WireOptions
+from config_store import CONFIG_DIR, ConfigStore, atomic_write_json, config_hash
+from endpoint_mix import EndpointMix, parse_endpoints
+from harness_monitor import HarnessMonitor
+from payload_gen import PayloadGenerator, PayloadRenderer, parse_specs
+from upload_body import UploadSource
+from ws_engine import WsLoad, is_ws_url
+from raw_engine import RawTarget, send_raw
+from replay import ReplayPlan, parse_speed, replay_worker
+from slo_guard import SloGuard, parse_rules
+from request_capture import parse_capture
+from request_hooks import parse_hooks, redact_config
+from press_engine import TestData, WarmupPlan
+from run_history import HISTORY_FILE, RunHistory
+
+# ===================== 批量压测：按配置套件无界面运行 =====================
+# 从 configs/ 中选取一批已保存的配置，依次（或在全局并发预算内并行）执行，每轮之间可设置冷却时间，
+# 最终写出一份汇总JSON（suite_results/suite_时间戳.json），供定时任务对整个API面做基准测试。
+# 配置选择（可混用，按出现顺序去重）：
+#   名称          order_create
+#   通配          "order_*"  或  "configs/*.json"
+#   检索          "tag:nightly"  "method:POST tag:order"
+# 用法：python suite_runner.py "tag:nightly" --parallel 64 --cooldown 10
+# 并行：同时运行的配置"并发数"之和不超过 --parallel（单个配置超出预算时独占运行）；不填则逐个执行
+
+RESULT_DIR = "suite_results"
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+def select_configs(store, patterns):
+    """按名称/通配/检索表达式选取配置名，保持给出的顺序并去重"""
+    names = store.list_names()
+    selected = []
+    for pattern in patterns:
+        if re.search(r"(^|\s)(tag|method):", pattern, re.IGNORECASE):
+            matched = store.query(pattern)
+        elif any(ch in pattern for ch in "*?["):
+            base = os.path.basename(pattern)
+            base = base[:-5] if base.endswith(".json") else base
+            matched = [n for n in names if fnmatch.fnmatch(n, base)]
+        else:
+            matched = [pattern] if store.exists(pattern) else []
+        if not matched:
+            raise ValueError(f"未找到匹配的配置：{pattern}")
+        selected.extend(n for n in matched if n not in selected)
+    return selected
+
+
+class RunSpec:
+    """由配置数据解析出的一轮压测参数（与界面"开始压测"的校验规则一致）"""
+    def __init__(self, config_data):
+        self.url = str(config_data.get("target_url", "")).strip()
+        self.method = str(config_data.get("request_method", "GET")).upper()
+        if not re.match(r"^(https?|wss?)://", self.url):
+            raise ValueError("目标API地址格式错误，必须以 http:// 或 https://（WebSocket 为 ws:// 或 wss://）开头")
+        self.websocket = is_ws_url(self.url)
+        try:
+            self.thread_num = int(config_data.get("thread_num", 8))
+            self.total_requests = int(config_data.get("total_requests", 200))
+            self.timeout = int(config_data.get("timeout", 5))
+        except (TypeError, ValueError):
+            raise ValueError("并发数、总请求数、超时时间 必须为数字")
+        if self.thread_num <= 0 or self.total_requests <= 0 or self.timeout <= 0:
+            raise ValueError("并发数、总请求数、超时时间 必须为正整数")
+        if self.thread_num > self.total_requests:
+            raise ValueError(f"并发数({self.thread_num})不应超过总请求数({self.total_requests})")
+        self.headers = press_engine.parse_json(str(config_data.get("headers", "")))
+        self.data_list = press_engine.load_data_list(str(config_data.get("data", "")))
+        if self.data_list is None:
+            raise ValueError("请求体参数文件加载失败")
+        self.warmup_requests, self.warmup_seconds = press_engine.parse_warmup(str(config_data.get("warmup", "0")))
+        self.generator_specs = parse_specs(config_data.get("generators", ""))
+        endpoints = parse_endpoints(config_data.get("endpoints", ""), self.url, self.method, self.headers, self.data_list)
+        self.mix = EndpointMix(endpoints) if endpoints else None
+        self.wire = WireOptions(config_data.get("request_encoding") or "none", config_data.get("accept_encoding", ""))
+        self.upload_file = str(config_data.get("upload_file") or "").strip()
+        try:
+            self.upload_chunk_kb = float(config_data.get("upload_chunk_kb") or 0)
+        except (TypeError, ValueError):
+            raise ValueError("上传分块大小必须为数字（KB）")
+        if self.upload_file and not os.path.isfile(self.upload_file):
+            raise ValueError(f"上传文件不存在：{self.upload_file}")
+        try:
+            self.ws_rate = float(config_data.get("ws_rate") or 0)
+        except (TypeError, ValueError):
+            raise ValueError("WS消息速率必须为数字（条/秒/连接）")
+        if self.websocket and (self.ws_rate < 0 or self.mix or self.upload_file or self.generator_specs
+                               or self.warmup_requests or self.warmup_seconds):
+            raise ValueError("WebSocket压测的消息速率不能为负数，且不支持预热/数据生成器/多接口组合/上传文件")
+        self.engine = str(config_data.get("engine") or "requests")
+        if self.engine not in ("requests", "raw"):
+            raise ValueError(f"未知的发压引擎：{self.engine}（可选 requests / raw）")
+        try:
+            self.pipeline_depth = int(config_data.get("pipeline_depth") or 1)
+        except (TypeError, ValueError):
+            raise ValueError("流水线深度必须为正整数")
+        self.replay_file = "" if self.websocket else str(config_data.get("replay_file") or "").strip()
+        try:
+            self.replay_speed = parse_speed(config_data.get("replay_speed", "1"))
+        except ValueError:
+            raise ValueError("回放速度格式错误，填写 1、10、0.5 或 max")
+        if self.replay_file:
+            if not os.path.isfile(self.replay_file):
+                raise ValueError(f"回放文件不存在：{self.replay_file}")
+            if self.mix or self.upload_file or self.generator_specs or self.warmup_requests or self.warmup_seconds:
+                raise ValueError("流量回放不支持预热/数据生成器/多接口组合/上传文件")
+        self.raw = self.engine == "raw" and not self.websocket and not self.replay_file
+        if self.raw:
+            if self.pipeline_depth < 1:
+                raise ValueError("流水线深度必须为正整数")
+            if self.mix or self.upload_file or self.generator_specs or self.warmup_requests or self.warmup_seconds:
+                raise ValueError("raw 引擎不支持预热/数据生成器/多接口组合/上传文件")
+            self.raw_target = RawTarget(self.url, self.method, self.headers, self.data_list)
+        self.abort_rules = parse_rules(config_data)
+        self.conn_mode = str(config_data.get("conn_mode") or "reuse")
+        if self.conn_mode not in CONN_MODES:
+            raise ValueError(f"未知的连接模式：{self.conn_mode}（可选 {' / '.join(CONN_MODES)}）")
+        self.capture = parse_capture(config_data)
+        self.hooks = parse_hooks(config_data.get("hooks", ""))
+        if self.websocket or self.raw:
+            self.conn_mode = "reuse"  # WebSocket / raw 引擎固定为长连接
+            self.capture = None  # 预编码报文/长连接消息无法逐请求注入请求ID或签名
+            self.hooks = None
+        if self.hooks and self.hooks.covers_body and (self.upload_file or self.wire.compress):
+            raise ValueError("签名覆盖请求体（{body}/{body_sha256}）时不能同时启用请求体压缩或上传文件")
+
+
+def run_spec(spec, log=_noop, run_timeout=0):
+    """无界面执行一轮压测，返回与界面报告一致的汇总字典"""
+    test_data = TestData()
+    test_data.reset(spec.total_requests, spec.thread_num)
+    test_data.capture = spec.capture
+    if spec.websocket:
+        return _run_websocket(spec, test_data, log, run_timeout)
+    if spec.warmup_requests or spec.warmup_seconds:
+        test_data.warmup = WarmupPlan(test_data, spec.thread_num, spec.warmup_requests, spec.warmup_seconds, log)
+    generator, payload = None, None
+    if spec.generator_specs:
+        generator = PayloadGenerator(spec.generator_specs).start()
+        payload = PayloadRenderer(generator, spec.headers, spec.data_list)
+        if spec.mix:
+            spec.mix.attach_generator(generator)
+    # 上传文件在本轮开始时才映射，结束即释放（套件中的配置不会同时占用映射）
+    upload = UploadSource(spec.upload_file, spec.upload_chunk_kb) if spec.upload_file else None
+    wire = WireOptions(spec.wire.request_encoding, spec.wire.accept_encoding, upload)
+    monitor = HarnessMonitor(test_data)
+    monitor.start()
+    guard = SloGuard(test_data, spec.abort_rules, log).start() if spec.abort_rules else None
+    plan = None
+    if spec.replay_file:
+        plan = ReplayPlan(test_data, spec.replay_file, spec.url, spec.replay_speed, spec.headers, spec.total_requests, log).start()
+        threads = [threading.Thread(target=replay_worker, daemon=True, args=(test_data, plan, spec.timeout, _noop, spec.conn_mode, spec.hooks))
+                   for _ in range(spec.thread_num)]
+    elif spec.raw:
+        threads = [threading.Thread(target=send_raw, daemon=True, args=(test_data, spec.raw_target, spec.timeout, spec.pipeline_depth))
+                   for _ in range(spec.thread_num)]
+    else:
+        threads = [threading.Thread(target=press_engine.send_request, daemon=True,
+                                    args=(test_data, spec.url, spec.method, spec.headers, spec.data_list, spec.timeout),
+                                    kwargs={"warmup": test_data.warmup, "payload": payload, "mix": spec.mix, "wire": wire,
+                                            "conn_mode": spec.conn_mode, "hooks": spec.hooks})
+                   for _ in range(spec.thread_num)]
+    for t in threads:
+        t.start()
+    deadline = time.perf_counter() + run_timeout if run_timeout else None
+    timed_out = False
+    for t in threads:
+        t.join(max(deadline - time.perf_counter(), 0) if deadline else None)
+        if t.is_alive():
+            timed_out = True
+            log("⚠️ 超过单轮时长上限，取消剩余请求", "WARN")
+            press_engine.cancel_run(test_data)
+            break
+    for t in threads:
+        t.join(1.0)
+    test_data.test_end_time = time.perf_counter()
+    if generator is not None:
+        generator.stop()
+    summary = press_engine.build_summary(test_data)
+    summary["harness"] = monitor.stop()
+    summary["timed_out"] = timed_out
+    summary["upload"] = upload.summary(summary["active_time"], summary["p50_rt"]) if upload else None
+    summary["websocket"] = None
+    summary["replay"] = plan.summary(summary["active_time"]) if plan else None
+    summary["slo_abort"] = guard.stop() if guard else None
+    summary["conn_mode"] = spec.conn_mode
+    summary["hooks"] = spec.hooks.summary() if spec.hooks else None
+    if upload is not None:
+        upload.close()
+    return summary
+
+
+def _run_websocket(spec, test_data, log, run_timeout):
+    """WebSocket配置：并发数为连接数、总请求数为总消息数，由单个事件循环线程执行"""
+    monitor = HarnessMonitor(test_data)
+    monitor.start()
+    guard = SloGuard(test_data, spec.abort_rules, log).start() if spec.abort_rules else None
+    load = WsLoad(test_data, spec.url, spec.thread_num, spec.total_requests, spec.ws_rate, spec.headers, spec.data_list,
+                  spec.timeout, log).start()
+    load.thread.join(run_timeout or None)
+    timed_out = load.thread.is_alive()
+    if timed_out:
+        log("⚠️ 超过单轮时长上限，取消剩余消息", "WARN")
+        press_engine.cancel_run(test_data)
+        load.thread.join(1.0)
+    test_data.test_end_time = time.perf_counter()
+    summary = press_engine.build_summary(test_data)
+    summary["harness"] = monitor.stop()
+    summary["timed_out"] = timed_out
+    summary["upload"] = None
+    summary["websocket"] = load.summary(summary["active_time"])
+    summary["replay"] = None
+    summary["slo_abort"] = guard.stop() if guard else None
+    summary["conn_mode"] = spec.conn_mode
+    summary["hooks"] = None
+    return summary
+
+
+def run_suite(store, names, budget=0, cooldown=0.0, run_timeout=0, log=print, history=None):
+    """执行一组配置，返回每轮结果列表（顺序与 names 一致）；history 为 RunHistory 时每轮结束写入历史"""
+    results = {}
+    configs = {}
+    pending = collections.deque()
+    for name in names:
+        config_data = configs[name] = store.load(name)
+        entry = {"name": name, "config_hash": config_hash(redact_config(config_data)), "target": config_data.get("target_url", ""),
+                 "method": config_data.get("request_method", ""), "status": "pending"}
+        results[name] = entry
+        try:
+            pending.append((name, RunSpec(config_data)))
+        except ValueError as e:
+            entry.update(status="invalid", error=str(e))
+            log(f"❌ [{name}] 配置无效，跳过：{e}")
+
+    running = {}  # 线程 → (名称, 占用并发)
+    last_finish = None
+
+    def worker(name, spec):
+        entry = results[name]
+        entry["started_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            summary = run_spec(spec, lambda content, level="INFO": log(f"[{name}] {content}"), run_timeout)
+            aborted = summary["slo_abort"] and summary["slo_abort"]["triggered"]
+            entry.update(status="aborted" if aborted else "ok", summary=summary)
+            if history is not None:
+                entry["history_id"] = history.record(summary, redact_config(configs[name]), name, entry["config_hash"], source="suite")
+            if aborted:
+                log(f"🛑 [{name}] 已自动中止：{aborted['message']}")
+            log(f"{'🛑' if aborted else '✅'} [{name}] QPS {summary['qps']} | 成功率 {summary['success_rate']}% | "
+                f"p50 {summary['p50_rt']}ms | p99 {summary['p99_rt']}ms | 状态码 {summary['status_codes']}")
+        except Exception as e:
+            entry.update(status="error", error=str(e))
+            log(f"❌ [{name}] 执行失败：{e}")
+        entry["finished_at"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+    while pending or running:
+        for t in [t for t in running if not t.is_alive()]:
+            running.pop(t)
+            last_finish = time.perf_counter()
+        if pending:
+            name, spec = pending[0]
+            in_use = sum(n for _, n in running.values())
+            cooled = last_finish is None or time.perf_counter() - last_finish >= cooldown
+            fits = not running or (budget and in_use + spec.thread_num <= budget)
+            if cooled and fits:
+                pending.popleft()
+                log(f"▶ [{name}] 开始：{spec.method} {spec.url if not spec.mix else '多接口组合'} | "
+                    f"并发 {spec.thread_num} | 请求数 {spec.total_requests}")
+                t = threading.Thread(target=worker, args=(name, spec), daemon=True)
+                running[t] = (name, spec.thread_num)
+                t.start()
+                continue
+        time.sleep(0.05)
+    return [results[name] for name in names]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PyApiPress 批量压测（按已保存配置无界面运行）")
+    parser.add_argument("configs", nargs="+", help="配置名 / 通配(order_*) / 检索表达式(tag:nightly)")
+    parser.add_argument("--config-dir", default=CONFIG_DIR, help="配置目录")
+    parser.add_argument("--parallel", type=int, default=0, help="全局并发预算（同时运行配置的并发数之和），0为逐个执行")
+    parser.add_argument("--cooldown", type=float, default=0.0, help="每轮结束后到下一轮开始的冷却时间(秒)")
+    parser.add_argument("--run-timeout", type=float, default=0.0, help="单轮时长上限(秒)，超过后取消剩余请求，0为不限")
+    parser.add_argument("--out", help="汇总文件路径，默认 suite_results/suite_时间戳.json")
+    parser.add_argument("--history", default=HISTORY_FILE, help="压测历史库文件")
+    parser.add_argument("--no-history", action="store_true", help="不写入压测历史")
+    args = parser.parse_args(argv)
+
+    store = ConfigStore(args.config_dir)
+    try:
+        names = select_configs(store, args.configs)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"共选中 {len(names)} 个配置：{', '.join(names)}", flush=True)
+
+    http_timing.dns_cache.reset(enabled=True)
+    started = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    history = None if args.no_history else RunHistory(args.history)
+    runs = run_suite(store, names, args.parallel, args.cooldown, args.run_timeout,
+                     log=lambda line: print(line, flush=True), history=history)
+    report = {
+        "meta": {
+            "started_at": started,
+            "finished_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "selection": args.configs,
+            "parallel_budget": args.parallel,
+            "cooldown_seconds": args.cooldown,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "totals": {
+            "runs": len(runs),
+            "ok": sum(r["status"] == "ok" for r in runs),
+            "invalid": sum(r["status"] == "invalid" for r in runs),
+            "error": sum(r["status"] == "error" for r in runs),
+            "aborted": sum(r["status"] == "aborted" for r in runs),
+        },
+        "runs": runs,
+    }
+    out = args.out or os.path.join(RESULT_DIR, f"suite_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    atomic_write_json(out, report)
+    print(f"汇总已保存：{out}（成功 {report['totals']['ok']} / 共 {len(runs)}）")
+    return 0 if report["totals"]["ok"] == len(runs) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import mmap
+import os
+import threading
+
+# ===================== 大文件上传：内存映射请求体（零拷贝） =====================
+# 上传类接口需要 MB~GB 级请求体，若每个请求都 json.dumps / 读文件，内存与CPU随并发线性增长。
+# 这里把文件以只读方式 mmap 一次，所有工作线程共用同一映射：
+#   整块发送   请求体为映射的 memoryview，urllib3 直接交给 socket.sendall，不复制到Python对象
+#   分块发送   按块大小迭代 memoryview 切片（切片不复制数据），仍带 Content-Length（非 chunked 编码）
+# 上传模式下 POST/PUT 请求体固定为该文件，忽略请求体参数与请求体压缩
+
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+
+
+class MmapBody:
+    """分块发送的请求体：len() 给出总长度（requests 据此设置 Content-Length），迭代产出映射切片"""
+    def __init__(self, view, chunk_size):
+        self.view = view
+        self.chunk_size = chunk_size
+
+    def __len__(self):
+        return len(self.view)
+
+    def __iter__(self):
+        for offset in range(0, len(self.view), self.chunk_size):
+            yield self.view[offset:offset + self.chunk_size]
+
+
+class UploadSource:
+    """一个上传文件的共享映射；body() 每次返回新的请求体对象（不复制文件内容）"""
+    def __init__(self, path, chunk_kb=0, content_type=DEFAULT_CONTENT_TYPE):
+        self.path = path
+        self.size = os.path.getsize(path)
+        if self.size == 0:
+            raise ValueError(f"上传文件为空：{path}")
+        if chunk_kb < 0:
+            raise ValueError("分块大小不能为负数")
+        self.chunk_size = int(chunk_kb * 1024)
+        self.headers = {"Content-Type": content_type}
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self._mmap)
+        self._local = threading.local()
+        self._counters = []  # 每个线程一个计数器，避免上传计数争用同一把锁
+        self._lock = threading.Lock()
+
+    def body(self):
+        counter = getattr(self._local, "counter", None)
+        if counter is None:
+            counter = self._local.counter = [0]
+            with self._lock:
+                self._counters.append(counter)
+        counter[0] += 1
+        return MmapBody(self.view, self.chunk_size) if self.chunk_size else self.view
+
+    @property
+    def uploads(self):
+        return sum(counter[0] for counter in list(self._counters))
+
+    def close(self):
+        try:
+            self.view.release()
+            self._mmap.close()
+        except BufferError:
+            pass  # 仍有在途请求引用切片，交给垃圾回收
+        self._file.close()
+
+    def summary(self, active_time, p50_rt):
+        """上传汇总：文件大小、发起次数、上传总量与吞吐（MB/s），单请求吞吐按 p50 响应时间估算"""
+        mb = 1048576.0
+        total = self.uploads * self.size
+        return {
+            "file": self.path,
+            "file_mb": round(self.size / mb, 3),
+            "chunk_kb": self.chunk_size // 1024,
+            "uploads": self.uploads,
+            "total_mb": round(total / mb, 3),
+            "mbps": round(total / mb / active_time, 3) if active_time > 0 else 0,
+            "per_request_mbps": round(self.size / mb / (p50_rt / 1000), 3) if p50_rt > 0 else 0,
+        }
+
+
+def format_upload(upload):
+    """报表中的上传段落"""
+    if not upload:
+        return ""
+    mode = f"分块 {upload['chunk_kb']}KB" if upload["chunk_kb"] else "整块"
+    return (f"📤 上传：{upload['file']}（{upload['file_mb']}MB，{mode}） | 发起 {upload['uploads']} 次（含预热） | "
+            f"共 {upload['total_mb']}MB | 平均吞吐 {upload['mbps']} MB/s | 单请求(p50) {upload['per_request_mbps']} MB/s\n")
@@ -0,0 +1,312 @@
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import os
+import random
+import ssl
+import struct
+import threading
+import time
+from urllib.parse import urlsplit
+
+import press_engine
+from press_stats import LatencyHistogram
+
+# ===================== WebSocket 压测（asyncio 单线程引擎） =====================
+# 目标URL以 ws:// 或 wss:// 开头时启用。所有连接运行在同一个后台事件循环线程中，可保持数千条长连接：
+#   并发数     = 连接数（建连限速：同时握手不超过 HANDSHAKE_LIMIT 个）
+#   总请求数   = 总消息数（平均分配到各连接）
+#   消息速率   = 每连接每秒发送条数（开环，按固定间隔发送，不等待回复）；0 为闭环：收到回复后立即发下一条
+#   请求体     = 消息模板（参数数组按消息序号轮换，JSON序列化后以文本帧发送）
+# 连接数上千时注意压测机的文件描述符上限（ulimit -n）
+# 往返时延(RTT)：按"请求-回复"顺序配对，每收到一条数据消息即与该连接最早未回复的一条发送配对
+# （适用于 echo / 一问一答类服务；多出的服务端推送消息单独计数）。
+# 每条消息的RTT作为一次"请求"写入 TestData，报告/导出/指标/历史与HTTP压测共用；连接级指标见 summary()
+
+HANDSHAKE_LIMIT = 200
+_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OP_CONT, OP_TEXT, OP_BINARY, OP_CLOSE, OP_PING, OP_PONG = 0x0, 0x1, 0x2, 0x8, 0x9, 0xA
+MESSAGE_CODE = "MSG"  # 消息往返在状态码分布中的键
+
+
+class WsError(Exception):
+    """握手失败 / 连接被关闭等WebSocket协议层错误"""
+
+
+def is_ws_url(url):
+    return url.strip().lower().startswith(("ws://", "wss://"))
+
+
+def encode_frame(opcode, payload):
+    """客户端帧（FIN=1，带掩码）"""
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, 0x80 | n)
+    elif n < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 0x80 | 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 0x80 | 127, n)
+    mask = os.urandom(4)
+    if n:
+        key = (mask * (n // 4 + 1))[:n]
+        payload = (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(n, "big")
+    return header + mask + payload
+
+
+async def read_frame(reader):
+    """读取一帧，返回 (fin, opcode, payload)"""
+    b1, b2 = await reader.readexactly(2)
+    n = b2 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if b2 & 0x80 else None
+    payload = await reader.readexactly(n) if n else b""
+    if mask and n:
+        key = (mask * (n // 4 + 1))[:n]
+        payload = (int.from_bytes(payload, "big") ^ int.from_bytes(key, "big")).to_bytes(n, "big")
+    return bool(b1 & 0x80), b1 & 0x0F, payload
+
+
+class WsConnection:
+    """一条WebSocket客户端连接"""
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def open(cls, url, headers=None, timeout=10):
+        parts = urlsplit(url)
+        secure = parts.scheme.lower() == "wss"
+        port = parts.port or (443 if secure else 80)
+        ctx = ssl.create_default_context() if secure else None
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(parts.hostname, port, ssl=ctx, server_hostname=parts.hostname if secure else None),
+            timeout)
+        key = base64.b64encode(os.urandom(16)).decode()
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        lines = [f"GET {path} HTTP/1.1", f"Host: {parts.netloc}", "Upgrade: websocket", "Connection: Upgrade",
+                 f"Sec-WebSocket-Key: {key}", "Sec-WebSocket-Version: 13"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items() if k.lower() not in ("host", "content-type", "content-length")]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        try:
+            status = await asyncio.wait_for(reader.readline(), timeout)
+            response_headers = {}
+            while True:
+                line = await asyncio.wait_for(reader.readline(), timeout)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                response_headers[name.strip().lower()] = value.strip()
+        except BaseException:
+            writer.close()
+            raise
+        code = status.split(b" ", 2)[1:2]
+        expected = base64.b64encode(hashlib.sha1((key + _GUID).encode()).digest()).decode()
+        if code != [b"101"] or response_headers.get("sec-websocket-accept") != expected:
+            writer.close()
+            raise WsError(f"握手失败：{status.decode('latin-1').strip() or '连接已关闭'}")
+        return cls(reader, writer)
+
+    def send_text(self, text):
+        self.writer.write(encode_frame(OP_TEXT, text.encode("utf-8")))
+
+    async def recv(self):
+        """读取一条完整数据消息（自动应答 ping、拼接分片）；对端关闭时抛 WsError"""
+        chunks = []
+        while True:
+            fin, opcode, payload = await read_frame(self.reader)
+            if opcode == OP_PING:
+                self.writer.write(encode_frame(OP_PONG, payload))
+                continue
+            if opcode == OP_PONG:
+                continue
+            if opcode == OP_CLOSE:
+                code = struct.unpack("!H", payload[:2])[0] if len(payload) >= 2 else 1005
+                raise WsError(f"服务端关闭连接（{code}）")
+            chunks.append(payload)
+            if fin:
+                return b"".join(chunks)
+
+    async def close(self):
+        try:
+            self.writer.write(encode_frame(OP_CLOSE, struct.pack("!H", 1000)))
+            await asyncio.wait_for(self.writer.drain(), 1)
+        except Exception:
+            pass
+        self.writer.close()
+
+
+class WsLoad:
+    """一轮WebSocket压测：start() 在后台线程运行事件循环，thread 供调用方 join"""
+    def __init__(self, test_data, url, connections, total_messages, rate, headers, data_list, timeout, log=press_engine._noop):
+        self.test_data = test_data
+        self.url = url
+        self.connections = connections
+        self.total_messages = total_messages
+        self.rate = rate
+        self.headers = headers or {}
+        self.messages = [json.dumps(d, ensure_ascii=False) if not isinstance(d, str) else d
+                         for d in (data_list if isinstance(data_list, list) and data_list else [data_list or {}])]
+        self.timeout = timeout
+        self.log = log
+        self.connect_hist = LatencyHistogram()
+        self.opened = 0
+        self.connect_failed = 0
+        self.closed_by_server = 0
+        self.open_now = 0
+        self.peak_open = 0
+        self.sent = 0
+        self.received = 0
+        self.unsolicited = 0  # 没有待配对发送的服务端推送消息
+        self.timed_out = 0
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=lambda: asyncio.run(self._main()), daemon=True)
+        self.thread.start()
+        return self
+
+    async def _main(self):
+        handshake = asyncio.Semaphore(HANDSHAKE_LIMIT)
+        per_conn, extra = divmod(self.total_messages, self.connections)
+        tasks = [asyncio.ensure_future(self._connection(i, per_conn + (1 if i < extra else 0), handshake))
+                 for i in range(self.connections)]
+        done = asyncio.ensure_future(asyncio.gather(*tasks, return_exceptions=True))
+        while not done.done():
+            if not self.test_data.is_running:
+                for task in tasks:
+                    task.cancel()
+                break
+            await asyncio.wait([done], timeout=0.1)
+        await asyncio.gather(done, return_exceptions=True)
+
+    def _expire(self, pending, now):
+        """超过超时时间仍未收到回复的消息计为失败"""
+        while pending and now - pending[0] > self.timeout:
+            pending.popleft()
+            self.timed_out += 1
+            press_engine.record_error(self.test_data, asyncio.TimeoutError())
+
+    async def _connection(self, index, quota, handshake):
+        if quota <= 0:
+            return
+        test_data = self.test_data
+        conn, receiver = None, None
+        pending = collections.deque()  # 未回复消息的发送时刻
+        drained = asyncio.Event()
+        try:
+            async with handshake:
+                t0 = time.perf_counter()
+                try:
+                    conn = await WsConnection.open(self.url, self.headers, self.timeout)
+                except (OSError, asyncio.TimeoutError, WsError) as e:
+                    # 建连失败占用该连接的一条消息额度并计为一次失败，其余额度计入"未发送"
+                    self.connect_failed += 1
+                    if press_engine.claim_request(test_data)[0] is not None:
+                        press_engine.record_error(test_data, e)
+                    return
+            self.connect_hist.record((time.perf_counter() - t0) * 1000)
+            self.opened += 1
+            self.open_now += 1
+            self.peak_open = max(self.peak_open, self.open_now)
+            receiver = asyncio.ensure_future(self._receive(conn, pending, drained))
+            interval = 1.0 / self.rate if self.rate > 0 else 0
+            next_at = time.perf_counter() + random.random() * interval  # 错开各连接的发送时刻
+            for _ in range(quota):
+                if interval:
+                    delay = next_at - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    next_at = max(next_at + interval, time.perf_counter() - interval)  # 落后时不补发
+                seq, _ = press_engine.claim_request(test_data)  # 到点再领取，停止时不会留下已领取未发送的消息
+                if seq is None or receiver.done():
+                    break
+                now = time.perf_counter()
+                self._expire(pending, now)
+                drained.clear()
+                pending.append(now)
+                conn.send_text(self.messages[(seq - 1) % len(self.messages)])
+                self.sent += 1
+                await conn.writer.drain()
+                if not interval:
+                    try:
+                        await asyncio.wait_for(drained.wait(), self.timeout)
+                    except asyncio.TimeoutError:
+                        self._expire(pending, time.perf_counter() + self.timeout)
+            # 等待剩余回复
+            if pending and not receiver.done():
+                try:
+                    await asyncio.wait_for(drained.wait(), max(self.timeout - (time.perf_counter() - pending[0]), 0))
+                except asyncio.TimeoutError:
+                    pass
+            self._expire(pending, time.perf_counter() + self.timeout)
+        except asyncio.CancelledError:
+            for _ in range(len(pending)):
+                press_engine.record_failure(test_data, None)  # 停止压测：未回复消息计为已取消
+            pending.clear()
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, WsError) as e:
+            self._fail_pending(pending, e)
+        finally:
+            if receiver is not None:
+                receiver.cancel()
+            if conn is not None:
+                self.open_now -= 1
+                await conn.close()
+
+    async def _receive(self, conn, pending, drained):
+        try:
+            while True:
+                await conn.recv()
+                now = time.perf_counter()
+                if not pending:
+                    self.unsolicited += 1
+                    continue
+                rtt = (now - pending.popleft()) * 1000
+                self.received += 1
+                press_engine.record_response(self.test_data, round(rtt, 2), MESSAGE_CODE, {}, True)
+                if not pending:
+                    drained.set()
+        except (OSError, asyncio.IncompleteReadError, WsError) as e:
+            if isinstance(e, WsError):
+                self.closed_by_server += 1
+            self._fail_pending(pending, e)
+            drained.set()
+
+    def _fail_pending(self, pending, error):
+        while pending:
+            pending.popleft()
+            press_engine.record_failure(self.test_data, error)
+
+    def summary(self, active_time):
+        return {
+            "url": self.url,
+            "connections": self.connections,
+            "opened": self.opened,
+            "connect_failed": self.connect_failed,
+            "closed_by_server": self.closed_by_server,
+            "peak_open": self.peak_open,
+            "connect_ms": self.connect_hist.summary(),
+            "rate_per_conn": self.rate,
+            "sent": self.sent,
+            "received": self.received,
+            "unsolicited": self.unsolicited,
+            "timed_out": self.timed_out,
+            "sent_per_sec": round(self.sent / active_time, 2) if active_time > 0 else 0,
+            "recv_per_sec": round((self.received + self.unsolicited) / active_time, 2) if active_time > 0 else 0,
+        }
+
+
+def format_websocket(ws):
+    """报表中的WebSocket段落（消息往返RTT即上方的响应时间）"""
+    if not ws:
+        return ""
+    c = ws["connect_ms"]
+    rate = f"每连接 {ws['rate_per_conn']} 条/秒" if ws["rate_per_conn"] else "闭环：收到回复后发下一条"
+    return (f"🔌 WebSocket：连接 {ws['opened']}/{ws['connections']}（失败 {ws['connect_failed']}，被服务端关闭 {ws['closed_by_server']}，"
+            f"峰值 {ws['peak_open']}） | 建连耗时 平均 {c['mean']}ms / p99 {c['p99']}ms / 最大 {c['max']}ms\n"
+            f"   消息：发送 {ws['sent']}（{ws['sent_per_sec']} 条/秒，{rate}） | "
+            f"收到回复 {ws['received']} | 服务端推送 {ws['unsolicited']} | 超时 {ws['timed_out']} | 接收 {ws['recv_per_sec']} 条/秒\n")